@@ -0,0 +1,175 @@
+# File: MyDentalPortal/admission.py
+# Admission control: per-worker concurrency limits per endpoint class, with a
+# short wait and then load shedding (503 + Retry-After).
+#
+# Why: a worker has 4 gthreads. A few PDF renders, report loads or GridFS
+# downloads at once used to occupy all of them, and login and the calendar
+# queued behind the heavy work (in gunicorn's accept queue, which nothing here
+# can see). Now heavy work is capped per worker, so threads stay free for
+# everyone else.
+#
+# Classes (see ENDPOINT_CLASSES; endpoint first, then blueprint):
+#   * heavy       — PDFs, reports, audit exports, uploads and file
+#                   downloads. At most ADMISSION_HEAVY_LIMIT per worker.
+#                   Patient photos and prescription images are NOT heavy:
+#                   they are <img> sources on the patient page, so shedding
+#                   them would break the page they belong to.
+#   * interactive — everything else. ADMISSION_INTERACTIVE_LIMIT caps ALL
+#                   admitted requests of a worker (a heavy request holds one
+#                   of these slots too). Keep it below the thread count so one
+#                   thread is always left for health checks.
+#   * health      — /health and static files: never gated, so Render's health
+#                   check gets through even when the app is saturated.
+# A request that finds its class full waits up to ADMISSION_WAIT_SECONDS for
+# a slot, then gets a 503 with Retry-After. The 503 is a small plain/JSON
+# body: rendering a page (context processors, DB reads) is the very work
+# being shed. A limit of 0 turns that class's gate off.
+#
+# Slots are held until the response is fully SENT (response.call_on_close),
+# not just until the view returns: a streamed export or GridFS download keeps
+# its thread busy for the whole transfer.
+#
+# Outcomes (ok/queued/shed) and queue waits go to /admin/metrics
+# (dentalportal_admission_*).
+
+import threading
+import time
+
+from flask import current_app, g, jsonify, request
+
+import metrics
+
+HEAVY = 'heavy'
+INTERACTIVE = 'interactive'
+HEALTH = 'health'
+
+# Endpoint or blueprint name -> class. Unlisted endpoints are interactive.
+ENDPOINT_CLASSES = {
+    'health_check': HEALTH,
+    'static': HEALTH,
+    'reports': HEAVY,
+    'patients.patient_pdf': HEAVY,
+    'charts.chart_pdf': HEAVY,
+    'main.activity_export': HEAVY,
+    'uploads.set_photo': HEAVY,
+    'uploads.add_prescription': HEAVY,
+    'uploads.add_file': HEAVY,
+    'uploads.download_file': HEAVY,
+}
+
+BUSY_MESSAGE = 'The server is busy right now. Please try again in a moment.'
+RETRY_AFTER_SECONDS = 5
+
+
+class _Gate:
+    """A counting slot pool for one class in one worker."""
+
+    def __init__(self, limit):
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout):
+        return self._slots.acquire(timeout=timeout)
+
+    def release(self):
+        self._slots.release()
+
+
+class _Ticket:
+    """The slots one request holds; release() is safe to call more than once."""
+
+    def __init__(self, gates):
+        self._gates = gates
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            gates, self._gates = self._gates, []
+        for gate in gates:
+            gate.release()
+
+
+class AdmissionController:
+    def __init__(self, heavy_limit, interactive_limit, wait_seconds):
+        self.wait = max(float(wait_seconds), 0.0)
+        self._gates = {
+            HEAVY: _Gate(heavy_limit) if heavy_limit > 0 else None,
+            INTERACTIVE: _Gate(interactive_limit) if interactive_limit > 0 else None,
+        }
+
+    def admit(self, kind):
+        """Slots for a request of class `kind` as a _Ticket, or None if it is
+        shed. Heavy requests take a heavy slot first, then a general one."""
+        if kind == HEALTH:
+            return _Ticket([])
+        wanted = [self._gates[HEAVY]] if kind == HEAVY else []
+        wanted.append(self._gates[INTERACTIVE])
+        deadline = time.monotonic() + self.wait
+        held = []
+        for gate in wanted:
+            if gate is None:
+                continue
+            if not gate.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                _Ticket(held).release()
+                metrics.admission(kind, 'shed')
+                return None
+            held.append(gate)
+        waited = self.wait - max(deadline - time.monotonic(), 0)
+        metrics.admission(kind, 'queued' if waited > 0.001 else 'ok', wait=waited)
+        return _Ticket(held)
+
+
+def endpoint_class(endpoint=None, blueprint=None):
+    """Admission class of an endpoint (defaults to the current request's)."""
+    if endpoint is None and blueprint is None:
+        endpoint, blueprint = request.endpoint, request.blueprint
+    return ENDPOINT_CLASSES.get(endpoint) or ENDPOINT_CLASSES.get(blueprint) or INTERACTIVE
+
+
+def _shed_response():
+    headers = {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    if request.is_json or '/api/' in request.path:
+        return jsonify({'success': False, 'error': BUSY_MESSAGE}), 503, headers
+    return BUSY_MESSAGE, 503, {**headers, 'Content-Type': 'text/plain; charset=utf-8'}
+
+
+def _controller():
+    return current_app.extensions['admission']
+
+
+def admit_request():
+    """before_request: take this request's slots, or shed it."""
+    ticket = _controller().admit(endpoint_class())
+    if ticket is None:
+        return _shed_response()
+    g._admission_ticket = ticket
+    return None
+
+
+def hand_off(response):
+    """after_request: keep the slots until the body has been sent."""
+    ticket = g.pop('_admission_ticket', None)
+    if ticket is not None:
+        response.call_on_close(ticket.release)
+    return response
+
+
+def release_on_teardown(_exc=None):
+    """teardown_request: release slots after_request never handed off (an
+    exception escaped the view and its error handling)."""
+    ticket = g.pop('_admission_ticket', None)
+    if ticket is not None:
+        ticket.release()
+
+
+def init_app(app):
+    """Install the admission hooks. Call after the metrics before_request hook
+    so shed requests are still timed and counted."""
+    cfg = app.config
+    app.extensions['admission'] = AdmissionController(
+        heavy_limit=int(cfg.get('ADMISSION_HEAVY_LIMIT', 2) or 0),
+        interactive_limit=int(cfg.get('ADMISSION_INTERACTIVE_LIMIT', 3) or 0),
+        wait_seconds=cfg.get('ADMISSION_WAIT_SECONDS', 2),
+    )
+    app.before_request(admit_request)
+    app.after_request(hand_off)
+    app.teardown_request(release_on_teardown)
@@ -7,13 +7,21 @@ import time
 
 from flask import Flask, url_for, session, request, redirect, flash
 from flask_wtf.csrf import CSRFProtect, CSRFError
+from pymongo.errors import ExecutionTimeout
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 from dotenv import load_dotenv
 
 from extensions import mongo, limiter
 from config import get_config
+from assets import asset_url, is_fingerprinted
 from observability import init_sentry
+import admission
+import compression
+import logs
+import metrics
+import rate_budget
+import warmup
 
 load_dotenv()
 
@@ -30,6 +38,10 @@ config_class = get_config()
 app.config.from_object(config_class)
 config_class.init_app(app)
 
+# Structured JSON logging through a queue, so request threads never block on
+# stdout; PHI-safe field allowlist (see logs.py). Before anything logs.
+logs.init_app(app)
+
 # Trust the reverse proxy/proxies in front of us so request.remote_addr is the
 # REAL client IP (from X-Forwarded-For), not the proxy's. Without this, the
 # per-IP rate limiter buckets ALL clients together. Gated on TRUSTED_PROXY_COUNT
@@ -44,7 +56,31 @@ if _trusted_proxies > 0:
         x_host=_trusted_proxies,
     )
 
-mongo.init_app(app)
+# The event listeners feed /admin/metrics: per-request DB time (command
+# listener) and pool checkouts (pool listener). See metrics.py.
+mongo.init_app(app, event_listeners=metrics.mongo_listeners())
+
+
+@app.before_request
+def start_request_metrics():
+    """Start the per-request latency/DB-time clock. Registered before every
+    other before_request hook (CSRFProtect and the limiter included) so the
+    measured time covers them too, and a request they abort with a 400/429 is
+    still counted."""
+    metrics.request_started(request.endpoint)
+
+
+# Opt-in server-side sessions: the cookie carries only an opaque id and the data
+# lives in Mongo (TTL-expired), so responses stop re-sending the whole session.
+if app.config.get('SESSION_BACKEND') == 'mongo':
+    from session_store import MongoSessionInterface
+    app.session_interface = MongoSessionInterface(
+        cache_seconds=app.config.get('SESSION_CACHE_SECONDS', 10),
+    )
+
+# gzip/brotli for HTML/JSON and precompressed static files (see compression.py).
+# Installed before any other after_request hook so it runs last, on the final body.
+compression.init_app(app)
 
 # CSRF protection for all state-changing requests (POST/PUT/PATCH/DELETE).
 # Form posts carry a hidden csrf_token field; fetch() calls send it via the
@@ -68,6 +104,9 @@ from blueprints.routes.reports import reports_bp
 from blueprints.routes.staff import staff_bp
 from blueprints.routes.deletions import deletions_bp
 from blueprints.utils import is_admin
+from blueprints.repositories import dates
+from blueprints.repositories import archive as archive_repo
+from blueprints.repositories import audit_log as audit_repo
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(main_bp)
@@ -104,6 +143,7 @@ def inject_helpers():
 
     return dict(
         safe_url_for=safe_url_for,
+        asset_url=asset_url,
         current_year=datetime.utcnow().year,
         is_admin=is_admin(),
         today=_today,
@@ -115,34 +155,34 @@ def inject_helpers():
 def datefmt(value, fmt='%B %d, %Y'):
     """Format a date value that may be a datetime, an ISO/date string, or None.
 
-    MongoDB stores some records with native datetimes and older/seed records
-    with plain strings. Calling .strftime() directly in templates crashes on
-    the string ones, so route everything through this tolerant filter.
+    Stored dates are canonical (see blueprints/repositories/dates.py), but the
+    filter stays tolerant: one fromisoformat pass, memoised per (value, fmt), and
+    an unparseable string is shown raw rather than crashing the page.
     """
     if value is None or value == '':
         return 'N/A'
-    if isinstance(value, datetime):
-        return value.strftime(fmt)
-    if isinstance(value, str):
-        for parse_fmt in (
-            '%Y-%m-%dT%H:%M:%S.%f',
-            '%Y-%m-%dT%H:%M:%S',
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d',
-        ):
-            try:
-                return datetime.strptime(value, parse_fmt).strftime(fmt)
-            except ValueError:
-                continue
-        return value  # unparseable string — show it raw rather than crash
-    return str(value)
+    return dates.format_date(value, fmt)
+
+
+# Cost-weighted per-user budget for PDFs/reports/downloads; 429 when spent
+# (see rate_budget.py). Before admission so a refused request holds no slot.
+rate_budget.init_app(app)
+
+# Per-class concurrency limits; sheds with 503 + Retry-After (see admission.py).
+# Installed after the metrics clock so shed requests are still counted.
+admission.init_app(app)
+
 
 @app.before_request
 def enforce_idle_timeout():
     """Log a logged-in user out after a period of inactivity. Each request
     refreshes the activity stamp; once the gap exceeds IDLE_TIMEOUT_SECONDS the
     session is cleared and the user is bounced to login. PHI shouldn't stay open
-    on an unattended machine. Skips static assets so they don't reset the timer."""
+    on an unattended machine. Skips static assets so they don't reset the timer.
+
+    The stamp is only rewritten once per ACTIVITY_STAMP_INTERVAL_SECONDS: each
+    write is a session write (Set-Cookie / DB write), and calendar fetches and
+    chart autosaves would otherwise pay it on every call."""
     timeout = app.config.get('IDLE_TIMEOUT_SECONDS') or 0
     if 'user_id' not in session or timeout <= 0:
         return
@@ -154,8 +194,11 @@ def enforce_idle_timeout():
         session.clear()
         flash('You were signed out due to inactivity.', 'info')
         return redirect(url_for('auth.login'))
-    session.permanent = True
-    session['last_activity'] = now
+    if not session.permanent:  # the setter marks the session modified
+        session.permanent = True
+    interval = app.config.get('ACTIVITY_STAMP_INTERVAL_SECONDS') or 0
+    if last is None or now - last >= interval:
+        session['last_activity'] = now
 
 
 @app.after_request
@@ -174,9 +217,10 @@ def add_security_headers(response):
             'max-age=31536000; includeSubDomains'
         )
     # Content-Security-Policy. 'unsafe-inline' is currently required because the
-    # templates use inline <script>/onclick handlers and inline styles; the CDN
-    # host is allowed for Bootstrap/Font Awesome/jQuery. Tightening to remove
-    # 'unsafe-inline' requires moving inline JS to static files (future work).
+    # templates still use inline onclick handlers, style attributes and a few
+    # small inline <script>s (the large base/chart blocks live in static/); the
+    # CDN host is allowed for Bootstrap/Font Awesome/jQuery. Tightening to remove
+    # 'unsafe-inline' requires moving the rest of the inline JS (future work).
     response.headers['Content-Security-Policy'] = (
         "default-src 'self'; "
         "script-src 'self' 'unsafe-inline' https://cdnjs.cloudflare.com; "
@@ -185,16 +229,31 @@ def add_security_headers(response):
         "img-src 'self' data:; "
         "object-src 'none'; base-uri 'self'; frame-ancestors 'none'"
     )
+    # Fingerprinted build outputs (static/dist/, see assets.py) never change
+    # under the same URL: cache them for a year and skip revalidation. Other
+    # static files keep Flask's conditional-GET default — they hold no PHI, so
+    # the no-store below would only force a full re-download per page view.
+    if request.endpoint == 'static':
+        if is_fingerprinted((request.view_args or {}).get('filename', '')):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+            response.headers.pop('Expires', None)
     # Authenticated pages must not be cached (back-button-after-logout fix).
     # The patient-photo route is the one exception: it sets its own private,
     # short-lived cache header so the detail page doesn't re-stream the full
     # image on every view — don't clobber it here.
-    if 'user_id' in session and request.endpoint != 'uploads.patient_photo':
+    elif 'user_id' in session and request.endpoint != 'uploads.patient_photo':
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
     return response
 
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request + observe its latency and DB time (see metrics.py)."""
+    metrics.request_finished(request.endpoint, response.status_code)
+    return response
+
 # ---------------------------------------------------------------------------
 # Error handlers
 # ---------------------------------------------------------------------------
@@ -239,6 +298,17 @@ def handle_csrf_error(error):
     flash('Your session expired or the form was invalid. Please try again.', 'error')
     return _safe_referrer_redirect(), 303
 
+@app.errorhandler(ExecutionTimeout)
+def query_timeout(error):
+    """A read ran past its maxTimeMS budget (blueprints/repositories/query_budget.py).
+    MongoDB already stopped it; tell the user to narrow the request rather than
+    showing a generic 500. Counted in metrics by the command listener."""
+    from flask import render_template, jsonify
+    from blueprints.repositories.query_budget import TIMEOUT_MESSAGE
+    if request.is_json or '/api/' in request.path:
+        return jsonify({'success': False, 'error': TIMEOUT_MESSAGE}), 503
+    return render_template('errors/503.html', message=TIMEOUT_MESSAGE), 503
+
 @app.errorhandler(413)
 def request_too_large(error):
     """Uploaded file exceeded MAX_CONTENT_LENGTH — return to the form with a message."""
@@ -290,26 +360,30 @@ def init_database():
     try:
         mongo.db.users.create_index("email", unique=True)
         mongo.db.users.create_index("license_number")
-        mongo.db.clinics.create_index("owner_id")
-        mongo.db.patients.create_index("clinic_id")
         mongo.db.dental_charts.create_index("patient_id")
         mongo.db.treatment_records.create_index("patient_id")
         mongo.db.prescriptions.create_index("patient_id")
         mongo.db.patient_files.create_index("patient_id")
-        mongo.db.appointments.create_index([("clinic_id", 1), ("date", 1)])
-        mongo.db.appointments.create_index("patient_id")
-        # Multi-staff: staff<->dentist links (access seam reads by user_id).
-        mongo.db.memberships.create_index([("user_id", 1), ("is_active", 1)])
+        # Multi-staff: staff<->dentist links by dentist (staff list, revoke).
         mongo.db.memberships.create_index("dentist_id")
-        # Audit trail: nested viewer reads by dentist, newest-first.
-        mongo.db.audit_log.create_index([("dentist_id", 1), ("timestamp", -1)])
-        mongo.db.audit_log.create_index("timestamp")
+        # Patients, clinics, appointments, memberships: hot reads all filter
+        # is_active: True, so their indexes are partial (soft-deleted rows take
+        # no index space); replaces the plain clinic_id/owner_id/... indexes.
+        archive_repo.ensure_indexes()
+        # Audit trail: one compound per viewer filter (and the dentist scope),
+        # each ending in the (timestamp, _id) keyset sort — see audit_log repo.
+        audit_repo.ensure_indexes()
         # Staff access codes: single-use lookup by hash.
         mongo.db.access_codes.create_index("code_hash")
         mongo.db.access_codes.create_index("dentist_id")
         # Deletion requests: review queue reads by dentist + status.
         mongo.db.deletion_requests.create_index([("dentist_id", 1), ("status", 1)])
         mongo.db.deletion_requests.create_index([("entity_type", 1), ("entity_id", 1)])
+        # Server-side sessions: Mongo deletes each one once expires_at passes.
+        if app.config.get('SESSION_BACKEND') == 'mongo':
+            mongo.db.sessions.create_index("expires_at", expireAfterSeconds=0)
+        # Per-user rate budgets: a bucket is dropped once it has fully refilled.
+        mongo.db.rate_budgets.create_index("expires_at", expireAfterSeconds=0)
 
         if mongo.db.users.count_documents({}) == 0:
             mongo.db.users.insert_one({
@@ -324,9 +398,9 @@ def init_database():
                 "updated_at": datetime.utcnow(),
                 "is_active": True,
             })
-            print(">>> Default admin created  |  admin@dental.com / admin123")
-    except Exception as e:
-        print(f"Database init error: {e}")
+            app.logger.info('default admin created: admin@dental.com / admin123')
+    except Exception:
+        app.logger.exception('database init failed')
 
 
 # ---------------------------------------------------------------------------
@@ -338,6 +412,12 @@ def init_database():
 with app.app_context():
     init_database()
 
+# Worker warm-up: shared Jinja bytecode cache, every template compiled and the
+# PDF/image modules imported before this worker takes its first request, so a
+# --max-requests recycle doesn't hand a cold worker to users (see warmup.py).
+# Last, so every template filter and global is registered.
+warmup.init_app(app)
+
 # ---------------------------------------------------------------------------
 # Main (local development server only)
 # ---------------------------------------------------------------------------
@@ -0,0 +1,195 @@
+# File: MyDentalPortal/assets.py
+# Fingerprinted static assets: static/css/*.css and static/js/*.js are copied to
+# static/dist/<kind>/<name>.<content-hash>.<ext> by `python scripts/build_assets.py`.
+#
+# Why: a fingerprinted URL never changes content, so it can be served with
+# `Cache-Control: public, max-age=31536000, immutable` (see
+# app.add_security_headers) and the browser stops revalidating the chart/base
+# JS+CSS on every page view. An edit produces a new hash, so a new URL — no
+# stale assets after a deploy and no manual cache bumping.
+#
+# Design:
+#   * Templates call asset_url('js/dental_chart.js'); it resolves through
+#     static/dist/manifest.json. In debug mode, or for a file missing from the
+#     manifest, it falls back to the unhashed source so local edits show up
+#     without a rebuild.
+#   * The build output (dist/ + the SHELL list in static/sw.js) is committed:
+#     Render's build step is only `pip install`. tests/test_assets.py fails if it
+#     is stale, so a forgotten rebuild can't reach production.
+#   * Each dist/ file also gets precompressed .br/.gz siblings, served by
+#     compression.send_static_file to clients that accept them.
+#   * The service worker's precache list and cache name are generated from the
+#     same build, so the app shell it caches always matches the deployed files.
+
+import hashlib
+import json
+import os
+
+from flask import current_app, url_for
+
+import compression
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+SOURCES = {'css': '.css', 'js': '.js'}
+DIST = 'dist'
+MANIFEST = f'{DIST}/manifest.json'
+HASH_LENGTH = 10
+# dist/ files at least this big also get .br/.gz siblings (see compression.py).
+PRECOMPRESS_MIN_BYTES = 1024
+
+# Non-fingerprinted files the service worker precaches alongside dist/.
+SHELL_EXTRA = [
+    '/static/offline.html',
+    '/static/icons/icon-192.png',
+    '/static/icons/icon-512.png',
+    '/manifest.webmanifest',
+]
+SW_FILE = 'sw.js'
+SW_BEGIN = '// --- generated by scripts/build_assets.py: do not edit by hand ---'
+SW_END = '// --- end generated ---'
+
+_manifest = None
+
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(STATIC_DIR, MANIFEST), encoding='utf-8') as fh:
+                _manifest = json.load(fh)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(path):
+    """URL for a static source file, e.g. asset_url('css/base.css')."""
+    if not current_app.debug:
+        path = _load_manifest().get(path, path)
+    return url_for('static', filename=path)
+
+
+def is_fingerprinted(filename):
+    """True for a static filename that is a content-hashed build output."""
+    return filename.startswith(f'{DIST}/') and filename != MANIFEST
+
+
+# ── Build ────────────────────────────────────────────────────────────────────
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def _sources(static_dir):
+    for kind, ext in SOURCES.items():
+        folder = os.path.join(static_dir, kind)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(ext):
+                yield f'{kind}/{name}'
+
+
+def _render_sw(sw_text, dist_files, static_dir):
+    """sw.js with its generated CACHE/SHELL block replaced."""
+    shell = [f'/static/{f}' for f in dist_files] + SHELL_EXTRA
+    # The cache name changes whenever any precached file does, so the new worker
+    # installs and its activate handler drops the old cache.
+    content = hashlib.sha256()
+    for url in shell:
+        rel = url[len('/static/'):] if url.startswith('/static/') else url.lstrip('/')
+        with open(os.path.join(static_dir, rel), 'rb') as fh:
+            content.update(url.encode() + b'\0' + fh.read())
+    block = '\n'.join(
+        [SW_BEGIN, f"const CACHE = 'dp-shell-{content.hexdigest()[:HASH_LENGTH]}';",
+         'const SHELL = [']
+        + [f"  '{url}'," for url in shell]
+        + ['];', SW_END]
+    )
+    start, end = sw_text.find(SW_BEGIN), sw_text.find(SW_END)
+    if start < 0 or end < 0:
+        raise ValueError(f'{SW_FILE} is missing the generated-block markers')
+    return sw_text[:start] + block + sw_text[end + len(SW_END):]
+
+
+def _up_to_date(path, data, encoding=None):
+    """True when `path` holds `data` (precompressed siblings: once decoded)."""
+    try:
+        with open(path, 'rb') as fh:
+            current = fh.read()
+        return (compression.decompress(current, encoding) if encoding else current) == data
+    except Exception:  # missing, or not decodable: rebuild it
+        return False
+
+
+def build(static_dir=STATIC_DIR, check=False):
+    """Fingerprint the sources into dist/, precompress them, rewrite the
+    manifest and sw.js.
+
+    Returns the list of paths (relative to static_dir) that were - or, with
+    check=True, would be - written or removed. An empty list means up to date.
+    """
+    global _manifest
+    manifest, outputs, siblings, keep = {}, {}, {}, set()
+    encodings = compression.available_encodings()
+    for src in _sources(static_dir):
+        with open(os.path.join(static_dir, src), 'rb') as fh:
+            data = fh.read()
+        if not data:
+            continue  # a placeholder: nothing to serve, fingerprint or precache
+        stem, ext = os.path.splitext(src)
+        target = f'{DIST}/{stem}.{_digest(data)}{ext}'
+        manifest[src] = target
+        outputs[target] = data
+        if len(data) >= PRECOMPRESS_MIN_BYTES:
+            for encoding, suffix in compression.ENCODINGS.items():
+                if encoding in encodings:
+                    siblings[target + suffix] = (encoding, data)
+                else:
+                    keep.add(target + suffix)  # can't rebuild/verify it here
+    outputs[MANIFEST] = (json.dumps(manifest, indent=2, sort_keys=True) + '\n').encode()
+
+    with open(os.path.join(static_dir, SW_FILE), encoding='utf-8', newline='') as fh:
+        sw_text = fh.read()
+    changed = []
+    dist_dir = os.path.join(static_dir, DIST)
+    existing = set()
+    for root, _, files in os.walk(dist_dir):
+        for name in files:
+            existing.add(os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/'))
+
+    def write(rel, data):
+        changed.append(rel)
+        if not check:
+            path = os.path.join(static_dir, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as fh:
+                fh.write(data)
+
+    for rel, data in outputs.items():
+        if not _up_to_date(os.path.join(static_dir, rel), data):
+            write(rel, data)
+    # Compared decoded, so a different brotli/zlib build doesn't count as stale.
+    for rel, (encoding, data) in siblings.items():
+        if not _up_to_date(os.path.join(static_dir, rel), data, encoding):
+            write(rel, compression.compress(data, encoding, compression.STATIC_LEVELS[encoding]))
+    for rel in sorted(existing - set(outputs) - set(siblings) - keep):
+        changed.append(rel)
+        if not check:
+            os.remove(os.path.join(static_dir, rel))
+
+    # sw.js is rendered after dist/ is written: the cache name hashes the files.
+    if check and changed:
+        changed.append(SW_FILE)
+    else:
+        dist_files = sorted(t for t in outputs if t != MANIFEST)
+        new_sw = _render_sw(sw_text, dist_files, static_dir)
+        if new_sw != sw_text:
+            changed.append(SW_FILE)
+            if not check:
+                with open(os.path.join(static_dir, SW_FILE), 'w', encoding='utf-8', newline='') as fh:
+                    fh.write(new_sw)
+
+    if not check:
+        _manifest = None  # re-read on next asset_url()
+    return changed
@@ -0,0 +1,101 @@
+r"""Measure the per-check cost of the Flask-Limiter storage backends.
+
+Times one rate-limit check (limits' FixedWindowRateLimiter.hit, which is what
+Flask-Limiter runs per limited request) against each storage:
+
+  memory         per-process dict (the old default; not shared by workers)
+  shm            limiter_storage.SharedMemoryStorage, single process
+  shm xN         the same table hammered by N processes at once (lock contention)
+  mongodb        limits' MongoDB storage, only with --mongo-uri
+
+Keys cycle over --keys distinct clients so lookups spread over the table. The
+multi-process run also checks the final counts add up (no lost increments).
+
+Usage:
+    python bench/limiter_storage.py
+    python bench/limiter_storage.py --checks 50000 --procs 8
+    python bench/limiter_storage.py --mongo-uri mongodb://127.0.0.1:27017
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from limits import parse  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import FixedWindowRateLimiter  # noqa: E402
+
+import limiter_storage  # noqa: E402,F401 — registers shm://
+
+LIMIT = parse('1000000/hour')  # never trips: we time the check, not the 429
+
+
+def _time_checks(uri, checks, keys):
+    """Microseconds per hit(); one warm-up pass over the keys first."""
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    for i in range(keys):
+        limiter.hit(LIMIT, f'client-{i}')
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(LIMIT, f'client-{i % keys}')
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def _worker(uri, checks, keys, out):
+    out.put(_time_checks(uri, checks, keys))
+
+
+def _contended(uri, procs, checks, keys):
+    ctx = multiprocessing.get_context('fork')
+    out = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(uri, checks, keys, out)) for _ in range(procs)]
+    for w in workers:
+        w.start()
+    per_check = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+    storage = storage_from_string(uri)
+    total = sum(storage.get(LIMIT.key_for(f'client-{i}')) for i in range(keys))
+    return statistics.median(per_check), total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rate-limit storage per-check overhead.')
+    parser.add_argument('--checks', type=int, default=20000, help='Timed checks per run.')
+    parser.add_argument('--keys', type=int, default=500, help='Distinct client keys.')
+    parser.add_argument('--procs', type=int, default=4, help='Processes for the contended run.')
+    parser.add_argument('--mongo-uri', default=os.environ.get('BENCH_LIMITS_MONGO_URI'))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shm = f'shm://{tmp}/bench.shm'
+        rows = [
+            ('memory', _time_checks('memory://', args.checks, args.keys), ''),
+            ('shm', _time_checks(shm, args.checks, args.keys), ''),
+        ]
+        storage_from_string(shm).reset()
+        per_check, total = _contended(shm, args.procs, args.checks, args.keys)
+        expected = args.procs * (args.checks + args.keys)
+        rows.append((f'shm x{args.procs}', per_check,
+                     'counts ok' if total == expected else f'LOST {expected - total} increments'))
+    if args.mongo_uri:
+        uri = args.mongo_uri
+        storage_from_string(uri).reset()
+        rows.append(('mongodb', _time_checks(uri, min(args.checks, 2000), args.keys), ''))
+
+    print(f'{args.checks} checks over {args.keys} keys, per check:\n')
+    print(f'{"storage":<10} {"µs":>9}')
+    for name, us, note in rows:
+        print(f'{name:<10} {us:>9.1f}  {note}')
+    return 0 if all(not note.startswith('LOST') for _, _, note in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,287 @@
+r"""Repository + route benchmarks against scaled, deterministic fixtures.
+
+The pytest suite (tests/) proves correctness on tiny mongomock fixtures; it can't
+tell us that the patient list takes 4 s on a clinic with 80k patients. This
+runner seeds a LOCAL mongod with scripts/seed_demo.py --scale data at a chosen
+size, then times the hot paths against per-size budgets:
+
+  * repository calls — patients.get_for_accessor, clinics.accessible_ids,
+    appointments.find_in_range, treatments.find_for_clinics,
+    audit_log.find_page (keyset)
+  * heavy routes via the Flask test client — dashboard, patient list + search,
+    patient detail, reports range=all, calendar API
+
+Every case runs as the admin, who owns clinic 0 — the largest tenant in the
+scale data, i.e. the worst case. Results are written as JSON (one file per run,
+named by git commit) so runs can be compared across commits with --compare.
+
+⚠️  Seeds + reads a real database. The target DB name must contain "demo" (the
+    seed_demo guard); never point this at Atlas prod.
+
+Usage:
+    # needs a local mongod (e.g. docker run -d -p 27017:27017 mongo:7)
+    python bench/run.py --size small
+    python bench/run.py --size large --workers 4          # 2M treatments
+    python bench/run.py --size small --compare bench/results/<older>.json
+
+Exit code 0 when every case is within budget, 1 otherwise (--no-fail: always 0).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_URI = 'mongodb://127.0.0.1:27017/dental_portal_demo_bench'
+RESULTS_DIR = os.path.join(HERE, 'results')
+
+# Fixture sizes. 'large' is production scale (the seed_demo --scale defaults).
+SIZES = {
+    'small': {'clinics': 10, 'patients': 20_000, 'treatments': 200_000,
+              'appointments': 50_000, 'audit_log': 100_000},
+    'medium': {'clinics': 25, 'patients': 80_000, 'treatments': 800_000,
+               'appointments': 200_000, 'audit_log': 400_000},
+    'large': {'clinics': 50, 'patients': 200_000, 'treatments': 2_000_000,
+              'appointments': 500_000, 'audit_log': 1_000_000},
+}
+SEED = 42
+# A fixed "today" so every run (and every machine) sees the same data window.
+ANCHOR = '2026-06-15'
+
+
+# ── fixtures ─────────────────────────────────────────────────────────────────
+def _ensure_fixture(db, uri, size, workers, reseed):
+    """Seed the scale data unless this exact fixture is already loaded."""
+    wanted = {'_id': 'fixture', 'size': size, 'seed': SEED, 'anchor': ANCHOR,
+              'counts': SIZES[size]}
+    if not reseed and db.bench_meta.find_one({'_id': 'fixture'}) == wanted:
+        print(f'Fixture "{size}" already loaded — reusing (--reseed to rebuild).')
+        return
+    import seed_demo
+    os.environ['MONGO_URI'] = uri
+    argv = ['--scale', '--seed', str(SEED), '--anchor', ANCHOR,
+            '--workers', str(workers)]
+    for name, n in SIZES[size].items():
+        argv += [f'--{name.replace("_", "-")}', str(n)]
+    if seed_demo.main(argv) != 0:
+        raise SystemExit('Seeding failed.')
+    db.bench_meta.replace_one({'_id': 'fixture'}, wanted, upsert=True)
+
+
+def _targets(db):
+    """Ids the cases run against: the admin, their clinics, and a patient with a
+    long treatment history in the largest clinic."""
+    admin = db.users.find_one({'email': 'admin@dental.com'})
+    admin_id = str(admin['_id'])
+    clinic_ids = [c['_id'] for c in db.clinics.find(
+        {'owner_id': admin_id, 'is_active': True}, {'_id': 1})]
+    heavy = next(db.treatment_records.aggregate([
+        {'$match': {'clinic_id': {'$in': clinic_ids}}},
+        {'$limit': 20_000},
+        {'$group': {'_id': '$patient_id', 'n': {'$sum': 1}}},
+        {'$sort': {'n': -1}}, {'$limit': 1},
+    ]))
+    name = db.patients.find_one({'_id': heavy['_id']})['personal_info']['last_name']
+    return {'admin': admin, 'admin_id': admin_id, 'clinic_ids': clinic_ids,
+            'patient_id': str(heavy['_id']), 'search': name[:4]}
+
+
+# ── cases ────────────────────────────────────────────────────────────────────
+def _repo_cases(t):
+    from blueprints.repositories import patients as patient_repo
+    from blueprints.repositories import clinics as clinic_repo
+    from blueprints.repositories import appointments as appt_repo
+    from blueprints.repositories import treatments as treatment_repo
+    from blueprints.repositories import audit_log as audit_repo
+
+    anchor = datetime.strptime(ANCHOR, '%Y-%m-%d')
+    week_start = (anchor - timedelta(days=anchor.weekday())).strftime('%Y-%m-%d')
+    week_end = (anchor + timedelta(days=6 - anchor.weekday())).strftime('%Y-%m-%d')
+    month_start = anchor.replace(day=1).strftime('%Y-%m-%d')
+    month_end = (anchor.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    report_fields = {'date': 1, 'amount_charged': 1, 'amount_paid': 1,
+                     'balance': 1, 'procedure': 1, 'status': 1}
+    audit_query = audit_repo.build_query(dentist_id=t['admin_id'])
+    # The viewer reaches page 20 through the previous pages' cursors; walk
+    # there once, outside the timing, and time only the last seek.
+    page20, cursor = None, None
+    for _ in range(19):
+        _, cursor = audit_repo.find_page(audit_query, before=page20, limit=50)
+        page20 = audit_repo.decode_cursor(cursor)
+    return {
+        'repo.patients.get_for_accessor':
+            lambda: patient_repo.get_for_accessor(t['patient_id'], t['admin_id']),
+        'repo.clinics.accessible_ids':
+            lambda: clinic_repo.accessible_ids(t['admin_id']),
+        'repo.appointments.find_in_range.week':
+            lambda: appt_repo.find_in_range(t['clinic_ids'], None, week_start, week_end),
+        'repo.appointments.find_in_range.month':
+            lambda: appt_repo.find_in_range(t['clinic_ids'], None, month_start,
+                                            month_end.strftime('%Y-%m-%d')),
+        'repo.treatments.find_for_clinics.all':
+            lambda: treatment_repo.find_for_clinics(t['clinic_ids'], fields=report_fields),
+        'repo.audit_log.find_page':
+            lambda: audit_repo.find_page(audit_query, limit=50),
+        'repo.audit_log.find_page.page20':
+            lambda: audit_repo.find_page(audit_query, before=page20, limit=50),
+    }
+
+
+def _route_cases(client, t):
+    anchor = datetime.strptime(ANCHOR, '%Y-%m-%d')
+    month_start = anchor.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    def get(url):
+        def _call():
+            resp = client.get(url)
+            if resp.status_code != 200:
+                raise RuntimeError(f'GET {url} -> {resp.status_code}')
+            return resp
+        return _call
+
+    return {
+        'route.dashboard': get('/dashboard'),
+        'route.patients.list': get('/patients'),
+        'route.patients.list.search': get(f'/patients?search={t["search"]}'),
+        'route.patients.detail': get(f'/patients/{t["patient_id"]}'),
+        'route.reports.all': get('/reports?range=all'),
+        'route.appointments.api.month': get(
+            f'/appointments/api?start_date={month_start:%Y-%m-%d}'
+            f'&end_date={month_end:%Y-%m-%d}'),
+    }
+
+
+def _time(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 2),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        'min_ms': round(samples[0], 2),
+        'max_ms': round(samples[-1], 2),
+        'samples': len(samples),
+    }
+
+
+# ── reporting ────────────────────────────────────────────────────────────────
+def _git_sha():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _print_table(results, previous=None):
+    print(f'\n{"case":<42} {"median":>9} {"p95":>9} {"budget":>8}  status')
+    for name, r in results.items():
+        line = (f'{name:<42} {r["median_ms"]:>7.1f}ms {r["p95_ms"]:>7.1f}ms '
+                f'{r["budget_ms"] or "-":>6}ms  {"OK" if r["ok"] else "OVER"}')
+        old = (previous or {}).get(name)
+        if old:
+            delta = (r['median_ms'] - old['median_ms']) / max(old['median_ms'], 1e-6) * 100
+            line += f'  ({delta:+.0f}% vs {old["median_ms"]:.1f}ms)'
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MyDentalPortal benchmark suite.')
+    parser.add_argument('--uri', default=os.environ.get('BENCH_MONGO_URI', DEFAULT_URI),
+                        help=f'Local MongoDB URI with a *demo* db name (default {DEFAULT_URI}).')
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--repeat', type=int, default=15, help='Timed runs per case.')
+    parser.add_argument('--workers', type=int, default=1, help='Seeding worker processes.')
+    parser.add_argument('--reseed', action='store_true', help='Rebuild the fixture.')
+    parser.add_argument('--only', default='', help='Run only cases containing this text.')
+    parser.add_argument('--out', default=None, help='Result JSON path.')
+    parser.add_argument('--compare', default=None, help='Earlier result JSON to diff against.')
+    parser.add_argument('--no-fail', action='store_true', help='Exit 0 even if over budget.')
+    args = parser.parse_args(argv)
+
+    from pymongo import MongoClient
+    mc = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    db = mc.get_default_database()
+    if db is None or 'demo' not in db.name.lower():
+        raise SystemExit('REFUSING: --uri must name a *demo* database.')
+    mc.admin.command('ping')
+    _ensure_fixture(db, args.uri, args.size, args.workers, args.reseed)
+
+    # Import the real app AFTER seeding: its startup builds the production
+    # indexes on this database, exactly as a deploy would.
+    os.environ['MONGO_URI'] = args.uri
+    os.environ.setdefault('FLASK_ENV', 'development')
+    from app import app
+    app.config.update(TESTING=True)
+    t = _targets(db)
+
+    with open(os.path.join(HERE, 'budgets.json'), encoding='utf-8') as fh:
+        budgets = json.load(fh).get(args.size, {})
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = t['admin_id']
+        sess['user_email'] = t['admin']['email']
+        sess['user_name'] = t['admin'].get('name', 'Admin')
+        sess['user_role'] = t['admin'].get('role', 'admin')
+
+    results = {}
+    with app.app_context():
+        cases = {**_repo_cases(t), **_route_cases(client, t)}
+        for name, fn in cases.items():
+            if args.only and args.only not in name:
+                continue
+            r = _time(fn, args.repeat)
+            r['budget_ms'] = budgets.get(name)
+            r['ok'] = r['budget_ms'] is None or r['median_ms'] <= r['budget_ms']
+            results[name] = r
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fh:
+            previous = json.load(fh).get('results', {})
+    _print_table(results, previous)
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    sha = _git_sha()
+    out = args.out or os.path.join(RESULTS_DIR, f'{stamp}-{sha}-{args.size}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as fh:
+        json.dump({
+            'meta': {
+                'git_sha': sha, 'created_utc': stamp, 'size': args.size,
+                'counts': SIZES[args.size], 'seed': SEED, 'anchor': ANCHOR,
+                'repeat': args.repeat, 'python': platform.python_version(),
+                'mongod': mc.server_info().get('version'),
+                'host': platform.node(),
+            },
+            'results': results,
+        }, fh, indent=2)
+    print(f'\nResults written to {out}')
+
+    over = [n for n, r in results.items() if not r['ok']]
+    if over:
+        print(f'OVER BUDGET: {", ".join(over)}')
+        return 0 if args.no_fail else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
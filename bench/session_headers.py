@@ -0,0 +1,116 @@
+r"""Measure the session cookie / response-header bytes per request.
+
+Replays one simulated working session — log in, then a request every few
+seconds (calendar fetches + dashboard) for ten minutes — through the real app
+under three session setups, and reports what crosses the wire per request:
+
+  before         signed-cookie session, activity stamp written on every
+                 request, cookie refreshed on every request (the old behaviour)
+  cookie         signed-cookie session, stamp throttled to
+                 ACTIVITY_STAMP_INTERVAL_SECONDS (the new default)
+  mongo          SESSION_BACKEND=mongo: opaque-id cookie, data server-side
+
+Time is simulated (the idle-timeout clock is patched), so the run takes
+seconds. Uses the same local demo database as bench/run.py; it only needs the
+default admin user that the app creates on startup.
+
+Usage:
+    python bench/session_headers.py
+    python bench/session_headers.py --minutes 30 --every 2
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_URI = 'mongodb://127.0.0.1:27017/dental_portal_demo_bench'
+
+
+class _Clock:
+    """Stand-in for the `time` module inside app.py (idle-timeout clock)."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+
+def _header_bytes(headers):
+    return sum(len(k) + len(v) + 4 for k, v in headers.items())  # "k: v\r\n"
+
+
+def _run(app_module, setup, minutes, every):
+    from flask.sessions import SecureCookieSessionInterface
+    from session_store import MongoSessionInterface
+
+    app = app_module.app
+    app.config.update(
+        ACTIVITY_STAMP_INTERVAL_SECONDS=0 if setup == 'before' else 60,
+        SESSION_REFRESH_EACH_REQUEST=setup == 'before',
+    )
+    app.session_interface = (MongoSessionInterface(app.config['SESSION_CACHE_SECONDS'])
+                             if setup == 'mongo' else SecureCookieSessionInterface())
+    if setup == 'mongo':
+        app_module.mongo.db.sessions.create_index('expires_at', expireAfterSeconds=0)
+
+    clock = _Clock(1_800_000_000)
+    app_module.time = clock
+    client = app.test_client()
+    client.get('/login')
+    client.post('/login', data={'email': 'admin@dental.com', 'password': 'admin123'})
+
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    totals = {'requests': 0, 'set_cookie': 0, 'set_cookie_bytes': 0,
+              'header_bytes': 0, 'cookie_bytes': 0}
+    urls = ['/appointments/api?start_date=2026-06-01&end_date=2026-06-30'] * 4 + ['/dashboard']
+    for i in range(int(minutes * 60 / every)):
+        clock.now += every
+        cookie = client.get_cookie(cookie_name)
+        resp = client.get(urls[i % len(urls)])
+        if resp.status_code >= 500:
+            raise SystemExit(f'{setup}: GET {urls[i % len(urls)]} -> {resp.status_code}')
+        set_cookies = resp.headers.getlist('Set-Cookie')
+        totals['requests'] += 1
+        totals['set_cookie'] += len(set_cookies)
+        totals['set_cookie_bytes'] += sum(len('Set-Cookie: ') + len(c) + 2 for c in set_cookies)
+        totals['header_bytes'] += _header_bytes(resp.headers)
+        totals['cookie_bytes'] += len(f'Cookie: {cookie_name}={cookie.value}\r\n') if cookie else 0
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Session header bytes per request.')
+    parser.add_argument('--uri', default=os.environ.get('BENCH_MONGO_URI', DEFAULT_URI))
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--every', type=float, default=5, help='Seconds between requests.')
+    args = parser.parse_args(argv)
+
+    os.environ['MONGO_URI'] = args.uri
+    os.environ.setdefault('FLASK_ENV', 'development')
+    import app as app_module
+    app_module.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+    results = {setup: _run(app_module, setup, args.minutes, args.every)
+               for setup in ('before', 'cookie', 'mongo')}
+
+    base = results['before']
+    print(f'{args.minutes:g} min, one request every {args.every:g}s '
+          f'({base["requests"]} requests), per request:\n')
+    print(f'{"setup":<8} {"Set-Cookie":>10} {"Set-Cookie B":>13} {"resp hdr B":>11} '
+          f'{"req Cookie B":>13} {"total B":>8} {"saved":>7}')
+    base_total = (base['header_bytes'] + base['cookie_bytes']) / base['requests']
+    for setup, t in results.items():
+        n = t['requests']
+        total = (t['header_bytes'] + t['cookie_bytes']) / n
+        print(f'{setup:<8} {t["set_cookie"] / n:>10.2f} {t["set_cookie_bytes"] / n:>13.0f} '
+              f'{t["header_bytes"] / n:>11.0f} {t["cookie_bytes"] / n:>13.0f} {total:>8.0f} '
+              f'{(1 - total / base_total) * 100:>6.0f}%')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# File: MyDentalPortal/blueprints/repositories/access_cache.py
+# Per-worker cache of each user's access set: owner ids (memberships) and
+# accessible clinic ids, shared across requests.
+#
+# Why: nearly every authenticated route scopes by clinics.accessible_ids, and
+# each of those is a memberships find + a clinics find. The answer only changes
+# when a membership or clinic is created/revoked, which is rare.
+#
+# Design:
+#   * One LRU per worker process: (kind, user_id) -> (stamp, value, fetched_at),
+#     trusted for ACCESS_CACHE_SECONDS (0 disables the cache).
+#   * Cross-worker convergence: a single stamp document
+#     ({_id: 'access', v: n} in `cache_versions`) is $inc'd after every write
+#     that can change an answer (changed() below). Each request reads the stamp
+#     once (an _id point read, memoized on g) and ignores entries filled under
+#     an older stamp — so a revocation on one worker is honoured by every worker
+#     on its very next request, not after the TTL.
+#   * Ordering keeps it safe under races: the stamp is read BEFORE the access
+#     query, and bumped AFTER the write. A value loaded concurrently with a write
+#     is therefore always filed under the pre-write stamp and never served once
+#     the bump is visible.
+#   * The TTL is only a backstop for writes that bypass the repositories
+#     (seed scripts, manual edits in the shell).
+#   * Values are ids only (str owner ids, ObjectId clinic ids) — no PHI.
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+import metrics
+from extensions import mongo
+from blueprints.repositories import request_cache
+
+COLLECTION = 'cache_versions'
+STAMP_ID = 'access'
+DEFAULT_TTL_SECONDS = 30
+CACHE_SIZE = 10_000
+
+
+class _Cache:
+    """Thread-safe LRU of key -> (stamp, value, fetched_at)."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key, stamp, ttl):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            item_stamp, value, fetched_at = item
+            if item_stamp != stamp or time.monotonic() - fetched_at > ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, stamp, value):
+        with self._lock:
+            self._items[key] = (stamp, value, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _Cache()
+
+
+def _ttl():
+    if not has_app_context():
+        return 0  # scripts / startup: always read through
+    return current_app.config.get('ACCESS_CACHE_SECONDS', DEFAULT_TTL_SECONDS)
+
+
+@request_cache.memoize('access_stamp')
+def current_stamp():
+    """The cluster-wide access stamp (0 before the first change)."""
+    doc = mongo.db[COLLECTION].find_one({'_id': STAMP_ID}, {'v': 1})
+    return doc['v'] if doc else 0
+
+
+def lookup(kind, user_id, load):
+    """``load()``'s answer for (kind, user_id), from the cache while it is
+    current. ``load`` must return a list of ids; a fresh list is returned."""
+    ttl = _ttl()
+    if ttl <= 0:
+        return load()
+    key = (kind, user_id)
+    stamp = current_stamp()
+    value = _cache.get(key, stamp, ttl)
+    if value is not None:
+        metrics.access_cache(kind, 'hit')
+        return list(value)
+    metrics.access_cache(kind, 'miss')
+    value = tuple(load())
+    _cache.put(key, stamp, value)
+    return list(value)
+
+
+def changed():
+    """Call AFTER a write that can change who may access which clinic: bumps
+    the stamp for every worker and drops this worker's (and this request's)
+    cached answers."""
+    mongo.db[COLLECTION].update_one({'_id': STAMP_ID}, {'$inc': {'v': 1}}, upsert=True)
+    _cache.clear()
+    request_cache.invalidate()
+
+
+def clear():
+    """Drop this worker's cached answers (tests)."""
+    _cache.clear()
@@ -17,6 +17,7 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import query_budget
 
 DEFAULT_TTL_DAYS = 7
 
@@ -63,7 +64,8 @@ def consume(code, used_by):
 def list_for_dentist(dentist_id):
     """All of a dentist's codes, newest first (metadata only — never the code)."""
     return list(
-        mongo.db.access_codes.find({'dentist_id': dentist_id}).sort('created_at', -1)
+        mongo.db.access_codes.find({'dentist_id': dentist_id}, max_time_ms=query_budget.ms())
+        .sort('created_at', -1)
     )
 
 
@@ -9,6 +9,7 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import dates, query_budget
 
 
 def get(appt_id):
@@ -31,7 +32,8 @@ def find_in_range(clinic_ids, clinic_filter, start, end):
     else:
         query['clinic_id'] = {'$in': clinic_ids}
     query['date'] = {'$gte': start, '$lte': end}
-    return list(mongo.db.appointments.find(query).sort([('date', 1), ('time', 1)]))
+    return list(mongo.db.appointments.find(query, max_time_ms=query_budget.ms())
+        .sort([('date', 1), ('time', 1)]))
 
 
 def find_active_on_day(clinic_id, date, exclude_id=None):
@@ -47,7 +49,7 @@ def find_active_on_day(clinic_id, date, exclude_id=None):
     }
     if exclude_id:
         query['_id'] = {'$ne': ObjectId(exclude_id)}
-    return list(mongo.db.appointments.find(query))
+    return list(mongo.db.appointments.find(query, max_time_ms=query_budget.ms()))
 
 
 def find_active_on_date(clinic_ids, date):
@@ -59,7 +61,7 @@ def find_active_on_date(clinic_ids, date):
             'date': date,
             'is_active': True,
             'status': {'$ne': 'cancelled'},
-        }).sort('time', 1)
+        }, max_time_ms=query_budget.ms()).sort('time', 1)
     )
 
 
@@ -73,7 +75,17 @@ def find_upcoming(clinic_ids, start, end, limit=10):
             'date': {'$gte': start, '$lte': end},
             'is_active': True,
             'status': {'$ne': 'cancelled'},
-        }).sort([('date', 1), ('time', 1)]).limit(limit)
+        }, max_time_ms=query_budget.ms()).sort([('date', 1), ('time', 1)]).limit(limit)
+    )
+
+
+def recent_for_patient(patient_id, limit=10):
+    """A patient's active appointments, latest first (patient detail)."""
+    return list(
+        mongo.db.appointments.find({
+            'patient_id': ObjectId(patient_id),
+            'is_active': True,
+        }, max_time_ms=query_budget.ms()).sort([('date', -1), ('time', -1)]).limit(limit)
     )
 
 
@@ -85,19 +97,22 @@ def count_active_in_range(clinic_ids, start, end):
         'date': {'$gte': start, '$lte': end},
         'is_active': True,
         'status': {'$ne': 'cancelled'},
-    })
+    }, **query_budget.kwargs())
 
 
 def insert(doc):
-    """Insert an appointment document; return the new _id (str)."""
+    """Insert an appointment document (dates made canonical); return the new _id (str)."""
+    dates.normalize(doc, dates.DAY_FIELDS['appointments'])
     return str(mongo.db.appointments.insert_one(doc).inserted_id)
 
 
 def update_set(appt_id, fields):
-    """Apply a ``$set`` to one appointment."""
+    """Apply a ``$set`` to one appointment, stamping updated_at (unless the
+    caller sets it) for incremental backups."""
+    dates.normalize(fields, dates.DAY_FIELDS['appointments'])
     return mongo.db.appointments.update_one(
         {'_id': ObjectId(appt_id)},
-        {'$set': fields},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
     )
 
 
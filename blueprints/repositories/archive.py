@@ -0,0 +1,213 @@
+# File: MyDentalPortal/blueprints/repositories/archive.py
+# Soft-deleted records: the partial indexes that keep them out of the hot
+# indexes, and the cold `<collection>_archive` collections they move to.
+#
+# Patients, clinics, appointments and staff memberships are soft-deleted
+# (is_active=False), and every hot read filters `is_active: True`.
+#
+# PARTIAL INDEXES: PARTIAL_INDEXES backs each hot query shape with an index
+# whose partialFilterExpression is {is_active: true}, so inactive documents take
+# no index space. MongoDB only uses such an index when the query filter
+# includes `is_active: True`, which every listed shape does. SUPERSEDED_INDEXES
+# names the plain indexes they replace. ensure_indexes() builds the new ones
+# first and then drops those.
+#
+# ARCHIVE: archive_inactive() moves documents that have been inactive since
+# before a cutoff (KINDS names the field stamped on soft delete) into
+# `<collection>_archive` (scripts/archive_inactive.py, run on a schedule).
+#   * Copy-then-delete per batch, like the audit archive, so an interrupted
+#     run loses nothing. A record reactivated mid-run stays hot (the delete
+#     re-checks is_active) and its archive copy is removed again.
+#   * A clinic that still has active patients or appointments stays hot.
+#   * Archived records keep their _id and every field, plus `archived_at`,
+#     which is a change marker for scripts/backup_data.py --incremental. Audit
+#     entries still name them by id, get() still finds them, and each move is
+#     audited ('archive' / 'restore', actor_role 'system').
+#   * restore() moves one record back unchanged (still inactive). Reactivating
+#     it is an ordinary edit.
+
+from datetime import datetime
+
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+from pymongo.errors import OperationFailure
+
+from extensions import mongo
+from blueprints.repositories import audit_log as audit_repo
+
+DEFAULT_INACTIVE_DAYS = 365
+ARCHIVE_SUFFIX = '_archive'
+ACTIVE = {'is_active': True}
+
+# collection -> (audit entity_type, field stamped when it was soft-deleted)
+KINDS = {
+    'patients': ('patient', 'updated_at'),
+    'clinics': ('clinic', 'updated_at'),
+    'appointments': ('appointment', 'deleted_at'),
+    'memberships': ('membership', 'revoked_at'),
+}
+
+# (collection, keys, name); each is created with partialFilterExpression ACTIVE.
+PARTIAL_INDEXES = [
+    # Patient list (name sort) and dropdowns, clinic-scoped.
+    ('patients', [('clinic_id', ASCENDING), ('personal_info.last_name', ASCENDING),
+                  ('personal_info.first_name', ASCENDING)], 'active_clinic_name'),
+    # Patient list (newest/oldest), dashboard "recent", reports "new patients".
+    ('patients', [('clinic_id', ASCENDING), ('created_at', DESCENDING)], 'active_clinic_created'),
+    # Owned / accessible clinic lists, sorted by name.
+    ('clinics', [('owner_id', ASCENDING), ('name', ASCENDING)], 'active_owner_name'),
+    # Calendar, day overlap check, dashboard today/upcoming/this week.
+    ('appointments', [('clinic_id', ASCENDING), ('date', ASCENDING), ('time', ASCENDING)],
+     'active_clinic_date_time'),
+    # Patient detail "recent appointments".
+    ('appointments', [('patient_id', ASCENDING), ('date', DESCENDING), ('time', DESCENDING)],
+     'active_patient_date_time'),
+    # Staff access seam: a user's active memberships.
+    ('memberships', [('user_id', ASCENDING)], 'active_user'),
+]
+
+# Plain indexes the partial ones replace: (collection, index name).
+SUPERSEDED_INDEXES = [
+    ('patients', 'clinic_id_1'),
+    ('clinics', 'owner_id_1'),
+    ('appointments', 'clinic_id_1_date_1'),
+    ('appointments', 'patient_id_1'),
+    ('memberships', 'user_id_1_is_active_1'),
+]
+
+
+def ensure_indexes():
+    """Create PARTIAL_INDEXES, then drop SUPERSEDED_INDEXES (idempotent)."""
+    for collection, keys, name in PARTIAL_INDEXES:
+        mongo.db[collection].create_index(keys, name=name, partialFilterExpression=ACTIVE)
+    for collection, name in SUPERSEDED_INDEXES:
+        try:
+            mongo.db[collection].drop_index(name)
+        except OperationFailure:
+            pass  # already gone (or never built on this database)
+
+
+def archive_name(collection):
+    return collection + ARCHIVE_SUFFIX
+
+
+def _ensure_archive(name, compressor):
+    if not compressor or name in mongo.db.list_collection_names(filter={'name': name}):
+        return
+    try:
+        mongo.db.create_collection(name, storageEngine={
+            'wiredTiger': {'configString': f'block_compressor={compressor}'},
+        })
+    except OperationFailure:
+        pass  # tier doesn't allow storage options (or it was just created)
+
+
+def inactive_query(collection, cutoff):
+    """Documents of `collection` inactive since before `cutoff`. Records from
+    before the soft-delete stamp existed fall back to their created_at."""
+    stamp = KINDS[collection][1]
+    return {'is_active': False, '$or': [
+        {stamp: {'$lt': cutoff}},
+        {stamp: {'$exists': False}, 'created_at': {'$lt': cutoff}},
+    ]}
+
+
+def _still_referenced(collection, docs):
+    """_ids in `docs` that must stay hot: clinics with active patients or
+    appointments (their pages and scopes still resolve the clinic)."""
+    if collection != 'clinics':
+        return set()
+    ids = [d['_id'] for d in docs]
+    held = set(mongo.db.patients.distinct('clinic_id', {'clinic_id': {'$in': ids}, **ACTIVE}))
+    held |= set(mongo.db.appointments.distinct('clinic_id', {'clinic_id': {'$in': ids}, **ACTIVE}))
+    return held
+
+
+def _owners(clinic_ids):
+    """clinic _id -> owner_id, from hot and archived clinics."""
+    owners = {}
+    for coll in (mongo.db.clinics, mongo.db[archive_name('clinics')]):
+        for c in coll.find({'_id': {'$in': list(clinic_ids)}}, {'owner_id': 1}):
+            owners.setdefault(c['_id'], c.get('owner_id'))
+    return owners
+
+
+def _audit(action, collection, docs):
+    entity_type = KINDS[collection][0]
+    owners = _owners({d['clinic_id'] for d in docs if d.get('clinic_id')})
+    for d in docs:
+        if collection == 'clinics':
+            clinic_id, dentist_id = d['_id'], d.get('owner_id')
+        elif collection == 'memberships':
+            clinic_id, dentist_id = None, d.get('dentist_id')
+        else:
+            clinic_id = d.get('clinic_id')
+            dentist_id = owners.get(clinic_id)
+        audit_repo.record(action, entity_type, d['_id'], actor_role='system',
+                          clinic_id=clinic_id, dentist_id=dentist_id)
+
+
+def archive_inactive(collection, cutoff, batch_size=500, compressor='zstd'):
+    """Move `collection`'s documents inactive since before `cutoff` into its
+    archive. Returns (moved, held_back)."""
+    hot, cold = mongo.db[collection], mongo.db[archive_name(collection)]
+    _ensure_archive(cold.name, compressor)
+    query = inactive_query(collection, cutoff)
+    moved = held_back = 0
+    last_id = None
+    while True:
+        page = dict(query) if last_id is None else {**query, '_id': {'$gt': last_id}}
+        batch = list(hot.find(page).sort('_id', ASCENDING).limit(batch_size))
+        if not batch:
+            return moved, held_back
+        last_id = batch[-1]['_id']
+        keep = _still_referenced(collection, batch)
+        docs = [d for d in batch if d['_id'] not in keep]
+        held_back += len(batch) - len(docs)
+        if not docs:
+            continue
+        now = datetime.utcnow()
+        for d in docs:
+            d['archived_at'] = now
+        cold.bulk_write([ReplaceOne({'_id': d['_id']}, d, upsert=True) for d in docs],
+                        ordered=False)
+        ids = [d['_id'] for d in docs]
+        hot.delete_many({'_id': {'$in': ids}, 'is_active': False})
+        revived = {d['_id'] for d in hot.find({'_id': {'$in': ids}}, {'_id': 1})}
+        if revived:  # reactivated between the read and the delete
+            cold.delete_many({'_id': {'$in': list(revived)}})
+            docs = [d for d in docs if d['_id'] not in revived]
+        _audit('archive', collection, docs)
+        moved += len(docs)
+
+
+def get(collection, record_id):
+    """One archived record by id, or None for a missing/malformed id."""
+    try:
+        return mongo.db[archive_name(collection)].find_one({'_id': ObjectId(record_id)})
+    except (InvalidId, TypeError):
+        return None
+
+
+def restore(collection, record_id):
+    """Move one archived record back to `collection` as it was (still
+    inactive). Returns True if it was in the archive."""
+    doc = get(collection, record_id)
+    if doc is None:
+        return False
+    doc.pop('archived_at', None)
+    doc['restored_at'] = datetime.utcnow()  # incremental-backup change marker
+    mongo.db[collection].replace_one({'_id': doc['_id']}, doc, upsert=True)
+    mongo.db[archive_name(collection)].delete_one({'_id': doc['_id']})
+    _audit('restore', collection, [doc])
+    return True
+
+
+def counts(cutoff):
+    """{collection: (inactive past the cutoff, already archived)} for dry runs."""
+    return {
+        c: (mongo.db[c].count_documents(inactive_query(c, cutoff)),
+            mongo.db[archive_name(c)].estimated_document_count())
+        for c in KINDS
+    }
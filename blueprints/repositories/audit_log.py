@@ -10,10 +10,61 @@
 # `dentist_id` (the owning clinic's owner) is denormalised onto each entry so the
 # nested viewer (PR F) can group by dentist cheaply: staff see none, a dentist
 # sees their own clinics' activity, an admin sees all grouped by dentist.
+#
+# RETENTION: the hot collection only keeps the last AUDIT_RETENTION_DAYS.
+# Older entries are moved (scripts/archive_audit.py -> archive_before) into one
+# collection per calendar month, `audit_archive_YYYY_MM`, created with zstd
+# block compression where the server allows it. Archives are append-only and
+# read on demand (find_page(month=...)), never by the default viewer.
+#
+# VIEWER: find_page filters on action / entity_type / entity_id / actor / a
+# timestamp range and pages by keyset on (timestamp, _id) — each page is an
+# index seek, not a skip over every earlier page. INDEXES backs each filter
+# with a compound ending in the sort key, so the sort is never done in memory:
+# (field, sort) for the admin's unscoped view and (dentist_id, field, sort) for
+# a dentist's, plus (dentist_id, sort) and (sort) for the unfiltered ones.
+# ensure_indexes() builds them and drops the timestamp-only ones they replace.
+
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
 
-from datetime import datetime
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError, OperationFailure
 
 from extensions import mongo
+from blueprints.repositories import query_budget
+
+DEFAULT_RETENTION_DAYS = 180
+ARCHIVE_PREFIX = 'audit_archive_'
+_ARCHIVE_NAME = re.compile(r'^audit_archive_(\d{4})_(\d{2})$')
+_DUPLICATE_KEY = 11000
+
+# Newest-first sort key for the viewer; every index below ends with it.
+SORT = [('timestamp', DESCENDING), ('_id', DESCENDING)]
+FILTER_FIELDS = ('action', 'entity_type', 'entity_id', 'actor_user_id')
+INDEXES = (
+    [('dentist_id', 1), *SORT],
+    SORT,
+    *([(field, 1), *SORT] for field in FILTER_FIELDS),
+    *([('dentist_id', 1), (field, 1), *SORT] for field in FILTER_FIELDS),
+)
+# The pre-keyset indexes INDEXES replaces (dentist_id + timestamp alone).
+SUPERSEDED_INDEXES = ('dentist_id_1_timestamp_-1', 'timestamp_1')
+_EPOCH = datetime(1970, 1, 1)
+
+
+def ensure_indexes():
+    """Create INDEXES on audit_log, then drop SUPERSEDED_INDEXES (idempotent)."""
+    for keys in INDEXES:
+        mongo.db.audit_log.create_index(keys)
+    for name in SUPERSEDED_INDEXES:
+        try:
+            mongo.db.audit_log.drop_index(name)
+        except OperationFailure:
+            pass  # already gone (or never built on this database)
 
 
 def record(action, entity_type, entity_id=None, actor_user_id=None,
@@ -32,26 +83,176 @@ def record(action, entity_type, entity_id=None, actor_user_id=None,
     }).inserted_id
 
 
-def find_for_dentist(dentist_id, limit=100, skip=0):
-    """Audit entries owned by a dentist (their clinics), newest first."""
-    return list(
-        mongo.db.audit_log.find({'dentist_id': dentist_id})
-        .sort('timestamp', -1).skip(skip).limit(limit)
-    )
-
-
 def count_for_dentist(dentist_id):
     """Total audit entries owned by a dentist (for pagination)."""
-    return mongo.db.audit_log.count_documents({'dentist_id': dentist_id})
+    return mongo.db.audit_log.count_documents({'dentist_id': dentist_id}, **query_budget.kwargs())
+
+
+def count_all():
+    """Total audit entries (for pagination, admin view).
+
+    From collection metadata, not a scan: exact counting every admin page view
+    walked the whole collection. May be briefly off after an unclean shutdown,
+    which is fine for a page count."""
+    return mongo.db.audit_log.estimated_document_count()
+
+
+# ── retention / archive ─────────────────────────────────────────────────────
+def archive_name(timestamp):
+    """Archive collection for the calendar month of `timestamp`."""
+    return f'{ARCHIVE_PREFIX}{timestamp:%Y_%m}'
+
+
+def archive_months():
+    """'YYYY-MM' of every archive collection, newest first."""
+    months = []
+    for name in mongo.db.list_collection_names(filter={'name': {'$regex': f'^{ARCHIVE_PREFIX}'}}):
+        m = _ARCHIVE_NAME.match(name)
+        if m:
+            months.append(f'{m.group(1)}-{m.group(2)}')
+    return sorted(months, reverse=True)
+
 
+def _archive_collection(month):
+    """The archive collection for 'YYYY-MM', or None if malformed/absent."""
+    m = re.fullmatch(r'(\d{4})-(\d{2})', month or '')
+    if not m or month not in archive_months():
+        return None
+    return mongo.db[f'{ARCHIVE_PREFIX}{m.group(1)}_{m.group(2)}']
 
-def find_all(limit=100, skip=0):
-    """All audit entries, newest first (app-admin view)."""
-    return list(
-        mongo.db.audit_log.find({}).sort('timestamp', -1).skip(skip).limit(limit)
+
+def count_archived(month, dentist_id=None):
+    """Entries in one month's archive (scoped to a dentist when given)."""
+    coll = _archive_collection(month)
+    if coll is None:
+        return 0
+    if dentist_id is None:
+        return coll.estimated_document_count()
+    return coll.count_documents({'dentist_id': dentist_id}, **query_budget.kwargs())
+
+
+def encode_cursor(entry):
+    """Opaque keyset cursor for the page after `entry`: '<epoch ms>-<_id>'."""
+    ms = (entry['timestamp'] - _EPOCH) // timedelta(milliseconds=1)
+    return f"{ms}-{entry['_id']}"
+
+
+def decode_cursor(cursor):
+    """(timestamp, _id) from encode_cursor's output, or None if malformed."""
+    ms, _, oid = (cursor or '').partition('-')
+    try:
+        return _EPOCH + timedelta(milliseconds=int(ms)), ObjectId(oid)
+    except (ValueError, OverflowError, InvalidId, TypeError):
+        return None
+
+
+def build_query(filters=None, dentist_id=None, since=None, until=None):
+    """Mongo query for the viewer. `filters` maps FILTER_FIELDS to exact
+    values (empty values ignored); since/until bound timestamp as [since, until)."""
+    query = {f: v for f, v in (filters or {}).items() if f in FILTER_FIELDS and v}
+    if dentist_id is not None:
+        query['dentist_id'] = dentist_id
+    if since or until:
+        query['timestamp'] = {}
+        if since:
+            query['timestamp']['$gte'] = since
+        if until:
+            query['timestamp']['$lt'] = until
+    return query
+
+
+def find_page(query, before=None, limit=100, month=None):
+    """One newest-first page of entries matching `query` (see build_query).
+
+    `before` is the decoded cursor of the previous page's last entry. `month`
+    ('YYYY-MM') reads that month's archive instead of the hot collection.
+    Returns (entries, cursor for the next page or None)."""
+    coll = mongo.db.audit_log if month is None else _archive_collection(month)
+    if coll is None:
+        return [], None
+    entries = list(
+        coll.find(_after(query, before), max_time_ms=query_budget.ms())
+        .sort(SORT).limit(limit + 1)
     )
+    if len(entries) > limit:
+        return entries[:limit], encode_cursor(entries[limit - 1])
+    return entries, None
 
 
-def count_all():
-    """Total audit entries (for pagination, admin view)."""
-    return mongo.db.audit_log.count_documents({})
+def iter_chunks(query, month=None, chunk_size=1000):
+    """Every entry matching `query`, newest first, as lists of <= chunk_size.
+
+    Each chunk is its own keyset query, so memory stays at one chunk and no
+    server cursor is held open while a slow client downloads an export."""
+    coll = mongo.db.audit_log if month is None else _archive_collection(month)
+    if coll is None:
+        return
+    before = None
+    while True:
+        chunk = list(
+            coll.find(_after(query, before), max_time_ms=query_budget.ms())
+            .sort(SORT).limit(chunk_size)
+        )
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        before = chunk[-1]['timestamp'], chunk[-1]['_id']
+
+
+def _after(query, before):
+    """`query` restricted to entries strictly after the (timestamp, _id) cursor
+    in SORT order."""
+    if before is None:
+        return query
+    ts, oid = before
+    # The range on timestamp bounds the index scan; the $or settles ties.
+    return {
+        **query,
+        'timestamp': {**query.get('timestamp', {}), '$lte': ts},
+        '$or': [{'timestamp': {'$lt': ts}}, {'_id': {'$lt': oid}}],
+    }
+
+
+def _ensure_archive(name, compressor):
+    if name in mongo.db.list_collection_names(filter={'name': name}):
+        return
+    if compressor:
+        try:
+            mongo.db.create_collection(name, storageEngine={
+                'wiredTiger': {'configString': f'block_compressor={compressor}'},
+            })
+        except OperationFailure:
+            pass  # tier doesn't allow storage options: default compression
+    coll = mongo.db[name]
+    for keys in INDEXES:
+        coll.create_index(keys)
+
+
+def archive_before(cutoff, batch_size=1000, compressor='zstd'):
+    """Move entries with timestamp < cutoff into their monthly archives.
+
+    Copy-then-delete per batch, so an interrupted run loses nothing: entries
+    already copied are skipped as duplicates (same _id) on the next run. Each
+    copy is stamped `archived_at`, a change marker for scripts/backup_data.py
+    --incremental (the copy keeps its old _id, so it would look unchanged).
+    Returns a Counter of moved entries per 'YYYY-MM'."""
+    moved = Counter()
+    query = {'timestamp': {'$lt': cutoff}}
+    while True:
+        batch = list(mongo.db.audit_log.find(query).sort('timestamp', 1).limit(batch_size))
+        if not batch:
+            return moved
+        by_month = defaultdict(list)
+        now = datetime.utcnow()
+        for doc in batch:
+            by_month[archive_name(doc['timestamp'])].append({**doc, 'archived_at': now})
+        for name, docs in by_month.items():
+            _ensure_archive(name, compressor)
+            try:
+                mongo.db[name].insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                if any(err['code'] != _DUPLICATE_KEY for err in e.details['writeErrors']):
+                    raise
+            moved[docs[0]['timestamp'].strftime('%Y-%m')] += len(docs)
+        mongo.db.audit_log.delete_many({'_id': {'$in': [d['_id'] for d in batch]}})
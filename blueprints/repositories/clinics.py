@@ -6,9 +6,17 @@
 #                 (create/edit/delete, settings) — staff must NOT widen this.
 #   * accessible_ids -> clinics a user may WORK IN: owned + via staff membership.
 #                 Use for patient/appointment listing scope (the access seam).
+#
+# The accessible_* answers are memoized per request (request_cache), and
+# accessible_ids is also cached per worker across requests (access_cache). The
+# clinic writes at the bottom invalidate them.
+
+import re
+from datetime import datetime
 
 from extensions import mongo
 from blueprints.repositories import memberships as _membership_repo
+from blueprints.repositories import access_cache, query_budget, request_cache
 
 
 def owned_by(owner_id, active_only=True):
@@ -16,17 +24,35 @@ def owned_by(owner_id, active_only=True):
     query = {'owner_id': owner_id}
     if active_only:
         query['is_active'] = True
-    return list(mongo.db.clinics.find(query))
+    return list(mongo.db.clinics.find(query, max_time_ms=query_budget.ms()))
 
 
 def owned_ids(owner_id):
     """ObjectIds of the owner's active clinics."""
     return [
         c['_id'] for c in
-        mongo.db.clinics.find({'owner_id': owner_id, 'is_active': True}, {'_id': 1})
+        mongo.db.clinics.find(
+            {'owner_id': owner_id, 'is_active': True}, {'_id': 1}, max_time_ms=query_budget.ms()
+        )
     ]
 
 
+def search_owned(owner_id, text=''):
+    """The owner's active clinics, by name; `text` (matched literally, case-
+    insensitive) narrows to clinics whose name or address contains it."""
+    query = {'owner_id': owner_id, 'is_active': True}
+    if text:
+        # Escape so the input is matched literally, never as a regex
+        # (prevents ReDoS / regex injection against the DB).
+        safe_q = re.escape(text)
+        query['$or'] = [
+            {'name': {'$regex': safe_q, '$options': 'i'}},
+            {'address': {'$regex': safe_q, '$options': 'i'}},
+        ]
+    return list(mongo.db.clinics.find(query, max_time_ms=query_budget.ms()).sort('name', 1))
+
+
+@request_cache.memoize('clinic_ids')
 def accessible_ids(user_id):
     """ObjectIds of all active clinics this user may work in: the ones they own
     (dentist) PLUS the ones owned by any dentist they're a staff member of.
@@ -34,20 +60,23 @@ def accessible_ids(user_id):
     The multi-staff listing seam (``utils.user_clinic_ids`` delegates here). With
     no memberships this equals ``owned_ids(user_id)`` — existing single-dentist
     behaviour is unchanged."""
-    owner_ids = _membership_repo.accessible_owner_ids(user_id)
-    return [
-        c['_id'] for c in
-        mongo.db.clinics.find(
-            {'owner_id': {'$in': owner_ids}, 'is_active': True}, {'_id': 1}
-        )
-    ]
+    def load():
+        owner_ids = _membership_repo.accessible_owner_ids(user_id)
+        return [
+            c['_id'] for c in
+            mongo.db.clinics.find(
+                {'owner_id': {'$in': owner_ids}, 'is_active': True}, {'_id': 1},
+                max_time_ms=query_budget.ms(),
+            )
+        ]
+    return access_cache.lookup('clinic_ids', user_id, load)
 
 
 def owned_active_by_name(owner_id):
     """The owner's active clinics, sorted by name (dashboard + reports)."""
     return list(
         mongo.db.clinics
-        .find({'owner_id': owner_id, 'is_active': True})
+        .find({'owner_id': owner_id, 'is_active': True}, max_time_ms=query_budget.ms())
         .sort('name', 1)
     )
 
@@ -60,6 +89,7 @@ def get_owned(clinic_id, owner_id):
     return mongo.db.clinics.find_one({'_id': clinic_id, 'owner_id': owner_id})
 
 
+@request_cache.memoize('clinic_accessible')
 def get_accessible(clinic_id, user_id):
     """A single clinic only if the user may WORK IN it — owns it (dentist) or is a
     staff member of its owning dentist. The accessible counterpart to get_owned.
@@ -70,12 +100,40 @@ def get_accessible(clinic_id, user_id):
     })
 
 
+@request_cache.memoize('clinics_active')
 def accessible_active(user_id):
     """Active clinics the user may work in (owned + via membership), sorted by name.
     The accessible counterpart to owned_active_by_name (listings + dropdowns)."""
     owner_ids = _membership_repo.accessible_owner_ids(user_id)
     return list(
         mongo.db.clinics
-        .find({'owner_id': {'$in': owner_ids}, 'is_active': True})
+        .find({'owner_id': {'$in': owner_ids}, 'is_active': True}, max_time_ms=query_budget.ms())
         .sort('name', 1)
     )
+
+
+def create(doc):
+    """Insert a clinic; returns the new _id."""
+    inserted_id = mongo.db.clinics.insert_one(doc).inserted_id
+    access_cache.changed()
+    return inserted_id
+
+
+def update_owned(clinic_id, owner_id, fields):
+    """Apply a ``$set`` to a clinic the owner owns. Ids and ownership don't
+    change here, so only this request's memo (names, settings) is dropped."""
+    request_cache.invalidate()
+    return mongo.db.clinics.update_one(
+        {'_id': clinic_id, 'owner_id': owner_id},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
+    )
+
+
+def deactivate_owned(clinic_id, owner_id):
+    """Soft-delete a clinic the owner owns (is_active=False)."""
+    result = mongo.db.clinics.update_one(
+        {'_id': clinic_id, 'owner_id': owner_id},
+        {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}},
+    )
+    access_cache.changed()
+    return result
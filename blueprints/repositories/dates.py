@@ -0,0 +1,109 @@
+# File: MyDentalPortal/blueprints/repositories/dates.py
+# Canonical date storage + the one parser everything reads dates through.
+#
+# Two kinds of date live in the DB, each with ONE stored form:
+#   * calendar days (DAY_FIELDS, e.g. treatment/appointment `date`):
+#     'YYYY-MM-DD' strings. Every range query, the (clinic_id, date) index, the
+#     calendar JS and the date inputs already speak this form, and it sorts
+#     lexicographically — so it stays a string, just always this exact one.
+#   * instants (TIMESTAMP_FIELDS: created_at, updated_at, timestamp, ...):
+#     naive-UTC BSON datetimes, what datetime.utcnow() writes.
+#
+# Older and imported records drifted from that (datetimes in `date`, ISO
+# strings in created_at). scripts/migrate_dates.py rewrites them once; the
+# repositories run new writes through normalize() so they can't drift again.
+#
+# parse() is single-pass (datetime.fromisoformat accepts every form we've
+# stored) and memoised, so rendering a long treatment table doesn't re-parse
+# the same few hundred strings on every row.
+
+from datetime import date, datetime, timezone
+from functools import lru_cache
+
+DAY_FORMAT = '%Y-%m-%d'
+
+DAY_FIELDS = {
+    'treatment_records': ('date',),
+    'appointments': ('date',),
+}
+TIMESTAMP_FIELDS = (
+    'created_at', 'updated_at', 'deleted_at', 'timestamp', 'chart_date',
+    'price_confirmed_at', 'expires_at', 'used_at', 'revoked_at',
+    'requested_at', 'resolved_at',
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_str(value):
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse(value):
+    """A naive-UTC datetime for a datetime, date or ISO string; else None."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str) and value:
+        return _parse_str(value)
+    return None
+
+
+def to_day(value):
+    """Canonical calendar-day form ('YYYY-MM-DD'), or None if unparseable."""
+    parsed = parse(value)
+    return parsed.strftime(DAY_FORMAT) if parsed else None
+
+
+def to_timestamp(value):
+    """Canonical instant form (naive-UTC datetime), or None if unparseable."""
+    return parse(value)
+
+
+def normalize(doc, day_fields=()):
+    """Coerce a document's (or $set's) date fields to canonical form in place.
+
+    Values that can't be parsed are left as they are — a bad value is the
+    route's validation problem, not something to silently drop here.
+    """
+    for field in day_fields:
+        if field in doc:
+            day = to_day(doc[field])
+            if day is not None:
+                doc[field] = day
+    for field in TIMESTAMP_FIELDS:
+        if isinstance(doc.get(field), str):
+            ts = to_timestamp(doc[field])
+            if ts is not None:
+                doc[field] = ts
+    return doc
+
+
+@lru_cache(maxsize=4096)
+def _format(value, fmt):
+    parsed = parse(value)
+    if parsed is None:
+        return value if isinstance(value, str) else str(value)
+    return parsed.strftime(fmt)
+
+
+def format_date(value, fmt):
+    """`value` (datetime/date/ISO string) formatted with `fmt`.
+
+    Strings and plain dates repeat across rows, so they are memoised.
+    Datetimes are formatted directly: timestamps are practically unique, so
+    caching them would only churn the LRU. Unparseable strings come back
+    unchanged rather than raising."""
+    if isinstance(value, datetime):
+        return parse(value).strftime(fmt)
+    if isinstance(value, (str, date)):
+        return _format(value, fmt)
+    return str(value)
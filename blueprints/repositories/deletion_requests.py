@@ -12,13 +12,14 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import query_budget
 
 
 def has_pending(entity_type, entity_id):
     """True if there's already a pending request for this exact record."""
     return mongo.db.deletion_requests.count_documents({
         'entity_type': entity_type, 'entity_id': str(entity_id), 'status': 'pending',
-    }) > 0
+    }, **query_budget.kwargs()) > 0
 
 
 def create(entity_type, entity_id, clinic_id, dentist_id, requested_by):
@@ -55,7 +56,7 @@ def list_pending_for_dentist(dentist_id):
     """Pending requests for a dentist's clinics, newest first (their queue)."""
     return list(
         mongo.db.deletion_requests
-        .find({'dentist_id': dentist_id, 'status': 'pending'})
+        .find({'dentist_id': dentist_id, 'status': 'pending'}, max_time_ms=query_budget.ms())
         .sort('requested_at', -1)
     )
 
@@ -63,7 +64,8 @@ def list_pending_for_dentist(dentist_id):
 def list_pending_all():
     """All pending requests, newest first (app-admin queue)."""
     return list(
-        mongo.db.deletion_requests.find({'status': 'pending'}).sort('requested_at', -1)
+        mongo.db.deletion_requests.find({'status': 'pending'}, max_time_ms=query_budget.ms())
+        .sort('requested_at', -1)
     )
 
 
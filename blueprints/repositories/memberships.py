@@ -5,7 +5,9 @@
 # gets access to ALL clinics that dentist owns (per-clinic scoping is a later
 # extension). `clinics.accessible_ids` and `patients.get_for_accessor` build on
 # `accessible_owner_ids` below — that's the single place "who can I act as?" is
-# computed, so widening/narrowing access later happens here.
+# computed, so widening/narrowing access later happens here. Its answer is
+# memoized per request (request_cache) and cached per worker across requests
+# (access_cache); every write below calls access_cache.changed() after it lands.
 #
 # IDs are stored as strings to match the rest of the app (session['user_id'] and
 # clinics.owner_id are str(ObjectId), not ObjectId).
@@ -16,6 +18,7 @@ from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import access_cache, query_budget, request_cache
 
 
 def dentist_ids_for(user_id):
@@ -23,22 +26,26 @@ def dentist_ids_for(user_id):
     return [
         m['dentist_id'] for m in
         mongo.db.memberships.find(
-            {'user_id': user_id, 'is_active': True}, {'dentist_id': 1}
+            {'user_id': user_id, 'is_active': True}, {'dentist_id': 1},
+            max_time_ms=query_budget.ms(),
         )
     ]
 
 
+@request_cache.memoize('owner_ids')
 def accessible_owner_ids(user_id):
     """Clinic-owner ids whose clinics this user may access: themselves (as a
     dentist over their own clinics) plus every dentist they're an active staff
     member of. With no memberships this is just ``[user_id]`` — so existing
     single-dentist behaviour is unchanged."""
-    return [user_id, *dentist_ids_for(user_id)]
+    return access_cache.lookup(
+        'owner_ids', user_id, lambda: [user_id, *dentist_ids_for(user_id)]
+    )
 
 
 def create(user_id, dentist_id, role='staff', created_by=None):
     """Link a staff user to a dentist; returns the new _id."""
-    return mongo.db.memberships.insert_one({
+    inserted_id = mongo.db.memberships.insert_one({
         'user_id': user_id,
         'dentist_id': dentist_id,
         'role': role,
@@ -46,6 +53,8 @@ def create(user_id, dentist_id, role='staff', created_by=None):
         'created_by': created_by,
         'created_at': datetime.utcnow(),
     }).inserted_id
+    access_cache.changed()
+    return inserted_id
 
 
 def list_for_dentist(dentist_id, active_only=True):
@@ -53,15 +62,17 @@ def list_for_dentist(dentist_id, active_only=True):
     query = {'dentist_id': dentist_id}
     if active_only:
         query['is_active'] = True
-    return list(mongo.db.memberships.find(query))
+    return list(mongo.db.memberships.find(query, max_time_ms=query_budget.ms()))
 
 
 def deactivate(user_id, dentist_id):
     """Soft-revoke a staff link (keep the row for the audit trail)."""
-    return mongo.db.memberships.update_one(
+    result = mongo.db.memberships.update_one(
         {'user_id': user_id, 'dentist_id': dentist_id},
         {'$set': {'is_active': False, 'revoked_at': datetime.utcnow()}},
     )
+    access_cache.changed()
+    return result
 
 
 def get(membership_id):
@@ -78,7 +89,9 @@ def revoke_by_id(membership_id):
         oid = ObjectId(membership_id)
     except (InvalidId, TypeError):
         return None
-    return mongo.db.memberships.update_one(
+    result = mongo.db.memberships.update_one(
         {'_id': oid},
         {'$set': {'is_active': False, 'revoked_at': datetime.utcnow()}},
     )
+    access_cache.changed()
+    return result
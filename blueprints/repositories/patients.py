@@ -1,12 +1,16 @@
 # File: MyDentalPortal/blueprints/repositories/patients.py
 # Patient reads + the patient-access seam. Thin wrapper over mongo.db.
 
+from datetime import datetime
+
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
 from blueprints.models import validate_patient
+from blueprints.repositories import archive as _archive_repo
 from blueprints.repositories import memberships as _membership_repo
+from blueprints.repositories import query_budget, request_cache
 
 
 # Every nested dict the detail/list templates may access — keep in sync with
@@ -37,24 +41,37 @@ def ensure_nested(patient):
     return patient
 
 
-def get(patient_id):
-    """Find a patient by id. Returns None for a missing or malformed id."""
+def get(patient_id, include_archived=False):
+    """Find a patient by id. Returns None for a missing or malformed id.
+    include_archived also looks in patients_archive (long-deleted patients;
+    see repositories/archive.py), for views that name old records."""
     try:
-        return mongo.db.patients.find_one({'_id': ObjectId(patient_id)})
+        patient = mongo.db.patients.find_one({'_id': ObjectId(patient_id)})
     except (InvalidId, TypeError):
         return None
+    if patient is None and include_archived:
+        patient = _archive_repo.get('patients', patient_id)
+    return patient
 
 
 def active_in_clinics(clinic_ids, sort_field='personal_info.first_name'):
     """Active patients across the given clinics, sorted by `sort_field`."""
     return list(
         mongo.db.patients
-        .find({'clinic_id': {'$in': clinic_ids}, 'is_active': True})
+        .find({'clinic_id': {'$in': clinic_ids}, 'is_active': True}, max_time_ms=query_budget.ms())
         .sort(sort_field, 1)
     )
 
 
-def get_for_accessor(patient_id, user_id):
+# Projections for get_for_accessor callers that don't render the patient:
+# access checks only (chart autosave, deletions, treatment/upload actions) and
+# the photo routes. `_id` and `clinic_id` are always returned.
+ACCESS_FIELDS = ('clinic_id',)
+PHOTO_FIELDS = ('clinic_id', 'photo_file_id', 'photo_content_type')
+
+
+@request_cache.memoize('patient_access')
+def get_for_accessor(patient_id, user_id, fields=None):
     """Return (patient, clinic) if user_id may access the patient — the access seam.
 
     Access = the patient's clinic is owned by the user (dentist) OR by a dentist
@@ -65,15 +82,37 @@ def get_for_accessor(patient_id, user_id):
     * (patient, None)     -> patient exists but the user may NOT access its clinic;
                              the caller must treat this as access denied.
     * (patient, clinic)   -> access granted.
+
+    One round trip: the patient and its clinic come back from a single
+    aggregation, the clinic filtered by the user's owner set (which is itself
+    cached per worker, see access_cache). ``fields`` (a tuple, e.g.
+    ACCESS_FIELDS) limits the patient fields returned; None returns them all.
+
+    Memoized per request (request_cache): a route that checks the same patient
+    twice (e.g. deletions._resolve, then the action) pays once. Patient,
+    clinic and membership writes invalidate it.
     """
-    patient = get(patient_id)
-    if not patient:
+    try:
+        oid = ObjectId(patient_id)
+    except (InvalidId, TypeError):
+        return None, None
+    owner_ids = _membership_repo.accessible_owner_ids(user_id)
+    pipeline = [{'$match': {'_id': oid}}]
+    if fields is not None:
+        pipeline.append({'$project': dict.fromkeys(('clinic_id', *fields), 1)})
+    pipeline += [
+        {'$lookup': {'from': 'clinics', 'localField': 'clinic_id',
+                     'foreignField': '_id', 'as': '_clinic'}},
+        {'$addFields': {'_clinic': {'$filter': {
+            'input': '$_clinic', 'as': 'c',
+            'cond': {'$in': ['$$c.owner_id', owner_ids]},
+        }}}},
+    ]
+    patient = next(iter(mongo.db.patients.aggregate(pipeline, **query_budget.kwargs())), None)
+    if patient is None:
         return None, None
-    clinic = mongo.db.clinics.find_one({
-        '_id': patient['clinic_id'],
-        'owner_id': {'$in': _membership_repo.accessible_owner_ids(user_id)},
-    })
-    return patient, clinic
+    clinics = patient.pop('_clinic')
+    return patient, (clinics[0] if clinics else None)
 
 
 def create(data):
@@ -83,22 +122,27 @@ def create(data):
     or invalid clinic_id). Returns the inserted _id.
     """
     doc = validate_patient(data)
+    request_cache.invalidate('patient_access')
     return mongo.db.patients.insert_one(doc).inserted_id
 
 
 def update_set(patient_id, fields):
-    """Apply a targeted ``$set`` (dot-notation keys) to one patient."""
+    """Apply a targeted ``$set`` (dot-notation keys) to one patient, stamping
+    updated_at (unless the caller sets it) for incremental backups."""
+    request_cache.invalidate('patient_access')
     return mongo.db.patients.update_one(
         {'_id': ObjectId(patient_id)},
-        {'$set': fields},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
     )
 
 
 def unset(patient_id, keys):
-    """Remove fields (list of dot-notation keys) from one patient (e.g. photo)."""
+    """Remove fields (list of dot-notation keys) from one patient (e.g. photo),
+    stamping updated_at."""
+    request_cache.invalidate('patient_access')
     return mongo.db.patients.update_one(
         {'_id': ObjectId(patient_id)},
-        {'$unset': {k: '' for k in keys}},
+        {'$unset': {k: '' for k in keys}, '$set': {'updated_at': datetime.utcnow()}},
     )
 
 
@@ -106,19 +150,31 @@ def recent_in_clinics(clinic_ids, limit=10):
     """Active patients across the given clinics, newest first (dashboard)."""
     return list(
         mongo.db.patients
-        .find({'clinic_id': {'$in': clinic_ids}, 'is_active': True})
+        .find({'clinic_id': {'$in': clinic_ids}, 'is_active': True}, max_time_ms=query_budget.ms())
         .sort('created_at', -1)
         .limit(limit)
     )
 
 
+def page_matching(query, sort, skip, limit):
+    """(one page of patients matching `query`, total matches) for the list view.
+    The query may carry the name/phone search regex, so both reads run under
+    the request's query budget."""
+    total = mongo.db.patients.count_documents(query, **query_budget.kwargs())
+    patients = list(
+        mongo.db.patients.find(query, max_time_ms=query_budget.ms())
+        .sort(sort).skip(skip).limit(limit)
+    )
+    return patients, total
+
+
 def count_active_in_clinics(clinic_ids, created_since=None):
     """Count active patients in the given clinics, optionally created on/after
     `created_since` (a datetime). Used by the dashboard stats."""
     query = {'clinic_id': {'$in': clinic_ids}, 'is_active': True}
     if created_since is not None:
         query['created_at'] = {'$gte': created_since}
-    return mongo.db.patients.count_documents(query)
+    return mongo.db.patients.count_documents(query, **query_budget.kwargs())
 
 
 def find_active_in_clinics(clinic_ids, created_since=None, fields=None):
@@ -128,4 +184,4 @@ def find_active_in_clinics(clinic_ids, created_since=None, fields=None):
     query = {'clinic_id': {'$in': clinic_ids}, 'is_active': True}
     if created_since is not None:
         query['created_at'] = {'$gte': created_since}
-    return list(mongo.db.patients.find(query, fields))
+    return list(mongo.db.patients.find(query, fields, max_time_ms=query_budget.ms()))
@@ -0,0 +1,72 @@
+# File: MyDentalPortal/blueprints/repositories/query_budget.py
+# Server-side time budgets (maxTimeMS) for repository reads, per route class.
+#
+# Why: a gunicorn worker serves several requests on its threads. One pathological
+# read (a regex search over every patient, a report over years of treatments)
+# used to run for as long as the server let it, holding a thread and a pool
+# connection the whole time. With maxTimeMS the server stops the operation
+# itself and the driver raises ExecutionTimeout, which app.py turns into a
+# clear "narrow your search" page.
+#
+# Route classes, each with its own budget (config QUERY_BUDGET_<CLASS>_MS):
+#   * interactive — every page and API call a user waits on (default 5 s)
+#   * report      — the reports blueprint (default 30 s)
+#   * export      — streamed extracts, per chunk query (default 60 s)
+# The class comes from the current request's endpoint, then its blueprint.
+# Outside a request (scripts, startup) there is no budget: a nightly archive
+# job may legitimately run long.
+#
+# Per-operation maxTimeMS rather than the driver's client-wide timeoutMS: that
+# deadline covers the whole request (password-hash waits included) and would
+# also cut off GridFS downloads that are streaming to a slow client.
+#
+# Usage in a repository:
+#     coll.find(query, max_time_ms=query_budget.ms())
+#     coll.count_documents(query, **query_budget.kwargs())
+#     coll.aggregate(pipeline, **query_budget.kwargs())
+
+from flask import current_app, has_request_context, request
+
+INTERACTIVE = 'interactive'
+REPORT = 'report'
+EXPORT = 'export'
+DEFAULTS_MS = {INTERACTIVE: 5000, REPORT: 30000, EXPORT: 60000}
+
+# Endpoint or blueprint name -> route class. Endpoints are checked first.
+ROUTE_CLASSES = {
+    'reports': REPORT,
+    'main.activity_export': EXPORT,
+}
+
+TIMEOUT_MESSAGE = (
+    'That took too long and was stopped. Please narrow it down '
+    '(a clinic, a shorter date range or a more specific search) and try again.'
+)
+
+
+def route_class():
+    """The current request's route class, or None outside a request."""
+    if not has_request_context():
+        return None
+    return (
+        ROUTE_CLASSES.get(request.endpoint)
+        or ROUTE_CLASSES.get(request.blueprint)
+        or INTERACTIVE
+    )
+
+
+def ms(kind=None):
+    """Budget in ms for `kind` (default: the current route class), or None for
+    no limit (outside a request, or the class's budget configured as 0)."""
+    kind = kind or route_class()
+    if kind is None:
+        return None
+    key = f'QUERY_BUDGET_{kind.upper()}_MS'
+    return current_app.config.get(key, DEFAULTS_MS[kind]) or None
+
+
+def kwargs(kind=None):
+    """{'maxTimeMS': n} for count_documents/aggregate, or {} with no budget
+    (pymongo would send an explicit null otherwise)."""
+    budget = ms(kind)
+    return {'maxTimeMS': budget} if budget else {}
@@ -0,0 +1,62 @@
+# File: MyDentalPortal/blueprints/repositories/request_cache.py
+# Request-scoped memo for the access seam, kept on flask.g.
+#
+# Why: one request asks "which clinics may this user work in?" several times —
+# the route's scoping, verify_patient_access, the deletion resolver, dropdowns —
+# and each ask was a fresh memberships + clinics round trip. The answer can't
+# change mid-request unless the request itself writes, so the first answer is
+# kept on `g` (per request, never shared between users or requests).
+#
+# Rules:
+#   * Keyed by (namespace, args, kwargs) — the user id is always an argument, never
+#     implied.
+#   * Callers get a deep copy, so mutating a returned list/doc (ensure_nested,
+#     appending to a list) can't leak into the next caller.
+#   * Every write that can change an answer calls invalidate(): membership and
+#     clinic writes clear everything, patient writes clear 'patient_access'.
+#   * Outside an app context (scripts, startup) it is a plain pass-through.
+
+import copy
+from functools import wraps
+
+from flask import g, has_app_context
+
+_ATTR = '_request_memo'
+
+
+def _store():
+    if not has_app_context():
+        return None
+    store = g.get(_ATTR)
+    if store is None:
+        store = {}
+        setattr(g, _ATTR, store)
+    return store
+
+
+def memoize(namespace):
+    """Decorator: memoize a function of hashable args per request."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            store = _store()
+            if store is None:
+                return fn(*args, **kwargs)
+            key = (namespace, args, tuple(sorted(kwargs.items())))
+            if key not in store:
+                store[key] = fn(*args, **kwargs)
+            return copy.deepcopy(store[key])
+        return wrapper
+    return decorator
+
+
+def invalidate(*namespaces):
+    """Forget memoized answers — for the given namespaces, or all of them."""
+    store = _store()
+    if not store:
+        return
+    if not namespaces:
+        store.clear()
+        return
+    for key in [k for k in store if k[0] in namespaces]:
+        del store[key]
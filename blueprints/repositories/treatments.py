@@ -3,10 +3,13 @@
 # Patient access control stays in the route (verify_patient_access); this module
 # only holds the raw treatment_records queries.
 
+from datetime import datetime
+
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import dates, query_budget
 
 
 def get(treatment_id):
@@ -17,12 +20,12 @@ def get(treatment_id):
         return None
 
 
-def list_for_patient(patient_id):
-    """All treatments for a patient, newest first (by date)."""
+def list_for_patient(patient_id, limit=0):
+    """Treatments for a patient, newest first (by date); `limit` 0 = all."""
     return list(
         mongo.db.treatment_records
-        .find({'patient_id': ObjectId(patient_id)})
-        .sort('date', -1)
+        .find({'patient_id': ObjectId(patient_id)}, max_time_ms=query_budget.ms())
+        .sort('date', -1).limit(limit)
     )
 
 
@@ -33,7 +36,7 @@ def find_for_clinics(clinic_ids, start_date=None, fields=None):
     query = {'clinic_id': {'$in': clinic_ids}}
     if start_date:
         query['date'] = {'$gte': start_date}
-    return list(mongo.db.treatment_records.find(query, fields))
+    return list(mongo.db.treatment_records.find(query, fields, max_time_ms=query_budget.ms()))
 
 
 def find_pending_prices(clinic_ids=None):
@@ -44,19 +47,24 @@ def find_pending_prices(clinic_ids=None):
     query = {'price_confirmed': False}
     if clinic_ids is not None:
         query['clinic_id'] = {'$in': clinic_ids}
-    return list(mongo.db.treatment_records.find(query).sort('date', -1))
+    return list(
+        mongo.db.treatment_records.find(query, max_time_ms=query_budget.ms()).sort('date', -1)
+    )
 
 
 def insert(doc):
-    """Insert a treatment document; return the new _id (str)."""
+    """Insert a treatment document (dates made canonical); return the new _id (str)."""
+    dates.normalize(doc, dates.DAY_FIELDS['treatment_records'])
     return str(mongo.db.treatment_records.insert_one(doc).inserted_id)
 
 
 def update_set(treatment_id, fields):
-    """Apply a ``$set`` to one treatment."""
+    """Apply a ``$set`` to one treatment, stamping updated_at (unless the
+    caller sets it) for incremental backups."""
+    dates.normalize(fields, dates.DAY_FIELDS['treatment_records'])
     return mongo.db.treatment_records.update_one(
         {'_id': ObjectId(treatment_id)},
-        {'$set': fields},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
     )
 
 
@@ -6,11 +6,14 @@
 # (verify_patient_access) stay in the route; this module only holds the raw
 # storage + collection queries that used to be inline.
 
+from datetime import datetime
+
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from gridfs import GridFS
 
 from extensions import mongo
+from blueprints.repositories import query_budget
 
 
 # ── GridFS blob storage ──────────────────────────────────────────────────────
@@ -50,6 +53,15 @@ def get_prescription(prescription_id):
         return None
 
 
+def prescriptions_for_patient(patient_id):
+    """A patient's prescriptions, newest first."""
+    return list(
+        mongo.db.prescriptions
+        .find({'patient_id': ObjectId(patient_id)}, max_time_ms=query_budget.ms())
+        .sort('created_at', -1)
+    )
+
+
 def insert_prescription(doc):
     """Insert a prescription document; return the new _id (str)."""
     return str(mongo.db.prescriptions.insert_one(doc).inserted_id)
@@ -69,6 +81,15 @@ def get_file(file_doc_id):
         return None
 
 
+def files_for_patient(patient_id):
+    """A patient's file metadata docs, newest first."""
+    return list(
+        mongo.db.patient_files
+        .find({'patient_id': ObjectId(patient_id)}, max_time_ms=query_budget.ms())
+        .sort('created_at', -1)
+    )
+
+
 def insert_file(doc):
     """Insert a patient-file metadata document; return the new _id (str)."""
     return str(mongo.db.patient_files.insert_one(doc).inserted_id)
@@ -78,7 +99,7 @@ def update_file_set(file_doc_id, fields):
     """Apply a ``$set`` to one patient-file metadata doc (e.g. rename)."""
     return mongo.db.patient_files.update_one(
         {'_id': ObjectId(file_doc_id)},
-        {'$set': fields},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
     )
 
 
@@ -5,10 +5,13 @@
 # work will extend THIS module (membership, role changes) rather than re-querying
 # the driver across blueprints.
 
+from datetime import datetime
+
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 
 from extensions import mongo
+from blueprints.repositories import query_budget
 
 
 def get(user_id):
@@ -19,6 +22,25 @@ def get(user_id):
         return None
 
 
+def names_for(user_ids):
+    """{user_id: display name} for many ids in one query (audit viewer/export).
+    Name falls back to email; unknown or malformed ids map to themselves."""
+    ids = {str(u) for u in user_ids if u}
+    oids = []
+    for uid in ids:
+        try:
+            oids.append(ObjectId(uid))
+        except (InvalidId, TypeError):
+            pass
+    names = dict.fromkeys(ids)
+    cursor = mongo.db.users.find(
+        {'_id': {'$in': oids}}, {'name': 1, 'email': 1}, max_time_ms=query_budget.ms()
+    )
+    for u in cursor:
+        names[str(u['_id'])] = u.get('name') or u.get('email')
+    return {uid: name or uid for uid, name in names.items()}
+
+
 def get_by_email(email):
     """Find a user by email (exact match), or None."""
     return mongo.db.users.find_one({'email': email})
@@ -40,21 +62,28 @@ def delete(user_id):
 
 def update_set(user_id, fields):
     """Apply a ``$set`` to one user (by _id). Returns the UpdateResult so callers
-    can inspect matched_count (e.g. admin password reset)."""
+    can inspect matched_count (e.g. admin password reset). Stamps updated_at
+    (unless the caller sets it) for incremental backups."""
     return mongo.db.users.update_one(
         {'_id': ObjectId(user_id)},
-        {'$set': fields},
+        {'$set': {'updated_at': datetime.utcnow(), **fields}},
     )
 
 
 def list_by_status(status):
     """Users with the given lifecycle status, newest first (admin approvals)."""
-    return list(mongo.db.users.find({'status': status}).sort('created_at', -1))
+    return list(
+        mongo.db.users.find({'status': status}, max_time_ms=query_budget.ms())
+        .sort('created_at', -1)
+    )
 
 
 def list_all_no_password():
     """All users with the password field projected out, newest first (admin)."""
-    return list(mongo.db.users.find({}, {'password': 0}).sort('created_at', -1))
+    return list(
+        mongo.db.users.find({}, {'password': 0}, max_time_ms=query_budget.ms())
+        .sort('created_at', -1)
+    )
 
 
 def set_status_if_pending(user_id, new_status, extra=None):
@@ -63,7 +92,7 @@ def set_status_if_pending(user_id, new_status, extra=None):
     The `status: 'pending'` filter preserves the route's guard: a non-pending
     account is never re-approved/re-rejected. Returns the UpdateResult.
     """
-    fields = {'status': new_status}
+    fields = {'status': new_status, 'updated_at': datetime.utcnow()}
     if extra:
         fields.update(extra)
     return mongo.db.users.update_one(
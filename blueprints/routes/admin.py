@@ -1,21 +1,25 @@
 # File: MyDentalPortal/blueprints/routes/admin.py
 # Admin-only screens. Currently: review + approve/reject new registrations.
 
+import logging
+
 from flask import (
     Blueprint, render_template, redirect, url_for,
-    session, flash, abort, request,
+    session, flash, abort, request, Response,
 )
-from werkzeug.security import generate_password_hash
 from bson.objectid import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
 
 from blueprints.utils import admin_required, ROLE_DENTIST, ROLE_STAFF, ROLE_ADMIN
+from blueprints.utils.passwords import BUSY_MESSAGE, PasswordHashBusy, hash_password
 from blueprints.repositories import users as user_repo
 from blueprints.repositories import memberships as membership_repo
 from blueprints.repositories import audit_log as audit_repo
+import metrics
 
 admin_bp = Blueprint('admin', __name__)
+log = logging.getLogger(__name__)
 
 
 def _audit_admin(action, entity_type, entity_id):
@@ -23,8 +27,8 @@ def _audit_admin(action, entity_type, entity_id):
     try:
         audit_repo.record(action, entity_type, entity_id,
                           actor_user_id=session.get('user_id'), actor_role='admin')
-    except Exception as e:  # noqa: BLE001
-        print(f"[ERROR] admin audit failed: {e}")
+    except Exception:  # noqa: BLE001
+        log.exception('admin audit failed')
 
 
 @admin_bp.route('/admin/registrations')
@@ -86,8 +90,13 @@ def reset_password(user_id):
         flash('New password must be at least 8 characters long.', 'error')
         return redirect(url_for('admin.users'))
 
+    try:
+        new_hash = hash_password(new_password, op='admin_reset')
+    except PasswordHashBusy:
+        flash(BUSY_MESSAGE, 'warning')
+        return redirect(url_for('admin.users'))
     result = user_repo.update_set(oid, {
-        'password': generate_password_hash(new_password),
+        'password': new_hash,
         'updated_at': datetime.utcnow(),
         'password_reset_by': session['user_id'],
     })
@@ -172,3 +181,15 @@ def revoke_membership(membership_id):
     else:
         flash('Membership not found or already revoked.', 'error')
     return redirect(url_for('admin.panel'))
+
+
+# ── METRICS ───────────────────────────────────────────────────────────────
+@admin_bp.route('/admin/metrics')
+@admin_required
+def metrics_endpoint():
+    """Prometheus text exposition of request/DB/pool metrics, merged across the
+    gunicorn workers (see metrics.py). Labels are endpoint names only — no PHI."""
+    return Response(
+        metrics.render_prometheus(),
+        mimetype='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,6 +1,8 @@
 # File: MyDentalPortal/app/routes/appointments.py
 # Appointment management routes — calendar + CRUD API
 
+import logging
+
 from flask import (
     Blueprint, render_template, request, jsonify,
     session, redirect, url_for, flash,
@@ -14,6 +16,7 @@ from blueprints.repositories import clinics as clinic_repo
 from blueprints.repositories import patients as patient_repo
 
 appointments_bp = Blueprint('appointments', __name__)
+log = logging.getLogger(__name__)
 
 # Server-side allowlists — never trust client-supplied enums.
 ALLOWED_TYPES = {
@@ -92,8 +95,8 @@ def appointments():
             clinics=user_clinics,
             patients=formatted,
         )
-    except Exception as e:
-        print(f"Appointments page error: {e}")
+    except Exception:
+        log.exception('appointments page failed')
         flash('Error loading appointments page', 'error')
         return redirect(url_for('main.dashboard'))
 
@@ -135,7 +138,7 @@ def get_appointments():
             })
         return jsonify({'success': True, 'appointments': out, 'total': len(out)})
     except Exception as e:
-        print(f"Get appointments error: {e}")
+        log.exception('get appointments failed')
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -201,8 +204,8 @@ def create_appointment():
             'appointment_id': appt_id,
             'message': f'Appointment scheduled at {clinic["name"]}',
         })
-    except Exception as e:
-        print(f"Create appointment error: {e}")
+    except Exception:
+        log.exception('create appointment failed')
         return jsonify({'success': False, 'error': 'Failed to create appointment'}), 500
 
 
@@ -256,8 +259,8 @@ def update_appointment(appt_id):
         action = 'cancel' if data.get('status') == 'cancelled' else 'update'
         audit(action, 'appointment', appt_id, clinic=clinic)
         return jsonify({'success': True, 'message': 'Updated'})
-    except Exception as e:
-        print(f"Update appointment error: {e}")
+    except Exception:
+        log.exception('update appointment failed')
         return jsonify({'success': False, 'error': 'Update failed'}), 500
 
 
@@ -277,6 +280,6 @@ def delete_appointment(appt_id):
         appt_repo.soft_delete(appt_id)
         audit('delete', 'appointment', appt_id, clinic=clinic)
         return jsonify({'success': True, 'message': 'Deleted'})
-    except Exception as e:
-        print(f"Delete appointment error: {e}")
+    except Exception:
+        log.exception('delete appointment failed')
         return jsonify({'success': False, 'error': 'Delete failed'}), 500
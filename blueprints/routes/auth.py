@@ -1,11 +1,13 @@
 # File: MyDentalPortal/app/routes/auth.py
 # Authentication routes — login, register, logout
 
+import logging
+
 from flask import (
     Blueprint, request, jsonify, session,
     render_template, redirect, url_for, flash,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from datetime import datetime
 import re
 
@@ -14,8 +16,12 @@ from blueprints.repositories import users as user_repo
 from blueprints.repositories import audit_log as audit_repo
 from blueprints.repositories import access_codes as code_repo
 from blueprints.repositories import memberships as membership_repo
+from blueprints.utils.passwords import (
+    BUSY_MESSAGE, RETRY_AFTER_SECONDS, PasswordHashBusy, hash_password, verify_password,
+)
 
 auth_bp = Blueprint('auth', __name__)
+log = logging.getLogger(__name__)
 
 
 def _audit_auth(action, user=None):
@@ -27,8 +33,8 @@ def _audit_auth(action, user=None):
             action, 'auth', entity_id=uid,
             actor_user_id=uid, actor_role=(user or {}).get('role'),
         )
-    except Exception as e:  # noqa: BLE001
-        print(f"[ERROR] auth audit failed: {e}")
+    except Exception:  # noqa: BLE001
+        log.exception('auth audit failed')
 
 # Pre-computed hash so failed logins stay roughly constant-time: we always run a
 # password check even when the email doesn't exist, so a missing account can't be
@@ -41,6 +47,15 @@ def _valid_email(email):
     return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email))
 
 
+def _busy(template):
+    """Fast "try again" when the password-hash executor is saturated."""
+    headers = {'Retry-After': str(RETRY_AFTER_SECONDS)}
+    if request.is_json:
+        return jsonify({'success': False, 'error': BUSY_MESSAGE}), 503, headers
+    flash(BUSY_MESSAGE, 'warning')
+    return render_template(template), 503, headers
+
+
 def account_block_reason(user):
     """Return (flash_category, message) if `user` may NOT log in, else None.
 
@@ -82,7 +97,7 @@ def login():
             user = user_repo.get_by_email(email)
             # Always hash-check (against a dummy hash if no such user) for constant time.
             stored_hash = user['password'] if user else _DUMMY_PASSWORD_HASH
-            if check_password_hash(stored_hash, password) and user:
+            if verify_password(stored_hash, password, op='login') and user:
                 # Account lifecycle gate (approval + active/deactivated).
                 block = account_block_reason(user)
                 if block:
@@ -104,8 +119,10 @@ def login():
 
             _audit_auth('login_failed', user)  # user is None for an unknown email
             flash('Invalid email or password', 'error')
-        except Exception as e:
-            print(f"Login error: {e}")
+        except PasswordHashBusy:
+            return _busy('auth/login.html')
+        except Exception:
+            log.exception('login failed')
             flash('Login failed. Please try again.', 'error')
 
         return render_template('auth/login.html')
@@ -155,7 +172,7 @@ def register():
             user_data = {
                 'name': name,
                 'email': email,
-                'password': generate_password_hash(password),
+                'password': hash_password(password, op='register'),
                 'license_number': license_number,
                 'specialty': specialty,
                 'role': 'dentist',           # future: admin, staff
@@ -172,8 +189,10 @@ def register():
                   'account before you can log in.', 'success')
             return redirect(url_for('auth.login'))
 
-        except Exception as e:
-            print(f"Registration error: {e}")
+        except PasswordHashBusy:
+            return _busy('auth/register.html')
+        except Exception:
+            log.exception('registration failed')
             flash('Registration failed. Please try again.', 'error')
             return render_template('auth/register.html')
 
@@ -228,7 +247,7 @@ def join():
             user_id = user_repo.create({
                 'name': name,
                 'email': email,
-                'password': generate_password_hash(password),
+                'password': hash_password(password, op='join'),
                 'role': 'staff',
                 'status': 'approved',     # the access code is the vetting
                 'created_at': datetime.utcnow(),
@@ -250,14 +269,16 @@ def join():
                 audit_repo.record('join', 'membership', entity_id=str(membership_id),
                                   actor_user_id=user_id, actor_role='staff',
                                   dentist_id=dentist_id)
-            except Exception as e:  # noqa: BLE001
-                print(f"[ERROR] join audit failed: {e}")
+            except Exception:  # noqa: BLE001
+                log.exception('join audit failed')
 
             flash('Account created. You can now log in.', 'success')
             return redirect(url_for('auth.login'))
 
-        except Exception as e:
-            print(f"Staff join error: {e}")
+        except PasswordHashBusy:
+            return _busy('auth/join.html')
+        except Exception:
+            log.exception('staff join failed')
             flash('Registration failed. Please try again.', 'error')
             return render_template('auth/join.html')
 
@@ -275,8 +296,8 @@ def logout():
         try:
             audit_repo.record('logout', 'auth', entity_id=uid, actor_user_id=uid,
                               actor_role=session.get('user_role'))
-        except Exception as e:  # noqa: BLE001
-            print(f"[ERROR] auth audit failed: {e}")
+        except Exception:  # noqa: BLE001
+            log.exception('auth audit failed')
     session.clear()
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
@@ -1,19 +1,23 @@
 # File: MyDentalPortal/app/routes/clinics.py
 # Clinic management routes
 
+import logging
+
 from flask import (
     Blueprint, render_template, request, session,
     redirect, url_for, flash, jsonify,
 )
 from bson.objectid import ObjectId
+from pymongo.errors import ExecutionTimeout
 from datetime import datetime
-import re
-import traceback
 
-from extensions import mongo
 from blueprints.utils import login_required, role_required, ROLE_DENTIST, audit
+from blueprints.repositories import clinics as clinic_repo
+from blueprints.repositories import patients as patient_repo
+from blueprints.repositories import query_budget
 
 clinics_bp = Blueprint('clinics', __name__)
+log = logging.getLogger(__name__)
 
 
 @clinics_bp.route('/clinics')
@@ -21,33 +25,24 @@ clinics_bp = Blueprint('clinics', __name__)
 def list_clinics():
     try:
         search_query = request.args.get('search', '')
-        query = {'owner_id': session['user_id'], 'is_active': True}
-
-        if search_query:
-            # Escape so the input is matched literally, never as a regex
-            # (prevents ReDoS / regex injection against the DB).
-            safe_q = re.escape(search_query)
-            query['$or'] = [
-                {'name': {'$regex': safe_q, '$options': 'i'}},
-                {'address': {'$regex': safe_q, '$options': 'i'}},
-            ]
-
-        clinics = list(mongo.db.clinics.find(query).sort('name', 1))
+        clinics = clinic_repo.search_owned(session['user_id'], search_query)
 
         # Attach patient count per clinic
         for clinic in clinics:
-            clinic['patient_count'] = mongo.db.patients.count_documents({
-                'clinic_id': clinic['_id'], 'is_active': True,
-            })
+            clinic['patient_count'] = patient_repo.count_active_in_clinics([clinic['_id']])
 
         return render_template(
             'clinics/list.html',
             clinics=clinics,
             search_query=search_query,
         )
-    except Exception as e:
-        print(f"[ERROR] Clinics list: {e}")
-        traceback.print_exc()
+    except ExecutionTimeout:
+        flash(query_budget.TIMEOUT_MESSAGE, 'warning')
+        return render_template(
+            'clinics/list.html', clinics=[], search_query=request.args.get('search', ''),
+        ), 503
+    except Exception:
+        log.exception('clinics list failed')
         flash('Error loading clinics', 'error')
         return render_template('clinics/list.html', clinics=[], search_query='')
 
@@ -80,13 +75,12 @@ def create_clinic():
                 'created_at': datetime.utcnow(),
                 'updated_at': datetime.utcnow(),
             }
-            result = mongo.db.clinics.insert_one(clinic_data)
-            audit('create', 'clinic', result.inserted_id, dentist_id=session['user_id'])
+            clinic_id = clinic_repo.create(clinic_data)
+            audit('create', 'clinic', clinic_id, dentist_id=session['user_id'])
             flash(f'Clinic "{name}" created successfully!', 'success')
             return redirect(url_for('clinics.list_clinics'))
-        except Exception as e:
-            print(f"[ERROR] Create clinic: {e}")
-            traceback.print_exc()
+        except Exception:
+            log.exception('create clinic failed')
             flash('Error creating clinic', 'error')
 
     return render_template('clinics/create.html')
@@ -96,34 +90,28 @@ def create_clinic():
 @role_required(ROLE_DENTIST)  # clinic settings = dentist/admin only
 def edit_clinic(clinic_id):
     try:
-        clinic = mongo.db.clinics.find_one({
-            '_id': ObjectId(clinic_id),
-            'owner_id': session['user_id'],
-        })
+        clinic = clinic_repo.get_owned(ObjectId(clinic_id), session['user_id'])
         if not clinic:
             flash('Clinic not found', 'error')
             return redirect(url_for('clinics.list_clinics'))
 
         if request.method == 'POST':
-            mongo.db.clinics.update_one(
-                {'_id': ObjectId(clinic_id)},
-                {'$set': {
-                    'name': (request.form.get('name') or '').strip(),
-                    'address': (request.form.get('address') or '').strip(),
-                    'phone': (request.form.get('phone') or '').strip(),
-                    'email': (request.form.get('email') or '').strip().lower(),
-                    'operating_hours': (request.form.get('operating_hours') or '').strip(),
-                    'currency': request.form.get('currency', 'PHP'),
-                    'updated_at': datetime.utcnow(),
-                }},
-            )
+            clinic_repo.update_owned(clinic['_id'], session['user_id'], {
+                'name': (request.form.get('name') or '').strip(),
+                'address': (request.form.get('address') or '').strip(),
+                'phone': (request.form.get('phone') or '').strip(),
+                'email': (request.form.get('email') or '').strip().lower(),
+                'operating_hours': (request.form.get('operating_hours') or '').strip(),
+                'currency': request.form.get('currency', 'PHP'),
+                'updated_at': datetime.utcnow(),
+            })
             audit('update', 'clinic', clinic_id, clinic=clinic)
             flash('Clinic updated successfully!', 'success')
             return redirect(url_for('clinics.list_clinics'))
 
         return render_template('clinics/edit.html', clinic=clinic)
-    except Exception as e:
-        print(f"Edit clinic error: {e}")
+    except Exception:
+        log.exception('edit clinic failed')
         flash('Error editing clinic', 'error')
         return redirect(url_for('clinics.list_clinics'))
 
@@ -132,13 +120,10 @@ def edit_clinic(clinic_id):
 @role_required(ROLE_DENTIST)  # clinic management is dentist/admin only
 def delete_clinic(clinic_id):
     try:
-        mongo.db.clinics.update_one(
-            {'_id': ObjectId(clinic_id), 'owner_id': session['user_id']},
-            {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}},
-        )
+        clinic_repo.deactivate_owned(ObjectId(clinic_id), session['user_id'])
         audit('delete', 'clinic', clinic_id, dentist_id=session['user_id'])
         flash('Clinic deleted successfully', 'success')
-    except Exception as e:
-        print(f"Delete clinic error: {e}")
+    except Exception:
+        log.exception('delete clinic failed')
         flash('Error deleting clinic', 'error')
     return redirect(url_for('clinics.list_clinics'))
@@ -46,7 +46,7 @@ def _resolve(entity_type, entity_id):
         pid = str(m['patient_id']) if m else None
     if not pid:
         return None, None
-    _, clinic = verify_patient_access(pid)
+    _, clinic = verify_patient_access(pid, patient_repo.ACCESS_FIELDS)
     return clinic, pid
 
 
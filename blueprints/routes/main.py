@@ -1,14 +1,22 @@
 # File: MyDentalPortal/app/routes/main.py
 # Dashboard and landing page routes
 
+import logging
+
 from flask import (
     Blueprint, render_template, session,
-    redirect, url_for, request, flash,
+    redirect, url_for, request, flash, current_app,
+    Response, abort, stream_with_context,
+)
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from extensions import limiter
+from blueprints.utils import login_required, role_required, ROLE_DENTIST, is_admin, audit
+from blueprints.utils import audit_export
+from blueprints.utils.passwords import (
+    BUSY_MESSAGE, PasswordHashBusy, hash_password, verify_password,
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
-
-from blueprints.utils import login_required, role_required, ROLE_DENTIST, is_admin
 from blueprints.repositories import users as user_repo
 from blueprints.repositories import clinics as clinic_repo
 from blueprints.repositories import patients as patient_repo
@@ -16,8 +24,10 @@ from blueprints.repositories import appointments as appt_repo
 from blueprints.repositories import audit_log as audit_repo
 
 main_bp = Blueprint('main', __name__)
+log = logging.getLogger(__name__)
 
 AUDIT_PAGE_SIZE = 50
+AUDIT_EXPORT_CHUNK = 1000
 
 
 @main_bp.route('/')
@@ -34,39 +44,88 @@ def privacy():
     return render_template('privacy.html')
 
 
+def _day_start_utc(day):
+    """'YYYY-MM-DD' (clinic timezone) -> naive UTC datetime of that midnight,
+    matching how audit timestamps are stored. None if blank/malformed."""
+    try:
+        local = datetime.strptime(day or '', '%Y-%m-%d')
+    except ValueError:
+        return None
+    tz = ZoneInfo(current_app.config.get('TIMEZONE', 'Asia/Manila'))
+    return local.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _actor_filter(actor):
+    """Actor filter value: an email resolves to that user's id; anything else
+    is taken as a user id. An unknown email matches nothing."""
+    if '@' in actor:
+        user = user_repo.get_by_email(actor.lower())
+        return str(user['_id']) if user else actor
+    return actor
+
+
+def _activity_scope():
+    """Parse the Activity filters from the query string (shared by the viewer
+    and the export). Non-admins are always scoped to their own dentist_id.
+    Returns (query, month, filtered, admin, dentist_id)."""
+    args = request.args
+    admin = is_admin()
+    month = args.get('month')
+    if month and month not in audit_repo.archive_months():
+        month = None
+
+    filters = {f: (args.get(f) or '').strip() for f in ('action', 'entity_type', 'entity_id')}
+    actor = (args.get('actor') or '').strip()
+    if actor:
+        filters['actor_user_id'] = _actor_filter(actor)
+    since = _day_start_utc(args.get('from'))
+    until = _day_start_utc(args.get('to'))
+    if until:
+        until += timedelta(days=1)  # 'to' is inclusive
+    filtered = bool(any(filters.values()) or since or until)
+
+    dentist_id = None if admin else session['user_id']
+    query = audit_repo.build_query(filters, dentist_id, since, until)
+    return query, month, filtered, admin, dentist_id
+
+
 @main_bp.route('/activity')
 @role_required(ROLE_DENTIST)
 def activity():
     """Audit-log viewer (nested scope): staff get 403 (role gate); a dentist sees
     their own clinics' activity (self + their staff); an app admin sees everything,
-    grouped by owning dentist. Entries are PHI-free (see audit_log repo)."""
-    page = max(1, request.args.get('page', 1, type=int))
-    skip = (page - 1) * AUDIT_PAGE_SIZE
-    admin = is_admin()
-
-    if admin:
-        entries = audit_repo.find_all(AUDIT_PAGE_SIZE, skip)
-        total = audit_repo.count_all()
-    else:
-        dentist_id = session['user_id']
-        entries = audit_repo.find_for_dentist(dentist_id, AUDIT_PAGE_SIZE, skip)
-        total = audit_repo.count_for_dentist(dentist_id)
-
-    # Resolve actor/dentist ids to display names (cached). Names of *users* (staff/
-    # dentists), never patient PHI — the entries themselves carry no patient data.
-    name_cache = {}
-
-    def name_of(uid):
-        if not uid:
-            return '—'
-        if uid not in name_cache:
-            u = user_repo.get(uid)
-            name_cache[uid] = (u.get('name') or u.get('email') or uid) if u else uid
-        return name_cache[uid]
+    grouped by owning dentist. Entries are PHI-free (see audit_log repo).
+
+    Filters (query string): action, entity_type, entity_id, actor (user id or
+    email), from/to (inclusive days, clinic timezone), month=YYYY-MM to read
+    that month's archive. Paged by keyset: ``before`` is the cursor of the
+    previous page's last entry."""
+    args = request.args
+    query, month, filtered, admin, dentist_id = _activity_scope()
+    before = audit_repo.decode_cursor(args.get('before'))
+    entries, next_cursor = audit_repo.find_page(
+        query, before=before, limit=AUDIT_PAGE_SIZE, month=month,
+    )
 
+    # Totals only for the unfiltered views (cheap there); a filtered count
+    # would scan everything the filter matches.
+    total = None
+    if not filtered:
+        if month:
+            total = audit_repo.count_archived(month, dentist_id)
+        elif admin:
+            total = audit_repo.count_all()
+        else:
+            total = audit_repo.count_for_dentist(dentist_id)
+
+    # Resolve actor/dentist ids to display names in one query. Names of *users*
+    # (staff/dentists), never patient PHI — the entries carry no patient data.
+    names = user_repo.names_for(
+        {e.get(k) for e in entries for k in ('actor_user_id', 'dentist_id')}
+    )
     for e in entries:
-        e['actor_name'] = name_of(e.get('actor_user_id'))
-        e['dentist_name'] = name_of(e.get('dentist_id'))
+        e['actor_name'] = names.get(e.get('actor_user_id'), '—')
+        e['dentist_name'] = names.get(e.get('dentist_id'), '—')
 
     # Admin view groups by owning dentist; dentist view is a flat list.
     grouped = None
@@ -77,11 +136,38 @@ def activity():
             grouped.setdefault(key, {'dentist_name': e['dentist_name'], 'entries': []})
             grouped[key]['entries'].append(e)
 
-    total_pages = max(1, (total + AUDIT_PAGE_SIZE - 1) // AUDIT_PAGE_SIZE)
+    # Current filters, carried on the paging links.
+    page_args = {k: v for k, v in args.items() if k != 'before' and v}
     return render_template(
         'audit/activity.html',
-        entries=entries, grouped=grouped, admin=admin,
-        page=page, total_pages=total_pages, total=total,
+        entries=entries, grouped=grouped, admin=admin, total=total,
+        month=month, archive_months=audit_repo.archive_months(), filters=args,
+        page_args=page_args, next_cursor=next_cursor, first_page=before is None,
+    )
+
+
+@main_bp.route('/activity/export')
+@role_required(ROLE_DENTIST)
+@limiter.limit('20 per hour', error_message='Too many exports. Please try again later.')
+def activity_export():
+    """Stream every entry matching the Activity filters as CSV (default) or
+    NDJSON (?format=ndjson) — a compliance extract, same scope as the viewer.
+    Streamed chunk by chunk (see utils.audit_export); the export itself is
+    audited."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in audit_export.FORMATS:
+        abort(400)
+    query, month, _, _, dentist_id = _activity_scope()
+    audit('export', 'audit_log', month, dentist_id=dentist_id)
+    chunks = audit_repo.iter_chunks(query, month=month, chunk_size=AUDIT_EXPORT_CHUNK)
+    filename = f"activity-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(audit_export.stream(fmt, chunks)),
+        mimetype=audit_export.FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no',  # let proxies pass chunks straight through
+        },
     )
 
 
@@ -149,8 +235,8 @@ def dashboard():
             stats=stats,
         )
 
-    except Exception as e:
-        print(f"Dashboard error: {e}")
+    except Exception:
+        log.exception('dashboard failed')
         empty = {
             'total_clinics': 0, 'total_patients': 0,
             'patients_this_month': 0, 'appointments_this_week': 0,
@@ -197,18 +283,21 @@ def settings():
             new = request.form.get('new_password') or ''
             confirm = request.form.get('confirm_password') or ''
 
-            if not check_password_hash(user['password'], current):
-                flash('Current password is incorrect', 'error')
-            elif len(new) < 8:
-                flash('New password must be at least 8 characters long', 'error')
-            elif new != confirm:
-                flash('New passwords do not match', 'error')
-            else:
-                user_repo.update_set(user['_id'], {
-                    'password': generate_password_hash(new),
-                    'updated_at': datetime.utcnow(),
-                })
-                flash('Password changed successfully', 'success')
+            try:
+                if not verify_password(user['password'], current, op='settings'):
+                    flash('Current password is incorrect', 'error')
+                elif len(new) < 8:
+                    flash('New password must be at least 8 characters long', 'error')
+                elif new != confirm:
+                    flash('New passwords do not match', 'error')
+                else:
+                    user_repo.update_set(user['_id'], {
+                        'password': hash_password(new, op='settings'),
+                        'updated_at': datetime.utcnow(),
+                    })
+                    flash('Password changed successfully', 'success')
+            except PasswordHashBusy:
+                flash(BUSY_MESSAGE, 'warning')
             return redirect(url_for('main.settings'))
 
     return render_template('settings.html', user=user)
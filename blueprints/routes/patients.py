@@ -1,14 +1,16 @@
 # File: MyDentalPortal/blueprints/routes/patients.py
 # Patient management routes — matches PDA paper form fields exactly
 
+import logging
+
 from flask import (
     Blueprint, render_template, request, session,
     redirect, url_for, flash, jsonify, send_file,
 )
 from bson.objectid import ObjectId
+from pymongo.errors import ExecutionTimeout
 from datetime import datetime
 import re
-import traceback
 
 from extensions import mongo
 from blueprints.utils import (
@@ -17,9 +19,14 @@ from blueprints.utils import (
 )
 from blueprints.repositories import patients as patient_repo
 from blueprints.repositories import clinics as clinic_repo
+from blueprints.repositories import treatments as treatment_repo
+from blueprints.repositories import appointments as appointment_repo
+from blueprints.repositories import uploads as upload_repo
+from blueprints.repositories import query_budget
 from werkzeug.utils import secure_filename
 
 patients_bp = Blueprint('patients', __name__)
+log = logging.getLogger(__name__)
 
 # _ensure_nested moved to the patients repository (blueprints/repositories/patients.py).
 # Kept as a module-level alias for backward compatibility with existing call sites.
@@ -31,9 +38,7 @@ _ensure_nested = patient_repo.ensure_nested
 @login_required
 def list_patients():
     try:
-        user_clinics = list(
-            mongo.db.clinics.find({'owner_id': session['user_id'], 'is_active': True})
-        )
+        user_clinics = clinic_repo.owned_by(session['user_id'])
         clinic_ids = [c['_id'] for c in user_clinics]
 
         search_query = request.args.get('search', '')
@@ -70,15 +75,10 @@ def list_patients():
 
         page = max(1, request.args.get('page', 1, type=int))
         per_page = 20
-        total = mongo.db.patients.count_documents(query)
-        total_pages = max(1, (total + per_page - 1) // per_page)
-
-        patients = list(
-            mongo.db.patients.find(query)
-            .sort(sort_options[sort_by])
-            .skip((page - 1) * per_page)
-            .limit(per_page)
+        patients, total = patient_repo.page_matching(
+            query, sort_options[sort_by], (page - 1) * per_page, per_page,
         )
+        total_pages = max(1, (total + per_page - 1) // per_page)
 
         # Ensure nested dicts for safe template access
         for p in patients:
@@ -94,9 +94,19 @@ def list_patients():
             search_query=search_query,
             sort_by=sort_by,
         )
-    except Exception as e:
-        print(f"[ERROR] Patients list: {e}")
-        traceback.print_exc()
+    except ExecutionTimeout:
+        # Over the query budget: keep the search box filled so it can be narrowed.
+        flash(query_budget.TIMEOUT_MESSAGE, 'warning')
+        return render_template(
+            'patients/list.html',
+            patients=[], clinics=[],
+            current_page=1, total_pages=1,
+            selected_clinic=request.args.get('clinic_id', ''),
+            search_query=request.args.get('search', ''),
+            sort_by=request.args.get('sort', 'name_asc'),
+        ), 503
+    except Exception:
+        log.exception('patients list failed')
         flash('Error loading patients', 'error')
         return render_template(
             'patients/list.html',
@@ -264,8 +274,7 @@ def create_patient():
                                     patient_id=str(inserted_id)))
 
         except Exception as e:
-            print(f"[ERROR] Create patient: {e}")
-            traceback.print_exc()
+            log.exception('create patient failed')
             flash(f'Error creating patient record: {e}', 'error')
             return render_template('patients/create.html',
                                    clinics=user_clinics, form_data=f)
@@ -279,16 +288,14 @@ def create_patient():
 @login_required
 def patient_detail(patient_id):
     try:
-        print(f"[DEBUG] Loading patient: {patient_id}")
-
         patient = mongo.db.patients.find_one({'_id': ObjectId(patient_id)})
         if not patient:
-            print(f"[ERROR] Patient not found: {patient_id}")
+            log.info('patient not found', extra={'patient_id': patient_id})
             flash('Patient not found', 'error')
             return redirect(url_for('patients.list_patients'))
 
-        print(f"[DEBUG] Patient found: {patient.get('personal_info', {}).get('first_name', '?')}")
-        print(f"[DEBUG] Patient clinic_id: {patient.get('clinic_id')} (type: {type(patient.get('clinic_id'))})")
+        log.debug('patient loaded', extra={'patient_id': patient_id,
+                                           'clinic_id': patient.get('clinic_id')})
 
         # Look up clinic — try owner_id match first, fall back to just _id
         clinic = mongo.db.clinics.find_one({
@@ -297,7 +304,8 @@ def patient_detail(patient_id):
         })
         if not clinic:
             # Owner mismatch or missing clinic — deny access (don't leak existence).
-            print(f"[ERROR] Access denied for patient {patient_id} (not owner)")
+            log.warning('patient access denied (not clinic owner)',
+                        extra={'patient_id': patient_id})
             flash('Patient not found', 'error')
             return redirect(url_for('patients.list_patients'))
 
@@ -307,26 +315,11 @@ def patient_detail(patient_id):
         dental_chart = mongo.db.dental_charts.find_one(
             {'patient_id': ObjectId(patient_id)}
         )
-        treatment_records = list(
-            mongo.db.treatment_records.find({'patient_id': ObjectId(patient_id)})
-            .sort('date', -1).limit(20)
-        )
-        patient_appointments = list(
-            mongo.db.appointments.find({
-                'patient_id': ObjectId(patient_id),
-                'is_active': True,
-            }).sort([('date', -1), ('time', -1)]).limit(10)
-        )
-        prescriptions = list(
-            mongo.db.prescriptions.find({'patient_id': ObjectId(patient_id)})
-            .sort('created_at', -1)
-        )
-        patient_files = list(
-            mongo.db.patient_files.find({'patient_id': ObjectId(patient_id)})
-            .sort('created_at', -1)
-        )
+        treatment_records = treatment_repo.list_for_patient(patient_id, limit=20)
+        patient_appointments = appointment_repo.recent_for_patient(patient_id)
+        prescriptions = upload_repo.prescriptions_for_patient(patient_id)
+        patient_files = upload_repo.files_for_patient(patient_id)
 
-        print(f"[DEBUG] Rendering patient detail OK")
         return render_template(
             'patients/detail.html',
             patient=patient,
@@ -338,8 +331,7 @@ def patient_detail(patient_id):
             patient_files=patient_files,
         )
     except Exception as e:
-        print(f"[ERROR] Patient detail failed: {e}")
-        traceback.print_exc()
+        log.exception('patient detail failed')
         flash(f'Error loading patient details: {e}', 'error')
         return redirect(url_for('patients.list_patients'))
 
@@ -372,9 +364,8 @@ def patient_pdf(patient_id):
                          as_attachment=True, download_name=fname + '.pdf')
         resp.headers['X-Content-Type-Options'] = 'nosniff'
         return resp
-    except Exception as e:
-        print(f"[ERROR] Patient PDF: {e}")
-        traceback.print_exc()
+    except Exception:
+        log.exception('patient PDF failed')
         flash('Could not generate the PDF.', 'error')
         return redirect(url_for('patients.patient_detail', patient_id=patient_id))
 
@@ -480,8 +471,7 @@ def edit_patient(patient_id):
         return render_template('patients/edit.html',
                                patient=patient, clinics=user_clinics, clinic=clinic)
     except Exception as e:
-        print(f"[ERROR] Edit patient: {e}")
-        traceback.print_exc()
+        log.exception('edit patient failed')
         flash(f'Error editing patient: {e}', 'error')
         return redirect(url_for('patients.list_patients'))
 
@@ -500,16 +490,12 @@ def delete_patient(patient_id):
                 'owner_id': session['user_id'],
             })
         if patient and clinic:
-            mongo.db.patients.update_one(
-                {'_id': ObjectId(patient_id)},
-                {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}},
-            )
+            patient_repo.update_set(patient_id, {'is_active': False, 'updated_at': datetime.utcnow()})
             audit('delete', 'patient', patient_id, clinic=clinic)
             flash('Patient record deleted', 'success')
         else:
             flash('Patient not found', 'error')
     except Exception as e:
-        print(f"[ERROR] Delete patient: {e}")
-        traceback.print_exc()
+        log.exception('delete patient failed')
         flash(f'Error deleting patient: {e}', 'error')
     return redirect(url_for('patients.list_patients'))
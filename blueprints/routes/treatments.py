@@ -1,13 +1,14 @@
 # File: MyDentalPortal/app/routes/treatments.py
 # Treatment record routes — scalable design for future additions
 
+import logging
+
 from flask import (
     Blueprint, render_template, request, jsonify,
     session, redirect, url_for, flash,
 )
 from bson.objectid import ObjectId
 from datetime import datetime
-import traceback
 
 from blueprints.utils import (
     login_required, verify_patient_access as _verify_patient_access,
@@ -18,6 +19,7 @@ from blueprints.repositories import treatments as treatment_repo
 from blueprints.repositories import patients as patient_repo
 
 treatments_bp = Blueprint('treatments', __name__)
+log = logging.getLogger(__name__)
 
 
 def _is_price_confirmer():
@@ -78,9 +80,8 @@ def add_treatment(patient_id):
             flash('Treatment record added successfully!', 'success')
             return redirect(url_for('patients.patient_detail', patient_id=patient_id))
 
-        except Exception as e:
-            print(f"[ERROR] Add treatment: {e}")
-            traceback.print_exc()
+        except Exception:
+            log.exception('add treatment failed')
             flash('Error adding treatment record', 'error')
 
     return render_template(
@@ -156,9 +157,8 @@ def edit_treatment(treatment_id):
             'treatments/edit.html',
             treatment=treatment, patient=patient, clinic=clinic,
         )
-    except Exception as e:
-        print(f"[ERROR] Edit treatment: {e}")
-        traceback.print_exc()
+    except Exception:
+        log.exception('edit treatment failed')
         flash('Error editing treatment', 'error')
         return redirect(url_for('patients.list_patients'))
 
@@ -171,7 +171,8 @@ def mark_paid(treatment_id):
     try:
         treatment = treatment_repo.get(treatment_id)
         if treatment:
-            patient, clinic = _verify_patient_access(str(treatment['patient_id']))
+            _, clinic = _verify_patient_access(
+                str(treatment['patient_id']), patient_repo.ACCESS_FIELDS)
             if clinic:
                 charged = float(treatment.get('amount_charged') or 0)
                 treatment_repo.update_set(treatment_id, {
@@ -184,9 +185,8 @@ def mark_paid(treatment_id):
                 return redirect(url_for('patients.patient_detail',
                                         patient_id=str(treatment['patient_id'])))
         flash('Access denied or treatment not found', 'error')
-    except Exception as e:
-        print(f"[ERROR] Mark paid: {e}")
-        traceback.print_exc()
+    except Exception:
+        log.exception('mark paid failed')
         flash('Error updating payment', 'error')
     return redirect(url_for('patients.list_patients'))
 
@@ -198,7 +198,8 @@ def delete_treatment(treatment_id):
     try:
         treatment = treatment_repo.get(treatment_id)
         if treatment:
-            patient, clinic = _verify_patient_access(str(treatment['patient_id']))
+            _, clinic = _verify_patient_access(
+                str(treatment['patient_id']), patient_repo.ACCESS_FIELDS)
             if clinic:
                 treatment_repo.delete(treatment_id)
                 audit('delete', 'treatment', treatment_id, clinic=clinic)
@@ -206,8 +207,8 @@ def delete_treatment(treatment_id):
                 return redirect(url_for('patients.patient_detail',
                                         patient_id=str(treatment['patient_id'])))
         flash('Access denied or treatment not found', 'error')
-    except Exception as e:
-        print(f"Delete treatment error: {e}")
+    except Exception:
+        log.exception('delete treatment failed')
         flash('Error deleting treatment', 'error')
     return redirect(url_for('patients.list_patients'))
 
@@ -219,7 +220,8 @@ def confirm_price(treatment_id):
     """Dentist/admin confirms a pending (staff-proposed) treatment price."""
     treatment = treatment_repo.get(treatment_id)
     if treatment:
-        patient, clinic = _verify_patient_access(str(treatment['patient_id']))
+        _, clinic = _verify_patient_access(
+            str(treatment['patient_id']), patient_repo.ACCESS_FIELDS)
         if clinic:
             treatment_repo.update_set(treatment_id, {
                 'price_confirmed': True,
@@ -245,7 +247,7 @@ def pending_prices():
     clinic_ids = None if is_admin() else _user_clinic_ids()
     rows = treatment_repo.find_pending_prices(clinic_ids)
     for r in rows:
-        p = patient_repo.get(str(r.get('patient_id')))
+        p = patient_repo.get(str(r.get('patient_id')), include_archived=True)
         pi = (p or {}).get('personal_info', {})
         r['patient_name'] = f"{pi.get('first_name', '')} {pi.get('last_name', '')}".strip() or '—'
     return render_template('treatments/pending_prices.html', treatments=rows)
@@ -256,7 +258,7 @@ def pending_prices():
 @login_required
 def get_treatments_api(patient_id):
     """Return treatments as JSON for dynamic loading."""
-    patient, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.ACCESS_FIELDS)
     if not clinic:
         return jsonify({'error': 'Access denied'}), 403
 
@@ -26,6 +26,7 @@ from blueprints.utils import (
 )
 from blueprints.repositories import uploads as uploads_repo
 from blueprints.repositories import patients as patient_repo
+import metrics
 
 uploads_bp = Blueprint('uploads', __name__)
 
@@ -112,7 +113,7 @@ def _store(data, original_name, ext):
 @uploads_bp.route('/patients/<patient_id>/photo', methods=['POST'])
 @login_required
 def set_photo(patient_id):
-    patient, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.PHOTO_FIELDS)
     if not clinic:
         flash('Access denied or patient not found', 'error')
         return redirect(url_for('patients.list_patients'))
@@ -145,11 +146,10 @@ def set_photo(patient_id):
 @uploads_bp.route('/patients/<patient_id>/photo')
 @login_required
 def patient_photo(patient_id):
-    _, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.PHOTO_FIELDS)
     if not clinic:
         abort(403)
-    patient = patient_repo.get(patient_id)
-    if not patient or not patient.get('photo_file_id'):
+    if not patient.get('photo_file_id'):
         abort(404)
     gf = uploads_repo.get_blob(patient['photo_file_id'])
     if gf is None:
@@ -164,6 +164,7 @@ def patient_photo(patient_id):
         download_name='patient_photo',
     )
     resp.headers['X-Content-Type-Options'] = 'nosniff'
+    metrics.count_gridfs_bytes(getattr(gf, 'length', 0))
     # The photo is stable until it's replaced, so let the browser cache it
     # privately. Without this, the patient-detail page re-downloads the full
     # image on every view. PHI -> private (never shared/proxy caches).
@@ -174,7 +175,7 @@ def patient_photo(patient_id):
 @uploads_bp.route('/patients/<patient_id>/photo/delete', methods=['POST'])
 @role_required(ROLE_DENTIST)  # deleting records/files is dentist/admin only (staff: request later)
 def delete_photo(patient_id):
-    patient, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.PHOTO_FIELDS)
     if not clinic:
         flash('Access denied or patient not found', 'error')
         return redirect(url_for('patients.list_patients'))
@@ -189,7 +190,7 @@ def delete_photo(patient_id):
 @uploads_bp.route('/patients/<patient_id>/prescriptions/add', methods=['POST'])
 @login_required
 def add_prescription(patient_id):
-    patient, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.ACCESS_FIELDS)
     if not clinic:
         flash('Access denied or patient not found', 'error')
         return redirect(url_for('patients.list_patients'))
@@ -233,7 +234,7 @@ def prescription_image(prescription_id):
     pres = uploads_repo.get_prescription(prescription_id)
     if not pres or not pres.get('image_file_id'):
         abort(404)
-    _, clinic = _verify_patient_access(str(pres['patient_id']))
+    _, clinic = _verify_patient_access(str(pres['patient_id']), patient_repo.ACCESS_FIELDS)
     if not clinic:
         abort(403)
     gf = uploads_repo.get_blob(pres['image_file_id'])
@@ -248,6 +249,7 @@ def prescription_image(prescription_id):
         download_name=pres.get('image_name') or 'image',
     )
     resp.headers['X-Content-Type-Options'] = 'nosniff'
+    metrics.count_gridfs_bytes(getattr(gf, 'length', 0))
     return resp
 
 
@@ -256,7 +258,7 @@ def prescription_image(prescription_id):
 def delete_prescription(prescription_id):
     pres = uploads_repo.get_prescription(prescription_id)
     if pres:
-        _, clinic = _verify_patient_access(str(pres['patient_id']))
+        _, clinic = _verify_patient_access(str(pres['patient_id']), patient_repo.ACCESS_FIELDS)
         if clinic:
             uploads_repo.delete_blob(pres.get('image_file_id'))
             uploads_repo.delete_prescription(pres['_id'])
@@ -272,7 +274,7 @@ def delete_prescription(prescription_id):
 @uploads_bp.route('/patients/<patient_id>/files/add', methods=['POST'])
 @login_required
 def add_file(patient_id):
-    patient, clinic = _verify_patient_access(patient_id)
+    patient, clinic = _verify_patient_access(patient_id, patient_repo.ACCESS_FIELDS)
     if not clinic:
         flash('Access denied or patient not found', 'error')
         return redirect(url_for('patients.list_patients'))
@@ -313,7 +315,7 @@ def download_file(file_doc_id):
     meta = uploads_repo.get_file(file_doc_id)
     if not meta:
         abort(404)
-    _, clinic = _verify_patient_access(str(meta['patient_id']))
+    _, clinic = _verify_patient_access(str(meta['patient_id']), patient_repo.ACCESS_FIELDS)
     if not clinic:
         abort(403)
     gf = uploads_repo.get_blob(meta['file_id'])
@@ -332,6 +334,7 @@ def download_file(file_doc_id):
         download_name=secure_filename(name),
     )
     resp.headers['X-Content-Type-Options'] = 'nosniff'
+    metrics.count_gridfs_bytes(getattr(gf, 'length', 0))
     return resp
 
 
@@ -340,7 +343,7 @@ def download_file(file_doc_id):
 def rename_file(file_doc_id):
     meta = uploads_repo.get_file(file_doc_id)
     if meta:
-        _, clinic = _verify_patient_access(str(meta['patient_id']))
+        _, clinic = _verify_patient_access(str(meta['patient_id']), patient_repo.ACCESS_FIELDS)
         if clinic:
             new_name = (request.form.get('display_name') or '').strip()
             if new_name:
@@ -360,7 +363,7 @@ def rename_file(file_doc_id):
 def delete_file(file_doc_id):
     meta = uploads_repo.get_file(file_doc_id)
     if meta:
-        _, clinic = _verify_patient_access(str(meta['patient_id']))
+        _, clinic = _verify_patient_access(str(meta['patient_id']), patient_repo.ACCESS_FIELDS)
         if clinic:
             uploads_repo.delete_blob(meta['file_id'])
             uploads_repo.delete_file(meta['_id'])
@@ -5,6 +5,7 @@
 # single source of truth — important for security, since access-control logic
 # must behave identically everywhere.
 
+import logging
 from functools import wraps
 
 from flask import session, redirect, url_for, current_app, abort
@@ -13,6 +14,7 @@ from blueprints.repositories import patients as _patient_repo
 from blueprints.repositories import clinics as _clinic_repo
 from blueprints.repositories import audit_log as _audit_repo
 
+log = logging.getLogger(__name__)
 
 # Role vocabulary. App Admin is a global superset; Dentist owns clinics; Staff
 # (assistant/receptionist) is the constrained role multi-staff will introduce.
@@ -40,16 +42,18 @@ def user_clinic_ids():
     return _clinic_repo.accessible_ids(session['user_id'])
 
 
-def verify_patient_access(patient_id):
+def verify_patient_access(patient_id, fields=None):
     """Return (patient, clinic) only if the current user may access the patient.
 
     Access = the patient's clinic is owned by the user (dentist) or by a dentist
     the user is a staff member of. Returns (None, None) for a missing/invalid id;
     (patient, None) for a patient the user may not access — the caller must treat
     a None clinic as access denied. Delegates to the patients repository (the
-    multi-staff access seam).
+    multi-staff access seam), which memoizes the answer for the request.
+    ``fields`` limits the patient fields returned (e.g. patients.ACCESS_FIELDS
+    for routes that only need the access answer).
     """
-    return _patient_repo.get_for_accessor(patient_id, session['user_id'])
+    return _patient_repo.get_for_accessor(patient_id, session['user_id'], fields)
 
 
 def is_admin():
@@ -118,5 +122,5 @@ def audit(action, entity_type, entity_id=None, clinic=None, dentist_id=None):
             actor_role=session.get('user_role', ROLE_DENTIST),
             clinic_id=clinic_id, dentist_id=dentist_id,
         )
-    except Exception as e:  # noqa: BLE001 - audit must never break the request
-        print(f"[ERROR] audit log write failed: {e}")
+    except Exception:  # noqa: BLE001 - audit must never break the request
+        log.exception('audit log write failed')
@@ -0,0 +1,85 @@
+# File: MyDentalPortal/blueprints/utils/audit_export.py
+# Audit-log extracts (compliance requests) as NDJSON or CSV, streamed.
+#
+# Rows are built from chunks (audit_log.iter_chunks), so memory is one chunk
+# plus the name cache however large the extract is. Actor/dentist names are
+# resolved per chunk with ONE users query for the ids not seen yet.
+#
+# PHI: same contract as audit_log.record — only FIELDS are written, picked
+# from the entry (anything else on a document is never emitted). Names are of
+# staff/dentist accounts, never patients.
+
+import csv
+import io
+import json
+
+from blueprints.repositories import users as _user_repo
+
+FIELDS = (
+    'timestamp', 'action', 'entity_type', 'entity_id',
+    'actor_user_id', 'actor_name', 'actor_role',
+    'clinic_id', 'dentist_id', 'dentist_name',
+)
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# Spreadsheet apps evaluate cells starting with these; prefix them with a quote.
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _rows(chunks):
+    """(chunk of row dicts) per chunk of entries, names resolved in batches."""
+    names = {}
+    for chunk in chunks:
+        wanted = {e.get(k) for e in chunk for k in ('actor_user_id', 'dentist_id')}
+        missing = {uid for uid in wanted if uid and uid not in names}
+        if missing:
+            names.update(_user_repo.names_for(missing))
+        rows = []
+        for e in chunk:
+            ts = e.get('timestamp')
+            rows.append({
+                'timestamp': ts.isoformat(timespec='milliseconds') + 'Z' if ts else None,
+                'action': e.get('action'),
+                'entity_type': e.get('entity_type'),
+                'entity_id': e.get('entity_id'),
+                'actor_user_id': e.get('actor_user_id'),
+                'actor_name': names.get(e.get('actor_user_id')),
+                'actor_role': e.get('actor_role'),
+                'clinic_id': str(e['clinic_id']) if e.get('clinic_id') else None,
+                'dentist_id': e.get('dentist_id'),
+                'dentist_name': names.get(e.get('dentist_id')),
+            })
+        yield rows
+
+
+def ndjson(chunks):
+    """One JSON object per line; yields one string per chunk."""
+    for rows in _rows(chunks):
+        yield ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in rows)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    value = str(value)
+    return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+
+
+def csv_lines(chunks):
+    """Header line, then one string of CSV rows per chunk."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(FIELDS)
+    yield buf.getvalue()
+    for rows in _rows(chunks):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_cell(r[f]) for f in FIELDS] for r in rows)
+        yield buf.getvalue()
+
+
+def stream(fmt, chunks):
+    """The body generator for `fmt` (a FORMATS key)."""
+    return ndjson(chunks) if fmt == 'ndjson' else csv_lines(chunks)
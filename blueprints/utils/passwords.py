@@ -0,0 +1,109 @@
+# File: MyDentalPortal/blueprints/utils/passwords.py
+# Password hashing through a small, size-capped executor.
+#
+# Why: werkzeug's pbkdf2 hash/verify is deliberately slow (hundreds of ms of
+# CPU). Run inline, a morning login burst puts every one of a worker's 4
+# gthreads into pbkdf2 and page loads for everyone else queue behind them.
+#
+# Design:
+#   * One executor per worker process (created lazily, so per gunicorn fork)
+#     with PASSWORD_HASH_WORKERS threads — how many hashes may burn CPU at once.
+#   * Admission is capped at workers + PASSWORD_HASH_QUEUE jobs. Beyond that the
+#     caller gets PasswordHashBusy at once and shows a "try again" (503 +
+#     Retry-After) instead of parking another request thread. With the
+#     defaults (1 + 1) at most 2 of a worker's 4 threads are ever tied up in
+#     hashing. A job that doesn't finish within PASSWORD_HASH_TIMEOUT_SECONDS
+#     is also reported busy.
+#   * Constant time is kept: login runs exactly one verify job whether or not
+#     the account exists (against a dummy hash for unknown emails), and
+#     admission depends only on executor load — never on the account — so a
+#     "busy" answer reveals nothing about which emails are registered.
+#   * Queue depth at submit, queue wait and busy/timeout outcomes go to
+#     /admin/metrics (dentalportal_password_hash_*).
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+
+BUSY_MESSAGE = 'The server is busy right now. Please try again in a moment.'
+RETRY_AFTER_SECONDS = 2
+
+
+class PasswordHashBusy(Exception):
+    """The hashing executor is saturated; ask the user to retry shortly."""
+
+
+class _HashExecutor:
+    def __init__(self, workers, queue, timeout):
+        self.pid = os.getpid()
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pwhash')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._lock = threading.Lock()
+        self.depth = 0  # admitted jobs not yet finished (running + queued)
+
+    def _done(self, _future):
+        with self._lock:
+            self.depth -= 1
+        self._slots.release()
+
+    def run(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.password_hash(op, 'busy')
+            raise PasswordHashBusy()
+        with self._lock:
+            ahead = self.depth
+            self.depth += 1
+        submitted = time.perf_counter()
+        started = []
+
+        def job():
+            started.append(time.perf_counter())
+            return fn(*args)
+
+        future = self._pool.submit(job)
+        future.add_done_callback(self._done)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The job still finishes (and frees its slot) in the background.
+            metrics.password_hash(op, 'timeout', depth=ahead)
+            raise PasswordHashBusy()
+        metrics.password_hash(op, 'ok', depth=ahead, wait=started[0] - submitted)
+        return result
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    ex = _executor
+    if ex is None or ex.pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor.pid != os.getpid():
+                cfg = current_app.config
+                _executor = _HashExecutor(
+                    workers=max(int(cfg.get('PASSWORD_HASH_WORKERS', 1)), 1),
+                    queue=max(int(cfg.get('PASSWORD_HASH_QUEUE', 1)), 0),
+                    timeout=float(cfg.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10)),
+                )
+            ex = _executor
+    return ex
+
+
+def hash_password(password, op='hash'):
+    """generate_password_hash on the executor. Raises PasswordHashBusy."""
+    return _get_executor().run(op, generate_password_hash, password)
+
+
+def verify_password(pwhash, password, op='verify'):
+    """check_password_hash on the executor. Raises PasswordHashBusy."""
+    return _get_executor().run(op, check_password_hash, pwhash, password)
@@ -0,0 +1,151 @@
+# File: MyDentalPortal/compression.py
+# Response compression: gzip/brotli for dynamic HTML/JSON, and precompressed
+# .br/.gz siblings for the fingerprinted static files.
+#
+# Why: nothing in front of gunicorn compresses, so the patient-detail page, the
+# calendar JSON and the reports data went out raw. They are text and shrink
+# 5-10x.
+#
+# Design:
+#   * after_request hook, registered before the other hooks so it runs last
+#     and compresses the final body. It negotiates Accept-Encoding (br preferred
+#     over gzip at equal q) and only touches responses that are:
+#       - buffered: streamed responses (generators) and send_file() responses
+#         (direct_passthrough: GridFS photos/files, PDFs) pass through untouched,
+#         so nothing is read into memory that wasn't already there;
+#       - a text type in COMPRESSIBLE_TYPES, never one of the upload
+#         CONTENT_TYPES (images, PDFs, ZIP-based iWork/Office files are already
+#         compressed — re-compressing only burns CPU);
+#       - at least COMPRESS_MIN_BYTES, not already encoded, not no-transform.
+#   * Dynamic responses use cheap settings (gzip 6 / brotli 4): per-request
+#     CPU on a 2-worker instance matters more than the last few percent.
+#   * Static: scripts/build_assets.py writes <file>.br / <file>.gz next to each
+#     dist/ file at maximum compression, once. The static view serves the best
+#     sibling the client accepts with Content-Encoding set; no per-request work.
+#   * Brotli is optional (the Brotli wheel): without it everything falls back
+#     to gzip.
+#   * BREACH: compressed HTML carries the CSRF token, but Flask-WTF's token is
+#     re-signed with a timestamp on every render and no session secret is
+#     echoed in the body, so there is no fixed secret to recover byte by byte.
+
+import gzip
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
+
+try:  # optional: gzip-only without it
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Preference order at equal quality. Suffix = precompressed static sibling.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'application/xml', 'image/svg+xml',
+}
+
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 6}
+STATIC_LEVELS = {'br': 11, 'gzip': 9}
+
+
+def available_encodings():
+    return [e for e in ENCODINGS if e != 'br' or brotli is not None]
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output byte-identical between builds.
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress(data, encoding):
+    if encoding == 'br':
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def negotiate(accept_encoding, offered):
+    """Best of `offered` for an Accept-Encoding header, or None for identity."""
+    if not offered or not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(offered)
+
+
+def _skip_types():
+    # The upload allowlist is the authority on what the app serves as binary.
+    from blueprints.routes.uploads import CONTENT_TYPES
+    return set(CONTENT_TYPES.values())
+
+
+_SKIP_TYPES = set()
+
+
+def compress_response(response):
+    config = current_app.config
+    if not config.get('COMPRESS_RESPONSES', True):
+        return response
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    mimetype = response.mimetype
+    if mimetype in _SKIP_TYPES or mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    # Vary even when this client gets identity: a shared cache must not hand
+    # the plain body to a client that asked for gzip, or vice versa.
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'), available_encodings())
+    min_bytes = config.get('COMPRESS_MIN_BYTES', 1024)
+    if encoding is None or (response.content_length or 0) < min_bytes:
+        return response
+
+    response.set_data(compress(response.get_data(), encoding, DYNAMIC_LEVELS[encoding]))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+def _sibling(folder, filename, encoding):
+    path = safe_join(folder, filename + ENCODINGS[encoding])
+    return path is not None and os.path.isfile(path)
+
+
+def send_static_file(filename):
+    """Flask's static view, preferring a precompressed .br/.gz sibling."""
+    app = current_app
+    # Serving a .br needs no brotli module, only a client that accepts it.
+    offered = [e for e in ENCODINGS if _sibling(app.static_folder, filename, e)]
+    encoding = negotiate(request.headers.get('Accept-Encoding'), offered)
+    if encoding is None:
+        response = app.send_static_file(filename)
+    else:
+        mimetype, _ = mimetypes.guess_type(filename)
+        response = send_from_directory(
+            app.static_folder, filename + ENCODINGS[encoding],
+            mimetype=mimetype or 'application/octet-stream',
+            max_age=app.get_send_file_max_age(filename),
+        )
+        response.headers['Content-Encoding'] = encoding
+    if offered:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Install the compression hook and the precompressed static view.
+
+    Call before any other @app.after_request so this hook runs last."""
+    _SKIP_TYPES.update(_skip_types())
+    app.after_request(compress_response)
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = send_static_file
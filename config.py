@@ -23,6 +23,88 @@ class Config:
     # requests. Health data should not sit open on an unattended screen. Override
     # with IDLE_TIMEOUT_SECONDS; 0 disables.
     IDLE_TIMEOUT_SECONDS = int(os.environ.get('IDLE_TIMEOUT_SECONDS', '1800') or 0)  # 30 min
+    # The idle timer's activity stamp is written at most once per this many
+    # seconds — every write is a session write (a Set-Cookie, or a DB write with
+    # server-side sessions). The timeout is accurate to within this interval;
+    # 0 stamps on every request.
+    ACTIVITY_STAMP_INTERVAL_SECONDS = int(os.environ.get('ACTIVITY_STAMP_INTERVAL_SECONDS', '60') or 0)
+    # Only send Set-Cookie when the session changed. The throttled stamp above
+    # still refreshes a permanent cookie's expiry while the user is active.
+    SESSION_REFRESH_EACH_REQUEST = False
+    # Session storage: 'cookie' (Flask's signed cookie, default) or 'mongo'
+    # (server-side, see session_store.py — the cookie holds only an opaque id).
+    SESSION_BACKEND = (os.environ.get('SESSION_BACKEND') or 'cookie').strip().lower()
+    # Per-worker read-through cache lifetime for server-side sessions. Also the
+    # longest a session revoked on one worker can still be served by another.
+    SESSION_CACHE_SECONDS = int(os.environ.get('SESSION_CACHE_SECONDS', '10') or 0)
+
+    # Per-worker cache of each user's accessible owner/clinic ids
+    # (blueprints/repositories/access_cache.py). Membership and clinic changes
+    # reach every worker on its next request via a version stamp; this is only
+    # the backstop for writes made outside the app. 0 disables the cache.
+    ACCESS_CACHE_SECONDS = int(os.environ.get('ACCESS_CACHE_SECONDS', '30') or 0)
+
+    # Response compression (compression.py). Turn off if a proxy in front
+    # already compresses. Bodies smaller than COMPRESS_MIN_BYTES go out as-is:
+    # below ~1 KB the headers dominate and the CPU isn't worth it.
+    COMPRESS_RESPONSES = (os.environ.get('COMPRESS_RESPONSES') or 'true').strip().lower() != 'false'
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024') or 0)
+
+    # Password hashing executor (blueprints/utils/passwords.py), per worker:
+    # hashes run at once, extra jobs allowed to wait, and the longest a request
+    # waits before getting "busy, try again". Keep WORKERS + QUEUE below the
+    # gunicorn thread count so logins can't occupy every request thread.
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '1') or 1)
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', '1') or 0)
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', '10') or 10)
+
+    # Admission control (admission.py), per worker: concurrent heavy requests
+    # (PDFs, reports, exports, uploads/downloads), concurrent requests of any
+    # kind, and how long a request may wait for a slot before a 503. Keep the
+    # interactive limit below the gunicorn thread count so /health always has
+    # a thread. 0 turns a limit off.
+    ADMISSION_HEAVY_LIMIT = int(os.environ.get('ADMISSION_HEAVY_LIMIT', '2') or 0)
+    ADMISSION_INTERACTIVE_LIMIT = int(os.environ.get('ADMISSION_INTERACTIVE_LIMIT', '3') or 0)
+    ADMISSION_WAIT_SECONDS = float(os.environ.get('ADMISSION_WAIT_SECONDS', '2') or 0)
+
+    # Per-user rate budget for expensive endpoints (rate_budget.py), shared by
+    # all workers via Mongo. Units are page views: a PDF costs 10, a report 5.
+    # Plain pages cost RATE_BUDGET_PAGE_COST (0 = not metered). Capacity 0
+    # turns the budget off.
+    RATE_BUDGET_CAPACITY = int(os.environ.get('RATE_BUDGET_CAPACITY', '60') or 0)
+    RATE_BUDGET_REFILL_PER_MINUTE = float(os.environ.get('RATE_BUDGET_REFILL_PER_MINUTE', '20') or 20)
+    RATE_BUDGET_PAGE_COST = int(os.environ.get('RATE_BUDGET_PAGE_COST', '0') or 0)
+
+    # Flask-Limiter storage (login/registration limits). shm:// is a counter
+    # table in a shared-memory file that every worker on this host uses
+    # (limiter_storage.py; optional path and size: shm:///dev/shm/x?slots=N —
+    # a file another user owns or can read is refused, not shared).
+    # For several instances use a mongodb:// URI (the `limits` collection of
+    # database `limits`); memory:// keeps per-worker counters.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or 'shm://'
+
+    # Server-side time budgets (maxTimeMS) for repository reads, per route class
+    # (blueprints/repositories/query_budget.py). A read over budget is stopped by
+    # MongoDB and the user asked to narrow it. 0 = no limit for that class.
+    QUERY_BUDGET_INTERACTIVE_MS = int(os.environ.get('QUERY_BUDGET_INTERACTIVE_MS', '5000') or 0)
+    QUERY_BUDGET_REPORT_MS = int(os.environ.get('QUERY_BUDGET_REPORT_MS', '30000') or 0)
+    QUERY_BUDGET_EXPORT_MS = int(os.environ.get('QUERY_BUDGET_EXPORT_MS', '60000') or 0)
+
+    # Worker warm-up (warmup.py): compiled templates are cached on disk, shared
+    # by the workers of one instance, and each new worker compiles every
+    # template before serving unless TEMPLATE_WARMUP=false. TEMPLATE_CACHE_DIR
+    # unset = Jinja's private per-user temp dir; '' = no cache; a path must be a
+    # directory owned by this user and closed to everyone else.
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
+    TEMPLATE_WARMUP = (os.environ.get('TEMPLATE_WARMUP') or 'true').strip().lower() != 'false'
+
+    # Logging (logs.py): JSON lines on stdout, written off the request thread.
+    # LOG_LEVEL applies to everything (default INFO; DEBUG under the debug
+    # server). LOG_LEVELS overrides single modules, e.g.
+    # "blueprints.routes.patients=DEBUG,pymongo=WARNING".
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or None
+    LOG_LEVELS = os.environ.get('LOG_LEVELS') or ''
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000') or 10000)
 
     # Uploads
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
@@ -71,12 +153,6 @@ class ProductionConfig(Config):
                 'environment variable before running in production.'
             )
 
-        import logging
-        import sys
-        handler = logging.StreamHandler(sys.stdout)
-        handler.setLevel(logging.INFO)
-        app.logger.addHandler(handler)
-
 
 # Map env name -> config class
 config = {
@@ -6,12 +6,14 @@ from flask_pymongo import PyMongo
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+import limiter_storage  # noqa: F401 — registers the shm:// storage scheme
+
 mongo = PyMongo()
 
-# Rate limiter. Memory storage is fine for a single instance / dev; for a
-# multi-worker production deploy, point storage_uri at a shared store (Redis).
+# Rate limiter. Storage comes from RATELIMIT_STORAGE_URI (config.py): shm:// by
+# default, so the gunicorn workers of one instance share their counters; a
+# mongodb:// URI shares them across instances.
 limiter = Limiter(
     key_func=get_remote_address,
-    storage_uri="memory://",
     default_limits=[],
 )
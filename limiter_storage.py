@@ -0,0 +1,234 @@
+# File: MyDentalPortal/limiter_storage.py
+# Flask-Limiter storage shared by every gunicorn worker on one host: a
+# fixed-size counter table in an mmap'd file (storage URI "shm://").
+#
+# Why: with "memory://" each worker kept its own counters, so the login limit
+# ("5 per minute") was really 5 x workers, and every --max-requests recycle
+# handed a fresh budget to whoever was hammering /login.
+#
+# Design:
+#   * The table lives in a file mapped MAP_SHARED by every worker (default
+#     table.shm in the private per-uid <tmp>/mydentalportal-ratelimit-<uid>;
+#     /dev/shm keeps it off disk). Layout: a 64-byte header, then `slots`
+#     24-byte slots of (key digest, count, expires_at). Keys are 64-bit
+#     blake2b digests.
+#   * Nobody else's file: the default directory must pass private_dir.ensure,
+#     the file is opened O_NOFOLLOW and must be a regular file owned by us and
+#     closed to group/others (also for an explicit path). A file planted by
+#     another local user could otherwise reset or pin the login counters. A
+#     refused file is logged and the table falls back to an anonymous mapping:
+#     still rate-limited, but per worker, as with memory://.
+#   * Bucketed hashing: a key lives in one of the BUCKET slots of its bucket, so
+#     a lookup reads at most 8 slots — no probe chains, no tombstones.
+#   * Atomic increments: a thread lock (gthreads share the mapping) plus an
+#     exclusive flock on the file (other workers). Held for a few slot reads.
+#   * Cheap expiry: nothing sweeps. A slot whose expires_at has passed reads as
+#     absent and is reused by the next insert into its bucket. If all 8 slots
+#     of a bucket hold live counters, the one closest to expiry is evicted —
+#     that key briefly under-counts, so size `slots` well above the live keys
+#     (the default 16384 slots is 384 KB).
+#   * Fork-safe: the file is re-opened in a process that didn't open it, so
+#     workers never share one flock (locks belong to the open file).
+#
+# For several hosts, point RATELIMIT_STORAGE_URI at MongoDB instead: the
+# limits package ships a mongodb:// storage (atomic $inc, TTL-index expiry).
+#
+# URI: shm://[/absolute/path][?slots=N]
+
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import stat
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+from limits.storage import Storage
+
+import private_dir
+
+try:  # POSIX only; without it the table is only shared between threads.
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(private_dir.default('mydentalportal-ratelimit'), 'table.shm')
+DEFAULT_SLOTS = 16384
+BUCKET = 8
+
+_MAGIC = b'MDPRLIM1'
+_HEADER = struct.Struct('<8sI')  # magic, slot count
+_HEADER_SIZE = 64
+_SLOT = struct.Struct('<Qqd')    # key digest (0 = empty), count, expires_at
+
+
+def _digest(key):
+    d = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+    return d or 1
+
+
+class SharedMemoryStorage(Storage):
+    """Fixed-window counters in a shared mmap table (see module comment)."""
+
+    STORAGE_SCHEME = ['shm']
+
+    def __init__(self, uri='shm://', wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri)
+        query = parse_qs(parsed.query)
+        slots = int(query.get('slots', [options.get('slots', DEFAULT_SLOTS)])[0])
+        self.path = parsed.path or DEFAULT_PATH
+        self.slots = max(-(-slots // BUCKET) * BUCKET, BUCKET)
+        self._buckets = self.slots // BUCKET
+        self._size = _HEADER_SIZE + self.slots * _SLOT.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._open()
+
+    @property
+    def base_exceptions(self):
+        return (OSError, ValueError)
+
+    # ── file / locking ───────────────────────────────────────────────────────
+    def _open_file(self):
+        """Descriptor of the table file; RuntimeError if it isn't safely ours."""
+        if self.path == DEFAULT_PATH:
+            private_dir.ensure(os.path.dirname(self.path))
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0)
+        try:
+            fd = os.open(self.path, flags, 0o600)
+        except OSError as e:
+            if e.errno == errno.ELOOP:
+                raise RuntimeError(f'{self.path} is a symlink') from e
+            raise
+        try:
+            st = os.fstat(fd)
+            if not stat.S_ISREG(st.st_mode):
+                raise RuntimeError(f'{self.path} is not a regular file')
+            private_dir.check_owner(self.path, st)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def _open(self):
+        try:
+            fd = self._open_file()
+        except RuntimeError as e:
+            log.warning('rate-limit table not shared: %s', e)
+            table = self._empty(mmap.mmap(-1, self._size))
+            self._fd, self._map, self._pid = None, table, os.getpid()
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size != self._size:
+                os.ftruncate(fd, self._size)
+            table = mmap.mmap(fd, self._size)
+            if _HEADER.unpack_from(table, 0) != (_MAGIC, self.slots):
+                # New file, or one laid out by a different build: start empty.
+                self._empty(table)
+        except BaseException:
+            os.close(fd)
+            raise
+        finally:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                except OSError:
+                    pass
+        self._fd, self._map, self._pid = fd, table, os.getpid()
+
+    def _empty(self, table):
+        table[:] = bytes(self._size)
+        _HEADER.pack_into(table, 0, _MAGIC, self.slots)
+        return table
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()  # forked: our own descriptor, so flock excludes the parent
+            shared = fcntl is not None and self._fd is not None
+            if shared:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                if shared:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # ── slot lookup ──────────────────────────────────────────────────────────
+    def _find(self, table, digest, now):
+        """(offset, count, expires_at) of the key's live slot, or (offset of the
+        slot to reuse for it, 0, 0.0) when it has no live counter."""
+        start = _HEADER_SIZE + (digest % self._buckets) * BUCKET * _SLOT.size
+        reuse = victim = None
+        victim_exp = None
+        for off in range(start, start + BUCKET * _SLOT.size, _SLOT.size):
+            key, count, exp = _SLOT.unpack_from(table, off)
+            if key == digest:
+                if exp > now:
+                    return off, count, exp
+                return off, 0, 0.0
+            if key == 0 or exp <= now:
+                if reuse is None:
+                    reuse = off
+            elif victim_exp is None or exp < victim_exp:
+                victim, victim_exp = off, exp
+        return (reuse if reuse is not None else victim), 0, 0.0
+
+    # ── limits.storage.Storage ───────────────────────────────────────────────
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        digest = _digest(key)
+        with self._locked() as table:
+            now = time.time()
+            off, count, exp = self._find(table, digest, now)
+            if count and not elastic_expiry:
+                count += amount
+            else:
+                count, exp = count + amount, now + expiry
+            _SLOT.pack_into(table, off, digest, count, exp)
+            return count
+
+    def get(self, key):
+        with self._locked() as table:
+            return self._find(table, _digest(key), time.time())[1]
+
+    def get_expiry(self, key):
+        with self._locked() as table:
+            now = time.time()
+            _, count, exp = self._find(table, _digest(key), now)
+            return exp if count else now
+
+    def clear(self, key):
+        digest = _digest(key)
+        with self._locked() as table:
+            off, count, _ = self._find(table, digest, time.time())
+            if count:
+                _SLOT.pack_into(table, off, 0, 0, 0.0)
+
+    def check(self):
+        try:
+            with self._locked():
+                return True
+        except OSError:
+            return False
+
+    def reset(self):
+        with self._locked() as table:
+            now = time.time()
+            live = sum(
+                1 for off in range(_HEADER_SIZE, self._size, _SLOT.size)
+                if _SLOT.unpack_from(table, off)[2] > now
+            )
+            table[_HEADER_SIZE:] = bytes(self._size - _HEADER_SIZE)
+            return live
@@ -0,0 +1,156 @@
+# File: MyDentalPortal/logs.py
+# Structured, non-blocking, PHI-safe logging.
+#
+# Why: routes print()ed errors and traceback.print_exc() straight to stdout
+# from the request thread, so a slow log pipe stalled the request that hit the
+# error. patient_detail printed four [DEBUG] lines on every view, one of them
+# with the patient's first name.
+#
+# Design:
+#   * Modules log through logging.getLogger(__name__) with a constant message
+#     and put variable data in `extra=` fields:
+#         log.warning('patient access denied', extra={'patient_id': pid})
+#   * init_app puts one QueueHandler on the root logger. A request thread only
+#     resolves the record and enqueues it on a bounded queue. If the queue is
+#     full the record is dropped and counted
+#     (dentalportal_log_records_dropped_total) rather than waited on. A
+#     QueueListener thread renders each record as one JSON line on stdout.
+#   * PHI-safe by allowlist: only `extra` keys in SAFE_FIELDS are written; any
+#     other key is dropped. An exception is reduced to its type and its stack
+#     frames (file:line function). The exception message and frame locals are
+#     never written: they can echo form input (a pydantic error quotes the
+#     submitted value). Inside a request, endpoint, method and path are added
+#     (never the query string, which carries patient-name searches), the same
+#     fields observability.py lets through to Sentry.
+#   * Levels: LOG_LEVEL for everything (default INFO, DEBUG under the debug
+#     server). LOG_LEVELS sets per-module overrides, e.g.
+#     "blueprints.routes.patients=DEBUG,pymongo=WARNING". A disabled level
+#     costs one cached isEnabledFor() check, as long as callers pass values as
+#     logger args or extra and never as pre-built f-strings.
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+from flask.logging import default_handler
+
+import metrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# The only `extra` keys that reach the log. Ids are opaque ObjectIds (they are
+# in the URL path anyway); names, phone numbers, notes and search text are not
+# listed and so can't leak through a careless extra=.
+SAFE_FIELDS = frozenset({
+    'endpoint', 'method', 'path', 'status', 'duration_ms', 'count',
+    'user_id', 'clinic_id', 'patient_id', 'appointment_id', 'treatment_id',
+    'file_id', 'template', 'dependency', 'error_type', 'stack',
+})
+
+DEFAULT_QUEUE_SIZE = 10000
+
+
+def _exception_fields(exc_info):
+    """Type + frames of an exception: what to debug with, minus the message."""
+    etype, _, tb = exc_info
+    frames = []
+    for frame in traceback.extract_tb(tb):
+        filename = frame.filename
+        if filename.startswith(ROOT + os.sep):
+            filename = os.path.relpath(filename, ROOT)
+        elif 'site-packages' + os.sep in filename:
+            filename = filename.split('site-packages' + os.sep, 1)[1]
+        frames.append(f'{filename}:{frame.lineno} {frame.name}')
+    return {'error_type': etype.__name__, 'stack': frames}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, pid + SAFE_FIELDS."""
+
+    def format(self, record):
+        doc = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+        }
+        if record.exc_info:
+            record.__dict__.update(_exception_fields(record.exc_info))
+        for key, value in record.__dict__.items():
+            if key in SAFE_FIELDS and value is not None:
+                doc[key] = value
+        return json.dumps(doc, default=str, separators=(',', ':'))
+
+
+class _QueueHandler(QueueHandler):
+    """Does only what must happen on the calling thread (resolve the message,
+    snapshot the exception and request) and never blocks on a full queue."""
+
+    def prepare(self, record):
+        fields = dict(record.__dict__)
+        fields['msg'] = record.getMessage()
+        fields['args'] = None
+        if record.exc_info:
+            fields.update(_exception_fields(record.exc_info))
+        fields['exc_info'] = fields['exc_text'] = None
+        if has_request_context():
+            fields.setdefault('endpoint', request.endpoint)
+            fields.setdefault('method', request.method)
+            fields.setdefault('path', request.path)
+        return logging.makeLogRecord(fields)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.log_dropped()
+
+
+def _stop(listener):
+    """Flush and stop a listener; a no-op if it is already stopped."""
+    if listener._thread is not None:
+        listener.stop()
+
+
+def parse_levels(spec):
+    """'a.b=DEBUG, c=warning' -> [('a.b', 'DEBUG'), ('c', 'WARNING')]."""
+    levels = []
+    for part in (spec or '').split(','):
+        name, sep, level = part.partition('=')
+        if sep and name.strip() and level.strip():
+            levels.append((name.strip(), level.strip().upper()))
+    return levels
+
+
+def init_app(app):
+    """Route all logging through the JSON queue listener. Call right after the
+    config is loaded, before anything logs (or touches app.logger)."""
+    root = logging.getLogger()
+    old = app.extensions.pop('logs', None)
+    if old is not None:
+        _stop(old)
+    for handler in [h for h in root.handlers if isinstance(h, _QueueHandler)]:
+        root.removeHandler(handler)
+
+    records = queue.Queue(maxsize=int(app.config.get('LOG_QUEUE_SIZE') or DEFAULT_QUEUE_SIZE))
+    stdout = logging.StreamHandler(sys.stdout)
+    stdout.setFormatter(JsonFormatter())
+    listener = QueueListener(records, stdout)
+    listener.start()
+    atexit.register(_stop, listener)  # drains what is queued on worker exit
+
+    root.addHandler(_QueueHandler(records))
+    root.setLevel((app.config.get('LOG_LEVEL') or ('DEBUG' if app.debug else 'INFO')).upper())
+    for name, level in parse_levels(app.config.get('LOG_LEVELS')):
+        logging.getLogger(name).setLevel(level)
+    app.logger.removeHandler(default_handler)  # root's queue handler covers it
+    app.extensions['logs'] = listener
+    return listener
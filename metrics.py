@@ -0,0 +1,478 @@
+# File: MyDentalPortal/metrics.py
+# Request/DB/pool metrics in Prometheus text format — prod-safe, PHI-free.
+#
+# Served at /admin/metrics (admin only, see blueprints/routes/admin.py). Design
+# constraints that shaped this module:
+#   * Cheap enough to leave on: one perf_counter pair + a few dict updates under
+#     a single lock per request. No third-party client library.
+#   * Thread-safe across the gthreads: every mutation goes through _Registry's
+#     lock. Per-request DB time is accumulated in a threading.local, because the
+#     pymongo command listener fires on the request's own thread.
+#   * Multi-worker + --max-requests recycling: each gunicorn worker keeps its own
+#     registry and periodically flushes a snapshot to METRICS_DIR/<pid>.json
+#     (plus once at exit). A scrape merges the live registry with every other
+#     worker's snapshot, so counters stay monotonic when a worker is recycled;
+#     snapshots of dead workers are folded into retired.json so the directory
+#     doesn't grow with every recycle.
+#   * PHI: labels are Flask endpoint names + status classes only — never a URL
+#     path, query string or id.
+
+import atexit
+import json
+import os
+import threading
+import time
+
+from pymongo import monitoring
+
+import private_dir
+
+try:  # POSIX only; compaction is skipped without it (local Windows dev).
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+# Latency buckets (seconds). Tuned for a small Flask app: most pages are
+# tens of ms, PDFs/reports/photo streams can run into seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Jobs already in the password-hash executor when one is submitted.
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16)
+
+FLUSH_INTERVAL_SECONDS = 5.0
+# Must be private to the app user (private_dir.py): anyone who can write here
+# can forge the merged /admin/metrics output.
+METRICS_DIR = os.environ.get('METRICS_DIR') or private_dir.default('mydentalportal-metrics')
+
+_HELP = {
+    'http_requests_total': ('counter', 'HTTP requests by endpoint and status class.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'db_time_seconds': ('histogram', 'MongoDB command time spent per request, by endpoint.'),
+    'db_commands_total': ('counter', 'MongoDB commands issued, by endpoint.'),
+    'mongo_pool_checkouts_total': ('counter', 'Connections checked out of the pymongo pool.'),
+    'mongo_pool_checkout_failures_total': ('counter', 'Failed pymongo pool checkouts.'),
+    'gridfs_bytes_served_total': ('counter', 'GridFS file bytes streamed to clients.'),
+    'password_hash_total': ('counter', 'Password hash/verify jobs by operation and outcome (ok/busy/timeout).'),
+    'password_hash_queue_depth': ('histogram', 'Jobs ahead in the password-hash executor at submit time.'),
+    'password_hash_wait_seconds': ('histogram', 'Time a password-hash job waited for an executor thread.'),
+    'access_cache_total': ('counter', 'Per-worker access-set cache lookups by kind and outcome (hit/miss).'),
+    'admission_total': ('counter', 'Admission decisions by endpoint class and outcome (ok/queued/shed).'),
+    'admission_wait_seconds': ('histogram', 'Time an admitted request waited for a slot, by endpoint class.'),
+    'rate_budget_total': ('counter', 'Metered requests against per-user rate budgets, by endpoint and outcome (allowed/denied).'),
+    'query_timeouts_total': ('counter', 'MongoDB commands stopped by their maxTimeMS budget, by endpoint and command.'),
+    'log_records_dropped_total': ('counter', 'Log records dropped because the logging queue was full.'),
+    'process_resident_memory_bytes': ('gauge', 'Resident set size of each live worker.'),
+}
+_PREFIX = 'dentalportal_'
+# Server error code for an operation that exceeded its maxTimeMS.
+_MAX_TIME_MS_EXPIRED = 50
+
+
+class _Registry:
+    """Counters + fixed-bucket histograms for ONE process, guarded by one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pid = os.getpid()
+            self.counters = {}     # (name, labels) -> float
+            self.histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+
+    def _check_fork(self):
+        # A registry inherited across fork() must not double-report the parent's
+        # numbers as the child's. Called with the lock held.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.counters = {}
+            self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            self._check_fork()
+            key = (name, labels)
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h[i] += 1
+                    break
+            h[-2] += value
+            h[-1] += 1
+
+    def snapshot(self):
+        """A JSON-serialisable copy (labels as lists) — safe to use unlocked."""
+        with self._lock:
+            self._check_fork()
+            return {
+                'pid': self.pid,
+                'counters': [[n, [list(l) for l in lbl], v]
+                             for (n, lbl), v in self.counters.items()],
+                'histograms': [[n, [list(l) for l in lbl], list(h)]
+                               for (n, lbl), h in self.histograms.items()],
+            }
+
+
+_registry = _Registry()
+_local = threading.local()
+_flush_state = {'last': 0.0}
+_flush_lock = threading.Lock()
+
+
+# ── pymongo listeners ────────────────────────────────────────────────────────
+class _CommandTimer(monitoring.CommandListener):
+    """Adds each command's server round-trip time to the current request."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        _add_db_time(event.duration_micros)
+
+    def failed(self, event):
+        _add_db_time(event.duration_micros)
+        if (event.failure or {}).get('code') == _MAX_TIME_MS_EXPIRED:
+            _count_query_timeout(event.command_name)
+
+
+class _PoolCounter(monitoring.ConnectionPoolListener):
+    """Counts pool checkouts (the rest of the pool lifecycle is ignored)."""
+
+    def connection_checked_out(self, event):
+        _registry.inc('mongo_pool_checkouts_total')
+
+    def connection_check_out_failed(self, event):
+        _registry.inc('mongo_pool_checkout_failures_total')
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def mongo_listeners():
+    """Event listeners to pass to MongoClient (``mongo.init_app(app, event_listeners=...)``)."""
+    return [_CommandTimer(), _PoolCounter()]
+
+
+def _add_db_time(duration_micros):
+    if getattr(_local, 'start', None) is None:
+        return  # outside a request (startup, scripts) — not attributed
+    _local.db_micros += duration_micros
+    _local.db_commands += 1
+
+
+def _count_query_timeout(command_name):
+    # Counted here rather than where ExecutionTimeout is caught: many routes
+    # swallow exceptions into a generic flash, and those timeouts matter too.
+    if getattr(_local, 'start', None) is None:
+        return
+    endpoint = getattr(_local, 'endpoint', None) or 'unmatched'
+    _registry.inc('query_timeouts_total', (('endpoint', endpoint), ('command', command_name)))
+
+
+# ── request hooks (called from app.py before_request/after_request) ──────────
+def request_started(endpoint=None):
+    _local.start = time.perf_counter()
+    _local.endpoint = endpoint
+    _local.db_micros = 0
+    _local.db_commands = 0
+
+
+def request_finished(endpoint, status_code):
+    """Record one finished request. Safe if request_started() never ran."""
+    start = getattr(_local, 'start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    _local.start = None
+    endpoint = endpoint or 'unmatched'  # 404s etc.: one bucket, bounded cardinality
+    status_class = '%dxx' % (status_code // 100)
+    labels = (('endpoint', endpoint),)
+    _registry.inc('http_requests_total', labels + (('status', status_class),))
+    _registry.observe('http_request_duration_seconds', labels, elapsed, LATENCY_BUCKETS)
+    _registry.observe('db_time_seconds', labels, _local.db_micros / 1e6, DB_TIME_BUCKETS)
+    if _local.db_commands:
+        _registry.inc('db_commands_total', labels, _local.db_commands)
+    _maybe_flush()
+
+
+def password_hash(op, outcome, depth=None, wait=None):
+    """Record one password-hash executor job (see blueprints/utils/passwords.py)."""
+    _registry.inc('password_hash_total', (('op', op), ('outcome', outcome)))
+    if depth is not None:
+        _registry.observe('password_hash_queue_depth', (), depth, QUEUE_DEPTH_BUCKETS)
+    if wait is not None:
+        _registry.observe('password_hash_wait_seconds', (), wait, LATENCY_BUCKETS)
+
+
+def admission(kind, outcome, wait=None):
+    """Record one admission decision (see admission.py)."""
+    _registry.inc('admission_total', (('class', kind), ('outcome', outcome)))
+    if wait is not None:
+        _registry.observe('admission_wait_seconds', (('class', kind),), wait, LATENCY_BUCKETS)
+
+
+def rate_budget(endpoint, outcome):
+    """Record one metered request (see rate_budget.py)."""
+    _registry.inc('rate_budget_total', (('endpoint', endpoint or 'unmatched'), ('outcome', outcome)))
+
+
+def access_cache(kind, outcome):
+    """Record one access-set cache lookup (see blueprints/repositories/access_cache.py)."""
+    _registry.inc('access_cache_total', (('kind', kind), ('outcome', outcome)))
+
+
+def log_dropped():
+    """Count one log record dropped by a full logging queue (see logs.py)."""
+    _registry.inc('log_records_dropped_total')
+
+
+def count_gridfs_bytes(n):
+    """Add `n` bytes to the GridFS-served counter (called by the download routes)."""
+    if n:
+        _registry.inc('gridfs_bytes_served_total', value=int(n))
+
+
+# ── cross-worker persistence ─────────────────────────────────────────────────
+def _rss_bytes():
+    """Current resident set size; falls back to peak RSS where /proc is absent."""
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except Exception:  # noqa: BLE001
+            return 0
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f'{pid}.json')
+
+
+def flush():
+    """Write this worker's snapshot to METRICS_DIR/<pid>.json (atomic replace)."""
+    snap = _registry.snapshot()
+    if not snap['counters'] and not snap['histograms']:
+        return  # nothing served yet (or a script/test process) — no file
+    snap['rss'] = _rss_bytes()
+    try:
+        private_dir.ensure(METRICS_DIR)
+        path = _snapshot_path(snap['pid'])
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(snap, fh)
+        os.replace(tmp, path)
+    except (OSError, RuntimeError):
+        pass  # metrics must never break a request (RuntimeError: unsafe dir)
+    _flush_state['last'] = time.monotonic()
+
+
+def _maybe_flush():
+    if time.monotonic() - _flush_state['last'] < FLUSH_INTERVAL_SECONDS:
+        return
+    # Non-blocking: if another thread is already flushing, skip this one.
+    if _flush_lock.acquire(blocking=False):
+        try:
+            flush()
+        finally:
+            _flush_lock.release()
+
+
+atexit.register(flush)  # gunicorn --max-requests exits cleanly -> final numbers kept
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists but not ours to signal
+    return True
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge_into(total, snap):
+    for name, labels, value in snap.get('counters', []):
+        key = (name, tuple(tuple(l) for l in labels))
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for name, labels, h in snap.get('histograms', []):
+        key = (name, tuple(tuple(l) for l in labels))
+        cur = total['histograms'].get(key)
+        if cur is None:
+            total['histograms'][key] = list(h)
+        elif len(cur) == len(h):
+            total['histograms'][key] = [a + b for a, b in zip(cur, h)]
+
+
+def _retire_dead(dead_paths):
+    """Fold dead workers' snapshots into retired.json, then delete them."""
+    if not dead_paths or fcntl is None:
+        return
+    lock_path = os.path.join(METRICS_DIR, '.lock')
+    try:
+        with open(lock_path, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(METRICS_DIR, 'retired.json')
+            total = {'counters': {}, 'histograms': {}}
+            _merge_into(total, _read_json(retired_path) or {})
+            for path in dead_paths:
+                snap = _read_json(path)
+                if snap is None:
+                    continue  # already retired by another worker
+                _merge_into(total, snap)
+                os.remove(path)
+            tmp = f'{retired_path}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(_to_snapshot(total), fh)
+            os.replace(tmp, retired_path)
+    except OSError:
+        pass
+
+
+def _to_snapshot(total):
+    return {
+        'counters': [[n, [list(l) for l in lbl], v]
+                     for (n, lbl), v in total['counters'].items()],
+        'histograms': [[n, [list(l) for l in lbl], h]
+                       for (n, lbl), h in total['histograms'].items()],
+    }
+
+
+def collect():
+    """Merge this worker's live registry with every other worker's snapshot.
+
+    Returns (totals, rss_by_pid). Only LIVE workers report RSS; dead workers'
+    counters are kept (retired) so totals never go backwards after a recycle.
+    """
+    me = os.getpid()
+    total = {'counters': {}, 'histograms': {}}
+    _merge_into(total, _registry.snapshot())
+    rss = {me: _rss_bytes()}
+    dead = []
+    try:
+        names = os.listdir(private_dir.ensure(METRICS_DIR))
+    except (OSError, RuntimeError):
+        names = []  # no (trustworthy) snapshots: this worker's registry only
+    for fname in names:
+        path = os.path.join(METRICS_DIR, fname)
+        if fname == 'retired.json':
+            _merge_into(total, _read_json(path) or {})
+            continue
+        stem, ext = os.path.splitext(fname)
+        if ext != '.json' or not stem.isdigit() or int(stem) == me:
+            continue
+        snap = _read_json(path)
+        if snap is None:
+            continue
+        _merge_into(total, snap)
+        if _pid_alive(int(stem)):
+            rss[int(stem)] = snap.get('rss', 0)
+        else:
+            dead.append(path)
+    _retire_dead(dead)
+    return total, rss
+
+
+# ── exposition ───────────────────────────────────────────────────────────────
+def _fmt_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels:
+        v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{v}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _fmt_num(v):
+    if isinstance(v, float) and not v.is_integer():
+        return repr(v)
+    return str(int(v))
+
+
+def render_prometheus():
+    """The merged metrics as Prometheus text exposition format (version 0.0.4)."""
+    total, rss = collect()
+    buckets_for = {
+        'http_request_duration_seconds': LATENCY_BUCKETS,
+        'db_time_seconds': DB_TIME_BUCKETS,
+        'password_hash_queue_depth': QUEUE_DEPTH_BUCKETS,
+        'password_hash_wait_seconds': LATENCY_BUCKETS,
+        'admission_wait_seconds': LATENCY_BUCKETS,
+    }
+    by_name = {}
+    for (name, labels), v in total['counters'].items():
+        by_name.setdefault(name, []).append((labels, v))
+    for (name, labels), h in total['histograms'].items():
+        by_name.setdefault(name, []).append((labels, h))
+
+    lines = []
+    for name in sorted(_HELP):
+        kind, help_text = _HELP[name]
+        full = _PREFIX + name
+        lines.append(f'# HELP {full} {help_text}')
+        lines.append(f'# TYPE {full} {kind}')
+        if name == 'process_resident_memory_bytes':
+            for pid in sorted(rss):
+                lines.append(f'{full}{_fmt_labels((("pid", pid),))} {rss[pid]}')
+            continue
+        for labels, v in sorted(by_name.get(name, []), key=lambda x: x[0]):
+            if kind != 'histogram':
+                lines.append(f'{full}{_fmt_labels(labels)} {_fmt_num(v)}')
+                continue
+            bounds = buckets_for[name]
+            if len(v) != len(bounds) + 2:
+                continue  # snapshot from a build with different buckets
+            cumulative = 0
+            for bound, count in zip(bounds, v):
+                cumulative += count
+                le = labels + (('le', repr(bound)),)
+                lines.append(f'{full}_bucket{_fmt_labels(le)} {cumulative}')
+            inf = labels + (('le', '+Inf'),)
+            lines.append(f'{full}_bucket{_fmt_labels(inf)} {int(v[-1])}')
+            lines.append(f'{full}_sum{_fmt_labels(labels)} {_fmt_num(float(v[-2]))}')
+            lines.append(f'{full}_count{_fmt_labels(labels)} {int(v[-1])}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,50 @@
+# File: MyDentalPortal/private_dir.py
+# Per-host state directories that only the app's own user can touch.
+#
+# Why: the workers on one host share state through files: metrics snapshots
+# (metrics.py), the rate-limit table (limiter_storage.py) and compiled
+# templates (warmup.py). A fixed path in a shared /tmp, opened with
+# makedirs(exist_ok=True), accepts a directory or symlink another local user
+# planted first. They could then forge /admin/metrics, reset login counters or
+# inject code through the template cache.
+#
+# Design:
+#   * default(name) is <tmp>/<name>-<uid>, so another user can't take the
+#     name first, only make it unusable.
+#   * ensure(path) creates the directory 0700 and refuses it (RuntimeError)
+#     unless it is a real directory, not a symlink, owned by this uid and
+#     closed to group and others. Callers treat a refusal as "run without the
+#     shared file", never as a crash.
+#   * check_owner(path, st) is the owner/mode half of that check, for a file
+#     opened (O_NOFOLLOW) at a path the operator chose.
+
+import os
+import stat
+import tempfile
+
+
+def default(name):
+    """<tmp>/<name>-<uid> (just <tmp>/<name> where there are no uids)."""
+    suffix = f'-{os.getuid()}' if hasattr(os, 'getuid') else ''
+    return os.path.join(tempfile.gettempdir(), f'{name}{suffix}')
+
+
+def ensure(path):
+    """Create `path` (0700) if needed; raise RuntimeError unless it is a real
+    directory owned by this user that nobody else can read or write."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise RuntimeError(f'{path} is not a directory')
+    check_owner(path, st)
+    return path
+
+
+def check_owner(path, st):
+    """Raise RuntimeError unless `st` (a stat of `path`) is owned by this user
+    and closed to group and others."""
+    if hasattr(os, 'getuid'):  # POSIX; Windows temp dirs are per-user already
+        if st.st_uid != os.getuid():
+            raise RuntimeError(f'{path} is owned by another user')
+        if stat.S_IMODE(st.st_mode) & 0o077:
+            raise RuntimeError(f'{path} is open to other users')
@@ -0,0 +1,170 @@
+# File: MyDentalPortal/rate_budget.py
+# Cost-weighted per-user rate budget for the expensive endpoints.
+#
+# Why: extensions.limiter only guards login/registration (per IP). A single
+# signed-in user re-requesting patient PDFs, chart PDFs, reports or file
+# downloads in a loop consumed shared capacity with nothing pushing back.
+#
+# Design:
+#   * One token bucket per user id, RATE_BUDGET_CAPACITY units deep, refilled
+#     at RATE_BUDGET_REFILL_PER_MINUTE units a minute. Each request spends its
+#     endpoint's cost (ENDPOINT_COSTS, in page-view units: a PDF is 10 page
+#     views). Plain pages cost RATE_BUDGET_PAGE_COST, 0 by default so that
+#     ordinary navigation never pays a DB write for this.
+#   * Stored as GCRA state in the `rate_budgets` collection, shared by every
+#     worker and host: one number per user, `tat`, the time at which the
+#     bucket would be full again. Spending is one conditional update — $set
+#     when the bucket is full (upserted for a new user), $inc while it is
+#     draining — so concurrent requests never overspend. A TTL index on
+#     expires_at (see app.init_database) drops buckets that have refilled.
+#   * Over budget -> 429 with Retry-After. Every metered response carries
+#     X-RateLimit-Limit / -Remaining / -Reset (units, units, seconds to full).
+#   * Fails open: if Mongo errors, the request is served unmetered.
+#   * RATE_BUDGET_CAPACITY=0 turns the whole thing off.
+#   * Signed-out requests are not metered (the routes redirect to login).
+
+import logging
+import math
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from flask import current_app, g, jsonify, request, session
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import metrics
+from extensions import mongo
+
+log = logging.getLogger(__name__)
+
+COLLECTION = 'rate_budgets'
+
+# Endpoint or blueprint name -> cost in page-view units.
+ENDPOINT_COSTS = {
+    'patients.patient_pdf': 10,
+    'charts.chart_pdf': 10,
+    'reports': 5,
+    'main.activity_export': 20,
+    'uploads.download_file': 2,
+    'uploads.set_photo': 3,
+    'uploads.add_prescription': 3,
+    'uploads.add_file': 3,
+}
+# Never metered: health checks and static assets (photo/prescription
+# thumbnails are part of a page view, so they are left at the page cost).
+EXEMPT_ENDPOINTS = {'health_check', 'static'}
+
+OVER_BUDGET_MESSAGE = (
+    "You've made a lot of heavy requests (PDFs, reports, downloads) in a short "
+    'time. Please wait a moment and try again.'
+)
+
+Decision = namedtuple('Decision', 'allowed limit remaining reset retry_after')
+
+
+class Budget:
+    """GCRA token bucket over the rate_budgets collection. Times are epoch seconds."""
+
+    def __init__(self, capacity, refill_per_minute):
+        self.capacity = max(int(capacity), 1)
+        self.interval = 60.0 / max(float(refill_per_minute), 0.001)  # seconds per unit
+        self.burst = self.capacity * self.interval  # seconds of credit when full
+
+    def charge(self, key, cost, now=None):
+        """Spend `cost` units from `key`'s bucket; returns a Decision."""
+        now = time.time() if now is None else now
+        inc = min(cost, self.capacity) * self.interval
+        expires = datetime.fromtimestamp(now + self.burst, timezone.utc)
+        coll = mongo.db[COLLECTION]
+        try:
+            # Full bucket (or a new user): start draining from now.
+            doc = coll.find_one_and_update(
+                {'_id': key, 'tat': {'$lte': now}},
+                {'$set': {'tat': now + inc}, '$max': {'expires_at': expires}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Already draining: spend only if enough credit is left.
+            doc = coll.find_one_and_update(
+                {'_id': key, 'tat': {'$gt': now, '$lte': now + self.burst - inc}},
+                {'$inc': {'tat': inc}, '$max': {'expires_at': expires}},
+                return_document=ReturnDocument.AFTER,
+            )
+        if doc is not None:
+            return self._decision(True, doc['tat'], now)
+        current = coll.find_one({'_id': key}, {'tat': 1})
+        tat = current['tat'] if current else now
+        return self._decision(False, tat, now, retry_after=tat + inc - self.burst - now)
+
+    def _decision(self, allowed, tat, now, retry_after=0.0):
+        remaining = max(int((now + self.burst - tat) / self.interval + 1e-9), 0)
+        return Decision(allowed, self.capacity, remaining,
+                        max(math.ceil(tat - now), 0), max(math.ceil(retry_after), 1))
+
+
+def endpoint_cost(endpoint=None, blueprint=None):
+    """Cost of one request to an endpoint (defaults to the current request's)."""
+    if endpoint is None and blueprint is None:
+        endpoint, blueprint = request.endpoint, request.blueprint
+    if endpoint is None or endpoint in EXEMPT_ENDPOINTS:
+        return 0
+    cost = ENDPOINT_COSTS.get(endpoint) or ENDPOINT_COSTS.get(blueprint)
+    if cost is None:
+        cost = current_app.config.get('RATE_BUDGET_PAGE_COST', 0)
+    return cost
+
+
+def _headers(decision):
+    headers = {
+        'X-RateLimit-Limit': str(decision.limit),
+        'X-RateLimit-Remaining': str(decision.remaining),
+        'X-RateLimit-Reset': str(decision.reset),
+    }
+    if not decision.allowed:
+        headers['Retry-After'] = str(decision.retry_after)
+    return headers
+
+
+def charge_request():
+    """before_request: spend the signed-in user's budget, or answer 429."""
+    user_id = session.get('user_id')
+    cost = endpoint_cost() if user_id else 0
+    if not cost:
+        return None
+    try:
+        decision = current_app.extensions['rate_budget'].charge(str(user_id), cost)
+    except PyMongoError as e:
+        log.warning('rate budget unavailable, serving unmetered',
+                    extra={'error_type': type(e).__name__})
+        return None
+    metrics.rate_budget(request.endpoint, 'allowed' if decision.allowed else 'denied')
+    if decision.allowed:
+        g._rate_budget = decision
+        return None
+    headers = _headers(decision)
+    if request.is_json or '/api/' in request.path:
+        return jsonify({'success': False, 'error': OVER_BUDGET_MESSAGE}), 429, headers
+    return OVER_BUDGET_MESSAGE, 429, {**headers, 'Content-Type': 'text/plain; charset=utf-8'}
+
+
+def add_headers(response):
+    """after_request: show the remaining budget on metered responses."""
+    decision = g.pop('_rate_budget', None)
+    if decision is not None:
+        response.headers.update(_headers(decision))
+    return response
+
+
+def init_app(app):
+    """Install the budget hooks. Call before admission.init_app so a request
+    that is over budget never waits for (or holds) an admission slot."""
+    capacity = int(app.config.get('RATE_BUDGET_CAPACITY', 60) or 0)
+    if capacity <= 0:
+        return
+    app.extensions['rate_budget'] = Budget(
+        capacity=capacity,
+        refill_per_minute=app.config.get('RATE_BUDGET_REFILL_PER_MINUTE', 20),
+    )
+    app.before_request(charge_request)
+    app.after_request(add_headers)
@@ -0,0 +1,89 @@
+r"""Move old audit-log entries into monthly archive collections.
+
+Entries older than the retention horizon (AUDIT_RETENTION_DAYS, default 180)
+leave the hot `audit_log` collection for `audit_archive_YYYY_MM`, one
+collection per calendar month, created with zstd block compression where the
+server allows it (falls back to the default compressor otherwise). Archives
+stay queryable: the Activity page has a month picker for them.
+
+Safe to interrupt and re-run: each batch is copied, then deleted, and entries
+already copied are skipped on the next run. Run it on a schedule (e.g. a
+nightly Render cron job) to keep the hot collection small.
+
+Dry run by default; pass --apply to move entries.
+
+Usage:
+    python scripts/archive_audit.py                          # dry run, MONGO_URI from .env
+    python scripts/archive_audit.py --apply
+    python scripts/archive_audit.py --days 90 --apply
+    python scripts/archive_audit.py "mongodb://localhost:27017/dental_portal" --apply
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extensions import mongo  # noqa: E402
+from blueprints.repositories import audit_log as audit_repo  # noqa: E402
+
+
+def pending_by_month(db, cutoff):
+    """{'YYYY-MM': n} of hot entries older than cutoff."""
+    rows = db.audit_log.aggregate([
+        {'$match': {'timestamp': {'$lt': cutoff}}},
+        {'$group': {'_id': {'$dateToString': {'format': '%Y-%m', 'date': '$timestamp'}},
+                    'n': {'$sum': 1}}},
+    ])
+    return {r['_id']: r['n'] for r in rows}
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Archive old audit-log entries by month.')
+    parser.add_argument('uri', nargs='?', default=os.environ.get('MONGO_URI'),
+                        help='MongoDB URI incl. database (default: MONGO_URI).')
+    parser.add_argument('--days', type=int,
+                        default=int(os.environ.get('AUDIT_RETENTION_DAYS')
+                                    or audit_repo.DEFAULT_RETENTION_DAYS),
+                        help='Keep this many days in the hot collection (default: AUDIT_RETENTION_DAYS or 180).')
+    parser.add_argument('--apply', action='store_true', help='Move the entries (default: dry run).')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--compressor', default='zstd',
+                        help="Block compressor for new archive collections ('' = server default).")
+    args = parser.parse_args(argv)
+    if not args.uri:
+        raise SystemExit('No MongoDB URI: pass one or set MONGO_URI.')
+    if args.days < 1:
+        raise SystemExit('--days must be at least 1.')
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=10000)
+    db = client.get_default_database()
+    mongo.db = db  # the repository functions read the shared handle
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    print(f"{'APPLY' if args.apply else 'DRY RUN'} on database '{db.name}': "
+          f"entries before {cutoff:%Y-%m-%d %H:%M} UTC\n")
+
+    if not args.apply:
+        pending = pending_by_month(db, cutoff)
+        for month, n in sorted(pending.items()):
+            print(f'    {month}  {n:>9} to archive')
+        print(f'\n{sum(pending.values())} entr(ies) to archive.')
+        if pending:
+            print('Re-run with --apply to move them.')
+        return 0
+
+    moved = audit_repo.archive_before(cutoff, args.batch_size, args.compressor or None)
+    for month, n in sorted(moved.items()):
+        print(f'    {month}  {n:>9} archived')
+    print(f'\n{sum(moved.values())} entr(ies) archived; '
+          f'{db.audit_log.estimated_document_count()} remain in audit_log.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+r"""Move long soft-deleted records into cold archive collections.
+
+Patients, clinics, appointments and staff memberships that have been inactive
+(is_active=False) for more than ARCHIVE_INACTIVE_DAYS (default 365) leave
+their hot collection for `<collection>_archive`, created with zstd block
+compression where the server allows it. Hot indexes are partial on
+is_active: true, so this shrinks the collections and their working set; the
+indexes never held the inactive rows in the first place.
+
+Archived records keep their _id and fields. Each move is audited, and one can
+be put back with --restore. A clinic that still has active patients or
+appointments is held back.
+
+Safe to interrupt and re-run: each batch is copied, then deleted. Run it on a
+schedule (e.g. a nightly Render cron job next to scripts/archive_audit.py).
+
+Dry run by default; pass --apply to move records.
+
+Usage:
+    python scripts/archive_inactive.py                       # dry run, MONGO_URI from .env
+    python scripts/archive_inactive.py --apply
+    python scripts/archive_inactive.py --days 180 --only patients --apply
+    python scripts/archive_inactive.py --restore patients 64f0c2a1e4b0a1b2c3d4e5f6
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extensions import mongo  # noqa: E402
+from blueprints.repositories import archive as archive_repo  # noqa: E402
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Archive long soft-deleted records.')
+    parser.add_argument('uri', nargs='?', default=os.environ.get('MONGO_URI'),
+                        help='MongoDB URI incl. database (default: MONGO_URI).')
+    parser.add_argument('--days', type=int,
+                        default=int(os.environ.get('ARCHIVE_INACTIVE_DAYS')
+                                    or archive_repo.DEFAULT_INACTIVE_DAYS),
+                        help='Archive records inactive for longer than this '
+                             '(default: ARCHIVE_INACTIVE_DAYS or 365).')
+    parser.add_argument('--only', choices=sorted(archive_repo.KINDS), action='append',
+                        help='Limit to this collection (repeatable).')
+    parser.add_argument('--apply', action='store_true', help='Move the records (default: dry run).')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--compressor', default='zstd',
+                        help="Block compressor for new archive collections ('' = server default).")
+    parser.add_argument('--restore', nargs=2, metavar=('COLLECTION', 'ID'),
+                        help='Move one archived record back to its hot collection.')
+    args = parser.parse_args(argv)
+    if not args.uri:
+        raise SystemExit('No MongoDB URI: pass one or set MONGO_URI.')
+    if args.days < 1:
+        raise SystemExit('--days must be at least 1.')
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=10000)
+    db = client.get_default_database()
+    mongo.db = db  # the repository functions read the shared handle
+
+    if args.restore:
+        collection, record_id = args.restore
+        if collection not in archive_repo.KINDS:
+            raise SystemExit(f'--restore: collection must be one of {", ".join(sorted(archive_repo.KINDS))}.')
+        if not archive_repo.restore(collection, record_id):
+            print(f'{record_id} is not in {archive_repo.archive_name(collection)}.')
+            return 1
+        print(f'Restored {record_id} to {collection} (still inactive).')
+        return 0
+
+    collections = args.only or sorted(archive_repo.KINDS)
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    print(f"{'APPLY' if args.apply else 'DRY RUN'} on database '{db.name}': "
+          f"inactive since before {cutoff:%Y-%m-%d %H:%M} UTC\n")
+
+    if not args.apply:
+        counts = archive_repo.counts(cutoff)
+        for c in collections:
+            pending, archived = counts[c]
+            print(f'    {c:<13} {pending:>9} to archive   ({archived} already archived)')
+        total = sum(counts[c][0] for c in collections)
+        print(f'\n{total} record(s) to archive.')
+        if total:
+            print('Re-run with --apply to move them.')
+        return 0
+
+    for c in collections:
+        moved, held = archive_repo.archive_inactive(
+            c, cutoff, args.batch_size, args.compressor or None)
+        note = f'   ({held} held back: still referenced)' if held else ''
+        print(f'    {c:<13} {moved:>9} archived{note}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,18 +4,43 @@ READ-ONLY: this only reads from the database, so it is safe to run against the
 live production database at any time without interfering with the running app.
 
 What it saves (into a timestamped folder, then zips it):
-  * Every collection -> <collection>.json in MongoDB Extended JSON (canonical),
-    which preserves ObjectIds, dates and binary so it round-trips exactly.
-    This INCLUDES the GridFS collections (fs.files / fs.chunks), so patient
-    photos, uploaded documents and prescriptions are fully captured and the
-    backup is restorable with mongoimport / a pymongo restore.
+  * Every collection -> <collection>.ndjson.gz: one canonical Extended JSON
+    document per line, gzip-compressed. Extended JSON preserves ObjectIds,
+    dates and binary so it round-trips exactly. This INCLUDES the GridFS
+    collections (fs.files / fs.chunks), so patient photos, uploaded documents
+    and prescriptions are fully captured. With --format bson each collection is
+    <collection>.bson.gz instead (mongodump --gzip layout, so
+    `mongorestore --gzip` reads it too).
   * A human-friendly copy of every GridFS file extracted into files/, so you
-    can open them directly without restoring anything.
-  * manifest.json with per-collection counts and metadata.
+    can open them directly without restoring anything (--no-files to skip).
+  * manifest.json with per-collection counts and index definitions, metadata
+    and a sha256 + size for every file in the backup, so a copy can be verified
+    before it's trusted (restore_data.py checks them before loading anything).
 
-Restore later with either:
-  * mongoimport --uri "<uri>" --collection <name> --file <name>.json, or
-  * a small pymongo loop using bson.json_util.loads + insert_many.
+Nothing is held in memory: cursors are streamed in batches (--batch-size)
+straight into the gzip stream, GridFS files are copied to disk chunk by chunk,
+and collections are dumped in parallel (--workers). Memory stays flat whatever
+the size of the tenant. The zip is STORED (not deflated) — its members are
+already compressed.
+
+Incremental backups (--incremental): instead of everything, capture only the
+documents inserted or changed since the previous backup of the same database,
+plus the ones deleted since. A document counts as changed when one of its
+write markers (updated_at, or deleted_at / revoked_at / resolved_at / used_at
+/ archived_at / restored_at / migrated_at for writes that don't touch
+updated_at) or, for never-updated documents, the creation time in its ObjectId
+_id is at/after the previous backup's start (minus --overlap-minutes for clock
+skew). GridFS files are immutable, so new
+photos/documents are picked up by their fs.files / fs.chunks _ids and nothing
+else is re-read. Deletions are found by merge-joining the sorted _id list every
+backup stores (<collection>.ids.ndjson.gz) against the current one. A
+collection the parent doesn't have is captured in full. Each
+manifest names its parent and base, so the backups form a chain
+  full -> incr -> incr -> ...
+which restore_data.py replays, optionally only up to a point in time (--until).
+
+Restore with scripts/restore_data.py (reads both this format and the older
+<collection>.json arrays).
 
 ⚠️  Backups contain PHI. Store them securely (encrypted), keep a copy OFF the
     free tier, and never commit them (backups/ is gitignored).
@@ -23,33 +48,318 @@ Restore later with either:
 Usage:
     # database is taken from MONGO_URI (its path), or pass a URI as arg 1
     MONGO_URI="mongodb+srv://.../dental_portal?..." python scripts/backup_data.py
-    python scripts/backup_data.py "mongodb+srv://.../dental_portal?..."
+    python scripts/backup_data.py "mongodb+srv://.../dental_portal?..." --workers 8
+
+    # nightly: changes since the newest backup of this db in backups/
+    python scripts/backup_data.py --incremental
+    python scripts/backup_data.py --incremental backups/dental_portal-20260601-020000.zip
 
     # via Docker (mount a host folder so the zip lands on your machine):
     docker run --rm -e MONGO_URI="<uri>" -v "%cd%/backups:/app/backups" \
         mydentalportal python scripts/backup_data.py
 """
 
+import argparse
+import gzip
+import hashlib
+import io
 import os
-import sys
+import re
 import shutil
-from datetime import datetime, timezone
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 
-from bson import json_util
+from bson import BSON, Int64, ObjectId, json_util
 from gridfs import GridFS
 from pymongo import MongoClient
 from werkzeug.utils import secure_filename
 
 BACKUP_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backups')
 
+# 3: <collection>.ids.ndjson.gz + backup chain fields (incremental support).
+FORMAT_VERSION = 3
+EXTENSIONS = {'ndjson': '.ndjson.gz', 'bson': '.bson.gz'}
+IDS_EXT = '.ids.ndjson.gz'
+DELETED_EXT = '.deleted.ndjson.gz'
+# Timestamp fields the app stamps on writes. Every repository write sets one:
+# the generic update_set/unset helpers in blueprints/repositories stamp
+# updated_at, the specific ones (soft delete, revoke, resolve, ...) their own.
+# A write that stamps none of them is invisible to --incremental.
+CHANGE_MARKERS = ('updated_at', 'deleted_at', 'revoked_at', 'resolved_at', 'used_at',
+                  'archived_at', 'restored_at', 'migrated_at')
+COPY_BUFSIZE = 1024 * 1024
+# Canonical mode keeps every BSON type exact (int vs long vs double, dates as
+# $date/$numberLong) — relaxed mode would lose that on restore.
+JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS
+
+
+class _HashingWriter(io.RawIOBase):
+    """Write-through file wrapper that sha256-hashes and counts the bytes that
+    actually land on disk, so the checksum is computed in the same single pass."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._fh.write(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        return len(data)
+
+
+def _write_stream(path, chunks, compress):
+    """Stream `chunks` (bytes) into `path`, gzip-compressing if asked.
+    Returns the manifest entry for the file."""
+    with open(path, 'wb') as raw:
+        hasher = _HashingWriter(raw)
+        if compress:
+            # mtime=0 → identical data gives an identical file (and checksum).
+            with gzip.GzipFile(fileobj=hasher, mode='wb', compresslevel=6, mtime=0) as gz:
+                for chunk in chunks:
+                    gz.write(chunk)
+        else:
+            for chunk in chunks:
+                hasher.write(chunk)
+    return {'sha256': hasher.sha256.hexdigest(), 'bytes': hasher.size}
+
+
+def _index_specs(coll):
+    """Secondary index definitions, so restore can rebuild them after loading."""
+    specs = []
+    for idx in coll.list_indexes():
+        if idx['name'] == '_id_':
+            continue
+        spec = {k: v for k, v in idx.items() if k not in ('v', 'ns', 'background')}
+        spec['key'] = [[field, direction] for field, direction in idx['key'].items()]
+        specs.append(spec)
+    return specs
+
+
+def _ndjson_line(doc):
+    return (json_util.dumps(doc, json_options=JSON_OPTIONS) + '\n').encode('utf-8')
+
+
+def _dump_collection(db, coll_name, out_dir, fmt, batch_size, query=None):
+    """Stream one collection (or the docs matching `query`) to <name><ext>.
+    Returns (count, file, entry)."""
+    count = 0
+
+    def _docs():
+        nonlocal count
+        cursor = db[coll_name].find(query or {}, batch_size=batch_size, no_cursor_timeout=True)
+        try:
+            for doc in cursor:
+                count += 1
+                if fmt == 'bson':
+                    yield BSON.encode(doc)
+                else:
+                    yield _ndjson_line(doc)
+        finally:
+            cursor.close()
+
+    fname = f'{coll_name}{EXTENSIONS[fmt]}'
+    entry = _write_stream(os.path.join(out_dir, fname), _docs(), compress=True)
+    return count, fname, entry
+
+
+def _dump_ids(db, coll_name, out_dir, batch_size):
+    """Every current _id in _id order (an index-only scan). Returns (count, file, entry)."""
+    count = 0
+
+    def _ids():
+        nonlocal count
+        cursor = db[coll_name].find({}, {'_id': 1}, batch_size=batch_size).sort('_id', 1)
+        for doc in cursor:
+            count += 1
+            yield _ndjson_line({'_id': doc['_id']})
+
+    fname = f'{coll_name}{IDS_EXT}'
+    entry = _write_stream(os.path.join(out_dir, fname), _ids(), compress=True)
+    return count, fname, entry
+
+
+def _extract_gridfs_file(fs, file_id, files_dir):
+    """Copy one GridFS file to files/ chunk by chunk (never fully in memory)."""
+    gridout = fs.get(file_id)
+    safe = secure_filename(gridout.filename or 'file') or 'file'
+    fname = f'{gridout._id}_{safe}'
+
+    def _chunks():
+        while True:
+            chunk = gridout.read(COPY_BUFSIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    entry = _write_stream(os.path.join(files_dir, fname), _chunks(), compress=False)
+    return f'files/{fname}', entry
+
+
+# ── incremental backups ──────────────────────────────────────────────────────
+def _changes_filter(since):
+    """Documents inserted or changed at/after `since` (an aware UTC datetime):
+    any write marker at/after it, or an ObjectId _id created at/after it."""
+    clauses = [{field: {'$gte': since}} for field in CHANGE_MARKERS]
+    clauses.append({'_id': {'$gte': ObjectId.from_datetime(since)}})
+    return {'$or': clauses}
 
-def main():
-    uri = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('MONGO_URI')
-    if not uri:
+
+# MongoDB's cross-type sort order for the _id types we store, so two _id streams
+# sorted by the server can be merge-joined here.
+_BSON_TYPE_ORDER = {int: 1, Int64: 1, float: 1, str: 2, ObjectId: 7, bool: 8, datetime: 9}
+_END = object()
+
+
+def _id_key(value):
+    return _BSON_TYPE_ORDER.get(type(value), 3), value
+
+
+def _read_ids(fh):
+    """Yield the _ids of an .ids.ndjson.gz stream (binary file object)."""
+    with gzip.GzipFile(fileobj=fh, mode='rb') as gz:
+        for line in gz:
+            if line.strip():
+                yield json_util.loads(line)['_id']
+
+
+def _deleted_ids(previous, current):
+    """Merge-join two _id-sorted streams; yield the ids only in `previous`.
+    Constant memory, however large the collection."""
+    cur = next(current, _END)
+    for pid in previous:
+        key = _id_key(pid)
+        while cur is not _END and _id_key(cur) < key:
+            cur = next(current, _END)
+        if cur is _END or _id_key(cur) != key:
+            yield pid
+
+
+class _Backup:
+    """Read-only view of a finished backup (.zip or folder): the parent of an
+    incremental run."""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = None if os.path.isdir(path) else zipfile.ZipFile(path)
+        with self.open('manifest.json') as fh:
+            raw = fh.read()
+        self.manifest_sha256 = hashlib.sha256(raw).hexdigest()
+        self.manifest = json_util.loads(raw)
+
+    def open(self, member):
+        if self._zip is None:
+            return open(os.path.join(self.path, member), 'rb')
+        return self._zip.open(member)
+
+
+def _is_complete(path):
+    """True if the backup at `path` has its manifest, which is written last.
+    A folder left by an interrupted run has none."""
+    try:
+        if os.path.isdir(path):
+            return os.path.isfile(os.path.join(path, 'manifest.json'))
+        with zipfile.ZipFile(path) as zf:
+            return 'manifest.json' in zf.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _latest_backup(db_name):
+    """Path of the newest complete backup (full or incremental) of db_name in
+    backups/."""
+    pattern = re.compile(rf'^{re.escape(db_name)}-(\d{{8}}-\d{{6}})(-incr)?(\.zip)?$')
+    found = []
+    for entry in os.listdir(BACKUP_ROOT) if os.path.isdir(BACKUP_ROOT) else []:
+        match = pattern.match(entry)
+        if match:
+            found.append((match.group(1), os.path.join(BACKUP_ROOT, entry)))
+    for _stamp, path in sorted(found, reverse=True):
+        if _is_complete(path):
+            return path
+    return None
+
+
+def _backup_collection(db, coll_name, out_dir, args, query=None, parent=None):
+    """One collection's share of a backup: its _id list, its (changed) docs and,
+    for an incremental, the ids deleted since the parent. A collection the
+    parent doesn't have (e.g. a new audit_archive_YYYY_MM month, whose entries
+    keep their old _ids) is dumped in full. Returns a result dict."""
+    parent_ids = parent.manifest['id_files'].get(coll_name) if parent else None
+    if parent and not parent_ids:
+        query = None
+    total, ids_file, ids_entry = _dump_ids(db, coll_name, out_dir, args.batch_size)
+    count, fname, entry = _dump_collection(db, coll_name, out_dir, args.format,
+                                           args.batch_size, query)
+    result = {'name': coll_name, 'total': total, 'count': count,
+              'files': {ids_file: ids_entry, fname: entry},
+              'ids_file': ids_file, 'data_file': fname, 'deleted': 0}
+
+    if parent_ids:
+        deleted = 0
+
+        def _deleted():
+            nonlocal deleted
+            with parent.open(parent_ids) as prev_fh, open(os.path.join(out_dir, ids_file), 'rb') as cur_fh:
+                for oid in _deleted_ids(_read_ids(prev_fh), _read_ids(cur_fh)):
+                    deleted += 1
+                    yield _ndjson_line({'_id': oid})
+
+        del_file = f'{coll_name}{DELETED_EXT}'
+        result['files'][del_file] = _write_stream(os.path.join(out_dir, del_file), _deleted(), compress=True)
+        result.update(deleted=deleted, deleted_file=del_file)
+    return result
+
+
+def _zip_stored(out_dir, archive):
+    """Zip the backup folder without re-compressing already-gzipped members."""
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for root, _dirs, files in os.walk(out_dir):
+            for f in sorted(files):
+                path = os.path.join(root, f)
+                zf.write(path, os.path.relpath(path, out_dir))
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Back up a MyDentalPortal database.')
+    parser.add_argument('uri', nargs='?', default=os.environ.get('MONGO_URI'),
+                        help='MongoDB URI WITH a /dbname in the path (default: MONGO_URI).')
+    parser.add_argument('--format', choices=sorted(EXTENSIONS), default='ndjson',
+                        help='Collection file format (default ndjson: gzip Extended JSON lines).')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Collections / GridFS files dumped in parallel (default 4).')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Cursor batch size (default 1000).')
+    parser.add_argument('--no-files', action='store_true',
+                        help="Skip extracting GridFS files to files/ (they're still in fs.chunks).")
+    parser.add_argument('--no-zip', action='store_true',
+                        help='Leave the backup as a folder instead of a .zip.')
+    parser.add_argument('--incremental', nargs='?', const='latest', default=None, metavar='PARENT',
+                        help='Back up only changes since PARENT (default: the newest backup '
+                             'of this database in backups/).')
+    parser.add_argument('--overlap-minutes', type=int, default=5,
+                        help='Incremental window starts this long before the parent did, '
+                             'to absorb clock skew between app hosts (default 5).')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if not args.uri:
         print('ERROR: pass a MongoDB URI as the first argument or set MONGO_URI.')
         return 2
 
-    client = MongoClient(uri, serverSelectionTimeoutMS=15000)
+    # One client shared by the worker threads — pymongo clients are thread-safe
+    # and pool connections; size the pool to the worker count.
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=15000,
+                         maxPoolSize=max(args.workers, 1) + 2)
     db = client.get_default_database()
     if db is None:
         print('ERROR: the URI has no default database (no /dbname in the path).')
@@ -58,53 +368,125 @@ def main():
     # ping first so we fail fast with a clear message
     client.admin.command('ping')
 
-    stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
-    name = f'{db.name}-{stamp}'
+    parent = None
+    if args.incremental:
+        path = _latest_backup(db.name) if args.incremental == 'latest' else args.incremental
+        if not path or not os.path.exists(path):
+            print(f'ERROR: no previous backup of "{db.name}" to increment from — take a full backup first.')
+            return 2
+        parent = _Backup(path)
+        if parent.manifest.get('format_version', 1) < 3 or parent.manifest.get('database') != db.name:
+            print(f'ERROR: {path} is not a format-3 backup of "{db.name}" — take a full backup first.')
+            return 2
+
+    started_at = datetime.now(timezone.utc)
+    stamp = started_at.strftime('%Y%m%d-%H%M%S')
+    name = f'{db.name}-{stamp}' + ('-incr' if parent else '')
     out_dir = os.path.join(BACKUP_ROOT, name)
     files_dir = os.path.join(out_dir, 'files')
     os.makedirs(files_dir, exist_ok=True)
 
-    print(f'Backing up database "{db.name}" -> {out_dir}')
     manifest = {
         'database': db.name,
         'created_utc': stamp,
+        'type': 'incremental' if parent else 'full',
+        'backup_id': name,
+        'base_id': name,
+        # The next incremental captures everything written since this moment.
+        'snapshot_utc': started_at.isoformat(),
+        'format': args.format,
+        'format_version': FORMAT_VERSION,
         'collections': {},
+        'collection_files': {},
+        'id_files': {},
+        'indexes': {},
         'gridfs_files_extracted': 0,
+        'files': {},
     }
+    query = None
+    if parent:
+        since = (datetime.fromisoformat(parent.manifest['snapshot_utc'])
+                 - timedelta(minutes=args.overlap_minutes))
+        query = _changes_filter(since)
+        manifest.update({
+            'base_id': parent.manifest['base_id'],
+            'parent': {'backup_id': parent.manifest['backup_id'],
+                       'manifest_sha256': parent.manifest_sha256},
+            'since_utc': since.isoformat(),
+            'changed': {},
+            'deletions': {},
+            'deletion_files': {},
+            'dropped_collections': [],
+        })
+        print(f'Incremental backup of "{db.name}" since {since:%Y-%m-%d %H:%M:%S} UTC '
+              f'(parent {parent.manifest["backup_id"]}) -> {out_dir}')
+    else:
+        print(f'Backing up database "{db.name}" -> {out_dir} '
+              f'(format={args.format}, workers={args.workers})')
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        # ── dump every collection (fully restorable), in parallel ──
+        coll_names = sorted(db.list_collection_names())
+        futures = [pool.submit(_backup_collection, db, c, out_dir, args, query, parent)
+                   for c in coll_names]
+        for fut in as_completed(futures):
+            r = fut.result()
+            coll_name = r['name']
+            manifest['files'].update(r['files'])
+            manifest['collection_files'][coll_name] = r['data_file']
+            manifest['id_files'][coll_name] = r['ids_file']
+            manifest['indexes'][coll_name] = _index_specs(db[coll_name])
+            if parent:
+                # totals are what the chain should add up to once replayed
+                manifest['collections'][coll_name] = r['total']
+                manifest['changed'][coll_name] = r['count']
+                if r.get('deleted_file'):
+                    manifest['deletions'][coll_name] = r['deleted']
+                    manifest['deletion_files'][coll_name] = r['deleted_file']
+                print(f'  {coll_name}: {r["count"]} changed, {r["deleted"]} deleted '
+                      f'(of {r["total"]})')
+            else:
+                manifest['collections'][coll_name] = r['count']
+                size_kb = r['files'][r['data_file']]['bytes'] / 1024
+                print(f'  {coll_name}: {r["count"]} documents ({size_kb:,.0f} KB)')
+        if parent:
+            manifest['dropped_collections'] = sorted(
+                set(parent.manifest['id_files']) - set(coll_names))
 
-    # ── dump every collection as Extended JSON (fully restorable) ──
-    for coll_name in sorted(db.list_collection_names()):
-        docs = list(db[coll_name].find({}))
-        path = os.path.join(out_dir, f'{coll_name}.json')
-        with open(path, 'w', encoding='utf-8') as fh:
-            fh.write(json_util.dumps(docs, indent=2))
-        manifest['collections'][coll_name] = len(docs)
-        print(f'  {coll_name}: {len(docs)} documents')
-
-    # ── extract GridFS files for easy viewing (default "fs" bucket) ──
-    if 'fs.files' in manifest['collections']:
-        fs = GridFS(db)
-        extracted = 0
-        for gridout in fs.find():
-            safe = secure_filename(gridout.filename or 'file') or 'file'
-            dest = os.path.join(files_dir, f'{gridout._id}_{safe}')
-            with open(dest, 'wb') as fh:
-                fh.write(gridout.read())
-            extracted += 1
-        manifest['gridfs_files_extracted'] = extracted
-        print(f'  extracted {extracted} GridFS file(s) -> files/')
+        # ── extract GridFS files for easy viewing (default "fs" bucket) ──
+        # (incremental: only the files uploaded since the parent)
+        if 'fs.files' in coll_names and not args.no_files:
+            fs = GridFS(db)
+            ids = (f['_id'] for f in db['fs.files'].find(query or {}, {'_id': 1},
+                                                         batch_size=args.batch_size))
+            futures = [pool.submit(_extract_gridfs_file, fs, fid, files_dir) for fid in ids]
+            for fut in as_completed(futures):
+                rel, entry = fut.result()
+                manifest['files'][rel] = entry
+            manifest['gridfs_files_extracted'] = len(futures)
+            print(f'  extracted {len(futures)} GridFS file(s) -> files/')
 
+    manifest['collections'] = dict(sorted(manifest['collections'].items()))
+    manifest['collection_files'] = dict(sorted(manifest['collection_files'].items()))
+    manifest['id_files'] = dict(sorted(manifest['id_files'].items()))
+    manifest['indexes'] = dict(sorted(manifest['indexes'].items()))
+    manifest['files'] = dict(sorted(manifest['files'].items()))
     with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as fh:
         fh.write(json_util.dumps(manifest, indent=2))
 
-    # ── zip it up ──
-    zip_base = os.path.join(BACKUP_ROOT, name)
-    archive = shutil.make_archive(zip_base, 'zip', out_dir)
-    # remove the unzipped folder, keep only the .zip
-    shutil.rmtree(out_dir, ignore_errors=True)
-
-    size_mb = os.path.getsize(archive) / (1024 * 1024)
-    print(f'\nDone. Backup written to:\n  {archive}  ({size_mb:.2f} MB)')
+    elapsed = time.monotonic() - started
+    if args.no_zip:
+        total = sum(e['bytes'] for e in manifest['files'].values())
+        print(f'\nDone in {elapsed:.1f}s. Backup written to:\n  {out_dir}  ({total / (1024 * 1024):.2f} MB)')
+    else:
+        # ── zip it up ──
+        archive = os.path.join(BACKUP_ROOT, f'{name}.zip')
+        _zip_stored(out_dir, archive)
+        # remove the unzipped folder, keep only the .zip
+        shutil.rmtree(out_dir, ignore_errors=True)
+        size_mb = os.path.getsize(archive) / (1024 * 1024)
+        print(f'\nDone in {elapsed:.1f}s. Backup written to:\n  {archive}  ({size_mb:.2f} MB)')
     print('Keep this somewhere safe and OFF the free tier. It contains PHI.')
     return 0
 
@@ -0,0 +1,42 @@
+r"""Fingerprint static CSS/JS and regenerate the service worker's precache list.
+
+Copies static/css/*.css and static/js/*.js to static/dist/ with a content hash
+in the filename (plus precompressed .br/.gz siblings for compression.py), writes static/dist/manifest.json (used by asset_url() in the
+templates) and rewrites the generated CACHE/SHELL block in static/sw.js. Stale
+hashed files are removed. See assets.py for the design.
+
+Run it after editing anything under static/css or static/js and commit the
+result — Render does not run a build step.
+
+Usage:
+    python scripts/build_assets.py
+    python scripts/build_assets.py --check     # exit 1 if the outputs are stale
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build fingerprinted static assets.')
+    parser.add_argument('--check', action='store_true',
+                        help='Only report stale outputs; exit 1 if there are any.')
+    args = parser.parse_args(argv)
+
+    changed = assets.build(check=args.check)
+    for rel in changed:
+        print(f'  {"stale" if args.check else "wrote"}  static/{rel}')
+    if args.check and changed:
+        print('Static assets are out of date: run python scripts/build_assets.py')
+        return 1
+    if not changed:
+        print('Static assets up to date.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
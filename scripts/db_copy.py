@@ -2,15 +2,43 @@
 
 Non-destructive: the source DB is left untouched. Refuses to write into a
 destination that already holds data unless --force is given. Reads MONGO_URI
-from .env.docker (cluster-scoped) so credentials stay out of the command line.
+from .env.atlas-admin (cluster-scoped) so credentials stay out of the command
+line; --dst-env points the destination at another cluster for a migration.
+
+Streams, so RAM stays flat whatever the size of the largest collection:
+  * each source cursor is read in batches (--batch-size) as raw BSON and
+    inserted as-is — documents are never decoded or re-encoded;
+  * batches are also capped in bytes, so fs.chunks (255 KB blobs) stays small;
+  * collections — GridFS's fs.files / fs.chunks included — copy concurrently
+    (--workers); fs.files goes last so no file appears before its chunks;
+  * indexes are built via copy_indexes AFTER the data load, once, instead of
+    being maintained on every insert;
+  * a progress line reports docs/s and MB/s while it runs.
+
+At the end every collection is verified: counts, plus an order-independent
+checksum of the raw BSON of every document (source side computed during the
+copy, destination side re-read), so a truncated or corrupted copy can't pass.
 
 Usage:
     python scripts/db_copy.py <src_db> <dst_db> [--force]
+    python scripts/db_copy.py <src_db> <dst_db> --workers 8 --dst-env .env.atlas-new
 """
-import sys
+import argparse
+import hashlib
 import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient
 
+RAW = CodecOptions(document_class=RawBSONDocument)
+GRIDFS_FILES = "fs.files"
+PROGRESS_EVERY = 5  # seconds
+
 
 def load_uri(env_path=".env.atlas-admin"):
     with open(env_path, "r", encoding="utf-8") as fh:
@@ -38,46 +66,174 @@ def copy_indexes(src_coll, dst_coll):
     return made
 
 
-def main():
-    args = [a for a in sys.argv[1:] if not a.startswith("--")]
-    force = "--force" in sys.argv
-    if len(args) != 2:
-        raise SystemExit("Usage: db_copy.py <src_db> <dst_db> [--force]")
-    src_name, dst_name = args
+class Checksum:
+    """Order-independent digest of a collection: the sum (mod 2**128) of each
+    document's sha256 prefix. Insertion order differs between clusters; the
+    documents' bytes must not."""
+
+    MOD = 1 << 128
+
+    def __init__(self):
+        self.value = 0
+        self.count = 0
+
+    def add(self, raw):
+        self.value = (self.value + int.from_bytes(
+            hashlib.sha256(raw).digest()[:16], "big")) % self.MOD
+        self.count += 1
+
+    def hexdigest(self):
+        return f"{self.value:032x}"
+
+
+def collection_checksum(coll, batch_size):
+    digest = Checksum()
+    for doc in coll.with_options(codec_options=RAW).find({}, batch_size=batch_size):
+        digest.add(doc.raw)
+    return digest
+
+
+class Progress:
+    """Totals shared by the copy workers, printed every PROGRESS_EVERY seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.docs = 0
+        self.bytes = 0
+        self.started = time.monotonic()
 
-    client = MongoClient(load_uri(), serverSelectionTimeoutMS=10000)
-    client.admin.command("ping")
-    src, dst = client[src_name], client[dst_name]
+    def add(self, docs, nbytes):
+        with self._lock:
+            self.docs += docs
+            self.bytes += nbytes
+
+    def line(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return (f"{self.docs:,} docs, {self.bytes / 2**20:,.1f} MB in {elapsed:.0f}s "
+                f"({self.docs / elapsed:,.0f} docs/s, {self.bytes / 2**20 / elapsed:,.1f} MB/s)")
+
+    def _run(self):
+        while not self._stop.wait(PROGRESS_EVERY):
+            print(f"    ... {self.line()}", flush=True)
+
+    def __enter__(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+
+def copy_collection(src_coll, dst_coll, args, progress):
+    """Stream one collection across in raw-BSON batches. Returns (docs, checksum)."""
+    if args.force:
+        dst_coll.drop()
+    digest = Checksum()
+    max_bytes = args.batch_mb * 2**20
+    batch, batch_bytes = [], 0
+
+    def flush():
+        dst_coll.insert_many(batch, ordered=False, bypass_document_validation=True)
+        progress.add(len(batch), batch_bytes)
+
+    cursor = src_coll.with_options(codec_options=RAW).find(
+        {}, batch_size=args.batch_size, no_cursor_timeout=True)
+    try:
+        for doc in cursor:
+            raw = doc.raw
+            digest.add(raw)
+            batch.append(doc)
+            batch_bytes += len(raw)
+            if len(batch) >= args.batch_size or batch_bytes >= max_bytes:
+                flush()
+                batch, batch_bytes = [], 0
+        if batch:
+            flush()
+    finally:
+        cursor.close()
+    return digest.count, digest
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Copy one database to a new name.")
+    parser.add_argument("src_db")
+    parser.add_argument("dst_db")
+    parser.add_argument("--force", action="store_true",
+                        help="Overwrite collections in a destination that already has data.")
+    parser.add_argument("--env", default=".env.atlas-admin",
+                        help="Env file holding the source MONGO_URI (default .env.atlas-admin).")
+    parser.add_argument("--dst-env", default=None,
+                        help="Env file for a different destination cluster (default: same as --env).")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Collections copied concurrently (default 4).")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="Documents per read/insert batch (default 1000).")
+    parser.add_argument("--batch-mb", type=int, default=16,
+                        help="Cap on an insert batch in MB (default 16).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pool_size = max(args.workers, 1) + 2
+    src_client = MongoClient(load_uri(args.env), serverSelectionTimeoutMS=10000,
+                             maxPoolSize=pool_size)
+    dst_client = (MongoClient(load_uri(args.dst_env), serverSelectionTimeoutMS=10000,
+                              maxPoolSize=pool_size)
+                  if args.dst_env else src_client)
+    src_client.admin.command("ping")
+    dst_client.admin.command("ping")
+    src, dst = src_client[args.src_db], dst_client[args.dst_db]
 
     existing = [c for c in dst.list_collection_names()
                 if dst[c].estimated_document_count() > 0]
-    if existing and not force:
+    if existing and not args.force:
         raise SystemExit(
-            f"Destination '{dst_name}' already has data in {existing}. "
+            f"Destination '{args.dst_db}' already has data in {existing}. "
             f"Re-run with --force to overwrite."
         )
 
-    print(f"Copying {src_name} -> {dst_name}\n")
-    for cname in sorted(src.list_collection_names()):
-        s, d = src[cname], dst[cname]
-        docs = list(s.find({}))
-        if force:
-            d.drop()
-        if docs:
-            d.insert_many(docs, ordered=False)
-        n_idx = copy_indexes(s, d)
-        print(f"    {cname:<24} {len(docs):>6} docs, {n_idx} index(es)")
-
-    # Verify counts match exactly.
+    names = sorted(src.list_collection_names())
+    print(f"Copying {args.src_db} -> {args.dst_db} "
+          f"({len(names)} collections, workers={args.workers})\n")
+    copied = {}
+    with Progress() as progress:
+        def run(cname):
+            started = time.monotonic()
+            n, digest = copy_collection(src[cname], dst[cname], args, progress)
+            copied[cname] = digest
+            rate = n / max(time.monotonic() - started, 1e-6)
+            print(f"    {cname:<24} {n:>8} docs ({rate:,.0f} docs/s)", flush=True)
+
+        rest = [c for c in names if c != GRIDFS_FILES]
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+            for fut in [pool.submit(run, c) for c in rest]:
+                fut.result()
+        if GRIDFS_FILES in names:
+            run(GRIDFS_FILES)
+        print(f"\n    copied {progress.line()}")
+
+    # Indexes only now that the data is in: one build per index instead of an
+    # index update on every insert.
+    started = time.monotonic()
+    n_idx = sum(copy_indexes(src[c], dst[c]) for c in names)
+    print(f"    built {n_idx} index(es) in {time.monotonic() - started:.1f}s")
+
+    # Verify counts and checksums match exactly.
     print("\nVerify (src == dst):")
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        dst_sums = dict(zip(names, pool.map(
+            lambda c: collection_checksum(dst[c], args.batch_size), names)))
     ok = True
-    for cname in sorted(src.list_collection_names()):
-        sc = src[cname].count_documents({})
-        dc = dst[cname].count_documents({})
-        flag = "OK" if sc == dc else "MISMATCH"
-        if sc != dc:
+    for cname in names:
+        sc, dc = copied[cname], dst_sums[cname]
+        match = sc.count == dc.count and sc.value == dc.value
+        if not match:
             ok = False
-        print(f"    {cname:<24} src={sc:>6}  dst={dc:>6}  {flag}")
+        flag = "OK" if match else "MISMATCH"
+        print(f"    {cname:<24} src={sc.count:>8}  dst={dc.count:>8}  "
+              f"sum={dc.hexdigest()[:12]}  {flag}")
     print("\nRESULT:", "all collections match" if ok else "MISMATCH - investigate")
     sys.exit(0 if ok else 1)
 
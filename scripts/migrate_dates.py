@@ -0,0 +1,144 @@
+r"""Normalize stored dates to their canonical form (see blueprints/repositories/dates.py).
+
+  * calendar-day fields (treatment/appointment `date`) -> 'YYYY-MM-DD' strings
+  * timestamp fields (created_at, updated_at, timestamp, ...) -> BSON datetimes
+
+Only documents that are off-canonical are read (the query selects them), and
+each update is conditional on the value it read, so an edit made while the
+migration runs is never overwritten. Values that can't be parsed are reported
+and left alone. Idempotent: a second run finds nothing to do.
+
+Each rewritten document is stamped `migrated_at`, a change marker for
+scripts/backup_data.py --incremental, so the next incremental backup picks up
+the canonical values. It is a separate field rather than updated_at, which
+the inactive-record archive reads as the soft-delete time.
+
+Dry run by default; pass --apply to write. Take a backup first
+(scripts/backup_data.py).
+
+Usage:
+    python scripts/migrate_dates.py                       # dry run, MONGO_URI from .env
+    python scripts/migrate_dates.py --apply
+    python scripts/migrate_dates.py "mongodb://localhost:27017/dental_portal" --apply
+"""
+import argparse
+import os
+import re
+import sys
+from collections import Counter
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blueprints.repositories import dates  # noqa: E402
+
+CANONICAL_DAY = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+SKIP_COLLECTIONS = ('sessions',)
+
+
+def _off_canonical(day_fields):
+    """Query matching documents with at least one non-canonical date field."""
+    clauses = []
+    for field in day_fields:
+        clauses.append({field: {'$type': 'date'}})
+        clauses.append({field: {'$type': 'string', '$not': CANONICAL_DAY, '$ne': ''}})
+    for field in dates.TIMESTAMP_FIELDS:
+        clauses.append({field: {'$type': 'string'}})
+    return {'$or': clauses}
+
+
+def _fixes(doc, day_fields):
+    """({field: new value}, [unparseable fields]) for one document."""
+    fixes, bad = {}, []
+    for field in day_fields:
+        value = doc.get(field)
+        if value in (None, '') or (isinstance(value, str) and CANONICAL_DAY.match(value)):
+            continue
+        day = dates.to_day(value)
+        if day is None:
+            bad.append(field)
+        else:
+            fixes[field] = day
+    for field in dates.TIMESTAMP_FIELDS:
+        value = doc.get(field)
+        if not isinstance(value, str):
+            continue
+        ts = dates.to_timestamp(value)
+        if ts is None:
+            bad.append(field)
+        else:
+            fixes[field] = ts
+    return fixes, bad
+
+
+def migrate_collection(coll, apply, batch_size):
+    day_fields = dates.DAY_FIELDS.get(coll.name, ())
+    projection = dict.fromkeys(day_fields + dates.TIMESTAMP_FIELDS, 1)
+    fixed, unparseable = Counter(), Counter()
+    ops, written = [], 0
+    now = datetime.utcnow()
+
+    def flush():
+        nonlocal written
+        if ops and apply:
+            written += coll.bulk_write(ops, ordered=False).modified_count
+        ops.clear()
+
+    for doc in coll.find(_off_canonical(day_fields), projection, batch_size=batch_size):
+        fixes, bad = _fixes(doc, day_fields)
+        unparseable.update(bad)
+        if not fixes:
+            continue
+        fixed.update(list(fixes))
+        # Conditional on the old values: a concurrent edit wins over the migration.
+        match = {'_id': doc['_id'], **{f: doc[f] for f in fixes}}
+        ops.append(UpdateOne(match, {'$set': {**fixes, 'migrated_at': now}}))
+        if len(ops) >= batch_size:
+            flush()
+    flush()
+    return fixed, unparseable, written
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Normalize stored dates to canonical form.')
+    parser.add_argument('uri', nargs='?', default=os.environ.get('MONGO_URI'),
+                        help='MongoDB URI incl. database (default: MONGO_URI).')
+    parser.add_argument('--apply', action='store_true', help='Write the changes (default: dry run).')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args(argv)
+    if not args.uri:
+        raise SystemExit('No MongoDB URI: pass one or set MONGO_URI.')
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=10000)
+    db = client.get_default_database()
+    print(f"{'APPLY' if args.apply else 'DRY RUN'} on database '{db.name}'\n")
+
+    total_fixed = total_bad = 0
+    for name in sorted(db.list_collection_names()):
+        if name.startswith(('system.', 'fs.')) or name in SKIP_COLLECTIONS:
+            continue
+        fixed, bad, written = migrate_collection(db[name], args.apply, args.batch_size)
+        if not fixed and not bad:
+            continue
+        total_fixed += sum(fixed.values())
+        total_bad += sum(bad.values())
+        for field, n in sorted(fixed.items()):
+            print(f'    {name:<20} {field:<20} {n:>7} to fix')
+        for field, n in sorted(bad.items()):
+            print(f'    {name:<20} {field:<20} {n:>7} UNPARSEABLE (left as-is)')
+        if args.apply:
+            print(f'    {name:<20} {"":<20} {written:>7} document(s) updated')
+
+    print(f'\n{total_fixed} field value(s) {"normalized" if args.apply else "to normalize"}, '
+          f'{total_bad} unparseable.')
+    if not args.apply and total_fixed:
+        print('Re-run with --apply to write.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,27 @@ already-unzipped folder) and writes every collection back into a target
 database. Because GridFS is just the fs.files / fs.chunks collections, restoring
 those collections restores patient photos / documents / prescriptions too.
 
+How it loads (so a big restore neither OOMs nor has to start over):
+  * Checksums first — every file listed in the manifest is sha256-verified
+    before anything is written; a corrupt copy fails fast.
+  * Each collection file is stream-parsed and inserted in unordered batches
+    (--batch-size docs, capped at --batch-mb so fs.chunks batches of 255 KB
+    blobs stay small). BSON backups are inserted as raw BSON, never decoded.
+  * Collections load in parallel (--workers). fs.files loads only after
+    fs.chunks, so a half-finished restore never shows a file with no data.
+  * Progress is checkpointed per collection in <backup>.restore-<db>.json next
+    to the backup. Re-running the same command after an interruption skips
+    finished collections and resumes the others at their last batch; the
+    documents of a half-written batch are already there and are skipped as
+    duplicates. --restart discards the checkpoint.
+  * Secondary indexes (recorded in the manifest) are built AFTER the load —
+    one index build is far cheaper than maintaining it on every insert.
+  * Incremental backups (backup_data.py --incremental): pass the newest one and
+    the chain is followed back to its full base (parents are looked up next to
+    it), then replayed in order — base loaded, each increment's changes upserted
+    and its deletions applied. --until <UTC time> stops the replay at the last
+    backup taken at/before that moment (point-in-time restore).
+
 ⚠️  WRITES to the target database. By default it REFUSES a prod-looking target
     (db name contains "prod") so a drill can't clobber real PHI; pass
     --allow-prod only for a genuine production recovery. Use --drop to replace
@@ -18,6 +39,11 @@ Usage:
     python scripts/restore_data.py backups/dental_portal_showcase-XXES.zip \
         --uri "mongodb+srv://.../dental_portal_restore_test?..." --drop --yes
 
+    # Point in time: replay full + nightly incrementals up to the given moment
+    python scripts/restore_data.py backups/dental_portal-20260605-020000-incr.zip \
+        --uri "mongodb+srv://.../dental_portal_restore_test?..." --drop --yes \
+        --until 2026-06-03T12:00
+
     # Genuine production recovery (be sure!):
     python scripts/restore_data.py backups/dental_portal_prod-XXES.zip \
         --uri "mongodb+srv://.../dental_portal_prod?..." --drop --yes --allow-prod
@@ -26,15 +52,32 @@ Exit code 0 on success, non-zero on any error or verification mismatch.
 """
 
 import argparse
+import gzip
+import hashlib
 import json
 import os
+import struct
 import sys
 import tempfile
+import threading
+import time
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 from bson import json_util
-from pymongo import MongoClient
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+# backup_data.py collection files, newest format first. `.json` is the legacy
+# single-array format written before backups were streamed.
+COLLECTION_EXTENSIONS = ('.ndjson.gz', '.bson.gz', '.json')
+DUPLICATE_KEY = 11000
+# Loaded last, once its chunks are in: a GridFS file becomes visible to the app
+# the moment its fs.files document exists.
+GRIDFS_FILES = 'fs.files'
 
 
 def _load_backup_dir(path):
@@ -49,10 +92,273 @@ def _load_backup_dir(path):
     raise SystemExit(f'ERROR: {path} is neither a folder nor a .zip backup.')
 
 
+def _collection_name(fname):
+    """'patients.ndjson.gz' -> 'patients' (None for non-collection files)."""
+    if fname == 'manifest.json':
+        return None
+    for ext in COLLECTION_EXTENSIONS:
+        if fname.endswith(ext):
+            return fname[:-len(ext)]
+    return None
+
+
+def _iter_docs(path, skip=0):
+    """Yield (document, approx_bytes) from one collection file, streaming.
+
+    The first `skip` documents are passed over without being decoded (resume).
+    Legacy .json arrays can only be parsed in one go; they predate large backups.
+    """
+    if path.endswith('.ndjson.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            n = 0
+            for line in fh:
+                if not line.strip():
+                    continue
+                n += 1
+                if n > skip:
+                    yield json_util.loads(line), len(line)
+    elif path.endswith('.bson.gz'):
+        with gzip.open(path, 'rb') as fh:
+            n = 0
+            while True:
+                head = fh.read(4)
+                if len(head) < 4:
+                    return
+                size = struct.unpack('<i', head)[0]
+                body = fh.read(size - 4)
+                n += 1
+                if n > skip:
+                    yield RawBSONDocument(head + body), size
+    else:
+        with open(path, encoding='utf-8') as fh:
+            for doc in json_util.loads(fh.read())[skip:]:
+                yield doc, 0
+
+
+def _verify_checksums(backup_dir, manifest):
+    """Return the list of files whose sha256/size differ from the manifest."""
+    bad = []
+    for rel, entry in manifest.get('files', {}).items():
+        path = os.path.join(backup_dir, rel)
+        if not os.path.exists(path):
+            bad.append(f'{rel} (missing)')
+            continue
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(1024 * 1024), b''):
+                digest.update(block)
+        if digest.hexdigest() != entry['sha256'] or os.path.getsize(path) != entry['bytes']:
+            bad.append(rel)
+    return bad
+
+
+class _Checkpoint:
+    """Per-collection restore progress, persisted atomically after every batch.
+
+    {'collections': {name: {'loaded': <docs consumed from the file>, 'done': bool}}}
+    Shared by the worker threads, hence the lock.
+    """
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {'collections': {}}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        elif os.path.exists(path):
+            with open(path, encoding='utf-8') as fh:
+                self.state = json.load(fh)
+
+    @property
+    def resuming(self):
+        return bool(self.state['collections'])
+
+    def get(self, coll_name):
+        return self.state['collections'].get(coll_name, {'loaded': 0, 'done': False})
+
+    def update(self, coll_name, loaded, done=False):
+        with self._lock:
+            self.state['collections'][coll_name] = {'loaded': loaded, 'done': done}
+            tmp = f'{self.path}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(self.state, fh, indent=2)
+            os.replace(tmp, self.path)
+
+    def finish(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _insert_batch(coll, batch):
+    """Unordered insert; duplicate-key errors (docs already restored by an
+    interrupted run) are expected and skipped. Returns the duplicate count."""
+    try:
+        coll.insert_many(batch, ordered=False, bypass_document_validation=True)
+        return 0
+    except BulkWriteError as exc:
+        errors = exc.details.get('writeErrors', [])
+        if any(e.get('code') != DUPLICATE_KEY for e in errors):
+            raise
+        return len(errors)
+
+
+def _apply_batch(coll, batch, mode):
+    """Write one batch. insert: unordered insert_many (duplicates skipped);
+    upsert: replace-or-insert each doc by _id (incremental changes);
+    delete: remove the listed _ids (incremental deletions).
+    Returns the number of docs that were already present (insert mode)."""
+    if mode == 'insert':
+        return _insert_batch(coll, batch)
+    if mode == 'upsert':
+        coll.bulk_write([ReplaceOne({'_id': d['_id']}, d, upsert=True) for d in batch],
+                        ordered=False, bypass_document_validation=True)
+    else:
+        coll.delete_many({'_id': {'$in': [d['_id'] for d in batch]}})
+    return 0
+
+
+def _restore_collection(db, path, coll_name, checkpoint, args, mode='insert', key=None):
+    """Stream one collection file into the target, checkpointing per batch under
+    `key` (default: the collection name). Returns a one-line progress summary."""
+    key = key or coll_name
+    progress = checkpoint.get(key)
+    if progress['done']:
+        return f'  {key}: already restored (checkpoint)'
+    coll = db[coll_name]
+    loaded = progress['loaded']
+    if mode == 'insert' and args.drop and loaded == 0:
+        coll.drop()
+
+    started, duplicates = time.monotonic(), 0
+    batch, batch_bytes = [], 0
+    max_bytes = args.batch_mb * 1024 * 1024
+    for doc, nbytes in _iter_docs(path, skip=loaded):
+        batch.append(doc)
+        batch_bytes += nbytes
+        if len(batch) >= args.batch_size or batch_bytes >= max_bytes:
+            duplicates += _apply_batch(coll, batch, mode)
+            loaded += len(batch)
+            checkpoint.update(key, loaded)
+            batch, batch_bytes = [], 0
+    if batch:
+        duplicates += _apply_batch(coll, batch, mode)
+        loaded += len(batch)
+    checkpoint.update(key, loaded, done=True)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    note = f', {duplicates} already present' if duplicates else ''
+    resumed = f' (resumed at {progress["loaded"]})' if progress['loaded'] else ''
+    what = {'insert': 'documents', 'upsert': 'changed', 'delete': 'deleted'}[mode]
+    return f'  {key}: {loaded} {what}{resumed}{note} ({loaded / elapsed:,.0f} docs/s)'
+
+
+def _build_indexes(db, index_specs):
+    """Create the manifest's secondary indexes now that the data is loaded."""
+    built = 0
+    for coll_name, specs in sorted(index_specs.items()):
+        for spec in specs:
+            opts = {k: v for k, v in spec.items() if k != 'key'}
+            db[coll_name].create_index([tuple(k) for k in spec['key']], **opts)
+            built += 1
+    return built
+
+
+# ── backup chains (incremental backups) ─────────────────────────────────────
+def _read_manifest(path):
+    """A backup's manifest (or {} for a legacy backup without one), read
+    straight out of the .zip / folder without extracting anything else."""
+    if os.path.isdir(path):
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, 'rb') as fh:
+            return json_util.loads(fh.read())
+    with zipfile.ZipFile(path) as zf:
+        if 'manifest.json' not in zf.namelist():
+            return {}
+        return json_util.loads(zf.read('manifest.json'))
+
+
+def _snapshot(manifest):
+    """When a backup started (aware UTC) — what --until is compared with."""
+    if manifest.get('snapshot_utc'):
+        return datetime.fromisoformat(manifest['snapshot_utc'])
+    return datetime.strptime(manifest['created_utc'], '%Y%m%d-%H%M%S').replace(tzinfo=timezone.utc)
+
+
+def _resolve_chain(path, until=None):
+    """[(path, manifest), ...] from the full base backup to `path`, following each
+    incremental's parent among its sibling files. With `until`, the chain stops
+    at the last backup taken at/before that time."""
+    chain = []
+    while True:
+        manifest = _read_manifest(path)
+        chain.append((path, manifest))
+        if manifest.get('type') != 'incremental':
+            break
+        parent_id = manifest['parent']['backup_id']
+        folder = os.path.dirname(os.path.abspath(path))
+        candidates = [os.path.join(folder, f'{parent_id}.zip'), os.path.join(folder, parent_id)]
+        path = next((c for c in candidates if os.path.exists(c)), None)
+        if path is None:
+            raise SystemExit(f'ERROR: parent backup {parent_id} of {chain[-1][0]} not found '
+                             f'next to it — the chain is broken.')
+    chain.reverse()
+    if until is not None:
+        chain = [link for link in chain if _snapshot(link[1]) <= until]
+        if not chain:
+            raise SystemExit(f'ERROR: the base backup was taken after --until {until:%Y-%m-%d %H:%M:%S} UTC.')
+    return chain
+
+
+def _collection_files(backup_dir, manifest):
+    """{collection: file} for a backup folder; legacy backups have no
+    collection_files in the manifest, so their folder listing is used."""
+    if manifest.get('collection_files'):
+        return dict(manifest['collection_files'])
+    return {_collection_name(f): f for f in sorted(os.listdir(backup_dir)) if _collection_name(f)}
+
+
+def _load_collections(db, backup_dir, files, checkpoint, args, mode, prefix=''):
+    """Load one backup's collection files in parallel; fs.files goes last."""
+    jobs = {name: os.path.join(backup_dir, fname) for name, fname in files.items()}
+    last = jobs.pop(GRIDFS_FILES, None)
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        futures = [pool.submit(_restore_collection, db, path, name, checkpoint, args,
+                               mode, f'{prefix}{name}')
+                   for name, path in jobs.items()]
+        for fut in futures:
+            print(fut.result())
+    if last:
+        print(_restore_collection(db, last, GRIDFS_FILES, checkpoint, args,
+                                  mode, f'{prefix}{GRIDFS_FILES}'))
+
+
+def _apply_deletions(db, backup_dir, manifest, checkpoint, args, prefix):
+    """Replay an incremental's recorded deletions. fs.files goes first, so no
+    GridFS file is ever left pointing at deleted chunks."""
+    deletion_files = manifest.get('deletion_files', {})
+    for name in sorted(deletion_files, key=lambda n: n != GRIDFS_FILES):
+        if manifest['deletions'].get(name):
+            print(_restore_collection(db, os.path.join(backup_dir, deletion_files[name]),
+                                      name, checkpoint, args, 'delete',
+                                      f'{prefix}{name}#deleted'))
+    for name in manifest.get('dropped_collections', []):
+        db[name].drop()
+        print(f'  {name}: dropped')
+
+
 def _restore(args):
-    backup_dir, cleanup = _load_backup_dir(args.backup)
+    until = None
+    if args.until:
+        until = datetime.fromisoformat(args.until)
+        until = until.replace(tzinfo=timezone.utc) if until.tzinfo is None else until
+    chain = _resolve_chain(args.backup, until)
+
+    cleanups = []
     try:
-        client = MongoClient(args.uri, serverSelectionTimeoutMS=15000)
+        client = MongoClient(args.uri, serverSelectionTimeoutMS=15000,
+                             maxPoolSize=max(args.workers, 1) + 2)
         db = client.get_default_database()
         if db is None:
             print('ERROR: the --uri has no default database (no /dbname in the path).')
@@ -65,39 +371,58 @@ def _restore(args):
             print('Pass --allow-prod ONLY for a genuine production recovery.')
             return 2
 
-        # Read the manifest (per-collection expected counts) for verification.
-        manifest_path = os.path.join(backup_dir, 'manifest.json')
-        expected = {}
-        if os.path.exists(manifest_path):
-            with open(manifest_path, encoding='utf-8') as fh:
-                expected = json.loads(fh.read()).get('collections', {})
+        # Unpack every link and check every checksum before writing anything.
+        links = []
+        for path, manifest in chain:
+            backup_dir, cleanup = _load_backup_dir(path)
+            cleanups.append(cleanup)
+            files = _collection_files(backup_dir, manifest)
+            if not files and manifest.get('type') != 'incremental':
+                print(f'ERROR: no collection files found in {path}.')
+                return 2
+            bad = _verify_checksums(backup_dir, manifest)
+            if bad:
+                print(f'ERROR: files in {path} do not match their manifest checksums:')
+                for rel in bad:
+                    print(f'  {rel}')
+                return 1
+            links.append((backup_dir, manifest, files))
 
-        coll_files = sorted(
-            f for f in os.listdir(backup_dir)
-            if f.endswith('.json') and f != 'manifest.json'
-        )
-        if not coll_files:
-            print(f'ERROR: no collection .json files found in {args.backup}.')
-            return 2
+        # Expected counts come from the newest link — what the chain adds up to.
+        expected = links[-1][1].get('collections', {})
 
         if not args.yes:
-            print(f'About to restore {len(coll_files)} collection(s) into "{db.name}".')
+            incr = f' + {len(links) - 1} incremental backup(s)' if len(links) > 1 else ''
+            print(f'About to restore {len(links[0][2])} collection(s){incr} into "{db.name}".')
             print('Re-run with --yes to proceed (non-interactive).')
             return 1
 
-        print(f'Restoring into "{db.name}" (drop={args.drop})')
-        restored = {}
-        for fname in coll_files:
-            coll_name = fname[:-len('.json')]
-            with open(os.path.join(backup_dir, fname), encoding='utf-8') as fh:
-                docs = json_util.loads(fh.read())
-            coll = db[coll_name]
-            if args.drop:
-                coll.drop()
-            if docs:
-                coll.insert_many(docs, ordered=False)
-            restored[coll_name] = coll.count_documents({})
-            print(f'  {coll_name}: {restored[coll_name]} documents')
+        checkpoint = _Checkpoint(
+            f'{os.path.abspath(args.backup).rstrip(os.sep)}.restore-{db.name}.json',
+            restart=args.restart,
+        )
+        verb = 'Resuming restore' if checkpoint.resuming else 'Restoring'
+        print(f'{verb} into "{db.name}" (drop={args.drop}, workers={args.workers})')
+
+        base_dir, _base_manifest, base_files = links[0]
+        _load_collections(db, base_dir, base_files, checkpoint, args, 'insert')
+        for backup_dir, manifest, files in links[1:]:
+            link_id = manifest['backup_id']
+            print(f'Applying incremental {link_id} (changes since {manifest["since_utc"][:19]})')
+            _load_collections(db, backup_dir, files, checkpoint, args, 'upsert', f'{link_id}/')
+            _apply_deletions(db, backup_dir, manifest, checkpoint, args, f'{link_id}/')
+
+        indexes = links[-1][1].get('indexes')
+        if indexes:
+            started = time.monotonic()
+            built = _build_indexes(db, indexes)
+            print(f'  built {built} index(es) in {time.monotonic() - started:.1f}s')
+
+        names = set(expected) | set(base_files)
+        for _dir, _manifest, files in links[1:]:
+            names |= set(files)
+        names -= set(links[-1][1].get('dropped_collections', []))
+        restored = {name: db[name].count_documents({}) for name in sorted(names)}
 
         # ── verify against the manifest counts ──
         ok = True
@@ -114,14 +439,17 @@ def _restore(args):
 
         if not ok:
             print('\nFAILED: at least one collection count does not match the backup.')
+            print('Re-run with --restart --drop to reload from scratch.')
             return 1
+        checkpoint.finish()
         print('\nDone. Restore verified against the backup manifest.')
         return 0
     finally:
-        cleanup()
+        for cleanup in cleanups:
+            cleanup()
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Restore a MyDentalPortal backup.')
     parser.add_argument('backup', help='Path to the backup .zip or unzipped folder.')
     parser.add_argument('--uri', required=True,
@@ -132,7 +460,18 @@ def main():
                         help='Proceed without the confirmation gate (non-interactive).')
     parser.add_argument('--allow-prod', action='store_true',
                         help='Permit a prod-looking target DB (genuine recovery only).')
-    return _restore(parser.parse_args())
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Collections restored in parallel (default 4).')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Documents per insert batch (default 1000).')
+    parser.add_argument('--batch-mb', type=int, default=16,
+                        help='Cap on a batch\'s size in MB, for fs.chunks (default 16).')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore any checkpoint from an interrupted run and start over.')
+    parser.add_argument('--until', default=None, metavar='UTC_TIME',
+                        help='Point in time (ISO, UTC): replay the backup chain only up to '
+                             'the last backup taken at/before it, e.g. 2026-06-01T02:00.')
+    return _restore(parser.parse_args(argv))
 
 
 if __name__ == '__main__':
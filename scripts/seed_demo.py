@@ -10,13 +10,32 @@ SAFE-GUARDS:
 
 Usage:
     MONGO_URI="mongodb+srv://.../dental_portal_demo?..." python scripts/seed_demo.py
+
+SCALE MODE (--scale) generates production-sized data for reproducing slow
+pages locally — by default 50 clinics, 200k patients, 2M treatments, 500k
+appointments and 1M audit-log entries, all overridable. It is deterministic (fixed --seed; dates are
+relative to --anchor), skewed like a real deployment (a few huge clinics, a long
+tail of small ones, seasonal visit dates, heavy-tailed visits per patient) and
+bulk-loaded with unordered insert_many batches, optionally from several worker
+processes. Scale documents carry their own tag ({'seed_tag': 'demo-scale'}) and
+are cleared the same way. Point it at a LOCAL mongod:
+
+    MONGO_URI="mongodb://127.0.0.1:27017/dental_portal_demo" \
+        python scripts/seed_demo.py --scale --workers 4
+    # smaller: --patients 20000 --treatments 200000 --appointments 50000
 """
 
+import argparse
+import bisect
 import os
 import random
+import struct
 import sys
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 
+from bson.objectid import ObjectId
 from pymongo import MongoClient
 from werkzeug.security import generate_password_hash
 
@@ -55,11 +74,375 @@ PROCEDURES = [
 APPT_TYPES = ['checkup', 'cleaning', 'extraction', 'consultation', 'followup']
 
 
-def _money(lo, hi):
-    return float(random.randint(lo, hi) // 50 * 50)  # round to nearest 50
+def _money(lo, hi, rng=random):
+    return float(rng.randint(lo, hi) // 50 * 50)  # round to nearest 50
+
+
+def _patient_doc(rng, fn, ln, gender, age, birth_year, clinic_id, owner_id,
+                 created, tag):
+    """One realistic patient document. `rng` is the `random` module (classic
+    mode) or a seeded random.Random (scale mode) — same field layout either way."""
+    return {
+        'clinic_id': clinic_id,
+        'personal_info': {
+            'first_name': fn, 'last_name': ln, 'middle_name': rng.choice(LAST_NAMES),
+            'nickname': fn[:3], 'gender': gender,
+            'birthday': f'{birth_year}-{rng.randint(1,12):02d}-{rng.randint(1,28):02d}',
+            'age': str(age), 'religion': 'Roman Catholic', 'nationality': 'Filipino',
+            'occupation': rng.choice(OCCUPATIONS),
+        },
+        'contact_info': {
+            'home_address': f'{rng.randint(1,999)} {rng.choice(BARANGAYS)} St., Bulacan',
+            'landline': '', 'cell_phone': f'09{rng.randint(10**8, 10**9 - 1)}',
+            'office_number': '', 'email': f'{fn.lower()}.{ln.lower().replace(" ", "")}@example.com',
+        },
+        'emergency_contact': {'name': f'{rng.choice(FIRST_NAMES)} {ln}',
+                              'relationship': rng.choice(['Spouse', 'Parent', 'Sibling']),
+                              'phone': f'09{rng.randint(10**8, 10**9 - 1)}'},
+        'insurance_info': {'dental_insurance': rng.choice(['', '', 'Maxicare', 'Intellicare'])},
+        'minor_info': {'guardian_name': '', 'guardian_occupation': ''},
+        'referral_info': {'referred_by': rng.choice(['', 'Walk-in', 'Facebook', 'Friend']),
+                          'consultation_reason': rng.choice(
+                              ['Toothache', 'Routine cleaning', 'Check-up', 'Braces inquiry'])},
+        'dental_history': {'previous_dentist': '', 'last_visit': ''},
+        'medical_history': {
+            'physician_name': '', 'physician_specialty': '', 'physician_address': '',
+            'current_medications': '', 'blood_type': rng.choice(['O+', 'A+', 'B+', 'AB+']),
+            'blood_pressure': '', 'bleeding_time': '',
+            'allergies': {'local_anesthesia': False, 'penicillin': False, 'sulfa_drugs': False,
+                          'aspirin': False, 'latex': False, 'other': ''},
+            'women_health': {'pregnant': 'no', 'nursing': 'no', 'birth_control': 'no'},
+            'conditions': {k: False for k in (
+                'high_blood_pressure', 'heart_disease', 'diabetes', 'asthma', 'cancer_tumors',
+                'heart_murmur', 'epilepsy_convulsions', 'hepatitis_liver', 'kidney_disease',
+                'arthritis_rheumatism', 'thyroid_problem', 'bleeding_problems')},
+        },
+        'created_by': owner_id, 'created_at': created, 'updated_at': created,
+        'is_active': True, 'seed_tag': tag,
+    }
+
+
+# ── scale mode ───────────────────────────────────────────────────────────────
+# Production-sized, fully deterministic data for reproducing slow pages locally
+# (and for the benchmark suite). Every record is a pure function of
+# (--seed, collection, index): ids, clinic assignment and timestamps come from a
+# stateless hash, and each insert batch has its own RNG seeded by its start
+# index. So the output is identical whether it's generated by 1 process or 8.
+SCALE_TAG = 'demo-scale'
+SCALE_DEFAULTS = {
+    'clinics': 50,
+    'patients': 200_000,
+    'treatments': 2_000_000,
+    'appointments': 500_000,
+    'audit_log': 1_000_000,
+}
+SCALE_YEARS = 3              # history depth for created_at / treatment dates
+SCALE_PASSWORD = 'demo1234'  # every generated dentist account (demo DB only)
+
+# Relative visit volume per calendar month (Jan..Dec): December holidays, the
+# April-May school break and the June pre-school check-ups are the peaks.
+SEASONALITY = (0.8, 0.8, 0.9, 1.1, 1.2, 1.1, 0.9, 0.9, 0.9, 1.0, 1.0, 1.4)
+
+_KIND_CLINIC, _KIND_PATIENT, _KIND_TREATMENT, _KIND_APPT, _KIND_USER, _KIND_AUDIT = range(1, 7)
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(seed, stream, i):
+    """splitmix64 of (seed, stream, i) -> float in [0, 1). Stateless, so any
+    worker can recompute any record's attributes (e.g. a patient's clinic)."""
+    z = (seed * 0x9E3779B97F4A7C15 + stream * 0xBF58476D1CE4E5B9
+         + (i + 1) * 0x94D049BB133111EB) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return (z ^ (z >> 31)) / 2.0 ** 64
+
+
+def _oid(kind, i, when):
+    """Deterministic ObjectId whose embedded timestamp is `when` (so ObjectId
+    ordering/age matches created_at, like a real insert would)."""
+    return ObjectId(
+        struct.pack('>I', int(when.replace(tzinfo=timezone.utc).timestamp()))
+        + struct.pack('>B', kind) + struct.pack('>Q', i)[1:]
+    )
+
+
+class _ScalePlan:
+    """Everything a worker needs to rebuild any record: counts, seed, anchor
+    date, owners and the skewed clinic distribution. Picklable."""
+
+    def __init__(self, args, admin_id, anchor):
+        self.seed = args.seed
+        self.anchor = anchor
+        self.counts = {k: getattr(args, k) for k in SCALE_DEFAULTS}
+        self.batch_size = args.batch_size
+        n_clinics = self.counts['clinics']
+        # Zipf(1.1) clinic sizes: clinic 0 (owned by the admin) is the huge
+        # tenant, a handful are large, the long tail is small.
+        weights = [1.0 / (k + 1) ** 1.1 for k in range(n_clinics)]
+        total, self.cum = 0.0, []
+        for w in weights:
+            total += w
+            self.cum.append(total)
+        self.n_dentists = max(1, (n_clinics - 1) // 3)
+        self.admin_id = admin_id
+        self.start = anchor - timedelta(days=365 * SCALE_YEARS)
+
+    # — derived, stateless attributes —
+    def clinic_oid(self, k):
+        return _oid(_KIND_CLINIC, k, self.start)
 
+    def dentist_oid(self, n):
+        return _oid(_KIND_USER, n, self.start)
+
+    def owner_of(self, k):
+        """Clinic 0 belongs to the admin (log in as admin = biggest tenant)."""
+        return self.admin_id if k == 0 else str(self.dentist_oid((k - 1) % self.n_dentists))
+
+    def clinic_of_patient(self, i):
+        return bisect.bisect_left(self.cum, _mix(self.seed, 1, i) * self.cum[-1])
+
+    def patient_created(self, i):
+        # Practice growth: newer months have more sign-ups (sqrt skew).
+        frac = _mix(self.seed, 2, i) ** 0.5
+        return self.start + timedelta(seconds=int(frac * SCALE_YEARS * 365 * 86400))
+
+    def patient_oid(self, i):
+        return _oid(_KIND_PATIENT, i, self.patient_created(i))
+
+    def seasonal_day(self, rng, start, days):
+        """A date in [start, start+days) weighted by SEASONALITY (rejection sampling)."""
+        peak = max(SEASONALITY)
+        while True:
+            d = start + timedelta(days=rng.randrange(days))
+            if rng.random() * peak <= SEASONALITY[d.month - 1]:
+                return d
+
+
+def _scale_clinics(plan):
+    docs = []
+    for k in range(plan.counts['clinics']):
+        docs.append({
+            '_id': plan.clinic_oid(k),
+            'name': f'Scale Clinic {k:03d}', 'address': f'{k + 1} Demo Ave., Bulacan',
+            'phone': f'0917-555-{k:04d}', 'email': f'clinic{k}@scale-demo.local',
+            'operating_hours': 'Mon-Sat 9:00 AM - 6:00 PM', 'currency': 'PHP',
+            'owner_id': plan.owner_of(k), 'is_active': True, 'seed_tag': SCALE_TAG,
+            'created_at': plan.start, 'updated_at': plan.start,
+        })
+    return docs
+
+
+def _scale_dentists(plan):
+    pw = generate_password_hash(SCALE_PASSWORD)  # hashed once, shared
+    return [{
+        '_id': plan.dentist_oid(n),
+        'name': f'Dr. Scale {n:03d}', 'email': f'dentist{n}@scale-demo.local',
+        'password': pw, 'license_number': f'SCALE{n:05d}',
+        'specialty': 'General Dentistry', 'role': 'dentist', 'status': 'approved',
+        'created_at': plan.start, 'updated_at': plan.start, 'is_active': True,
+        'seed_tag': SCALE_TAG,
+    } for n in range(plan.n_dentists)]
+
+
+def _scale_patients(plan, rng, lo, hi):
+    for i in range(lo, hi):
+        k = plan.clinic_of_patient(i)
+        created = plan.patient_created(i)
+        fn, ln = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        age = rng.randint(3, 85)
+        doc = _patient_doc(rng, fn, ln, rng.choice(['Male', 'Female']), age,
+                           created.year - age, plan.clinic_oid(k), plan.owner_of(k),
+                           created, SCALE_TAG)
+        doc['_id'] = plan.patient_oid(i)
+        # ~3% soft-deleted, like a real practice's archive.
+        doc['is_active'] = rng.random() >= 0.03
+        yield doc
+
+
+def _scale_treatments(plan, rng, lo, hi):
+    n_patients = plan.counts['patients']
+    span = (plan.anchor - plan.start).days + 1
+    for j in range(lo, hi):
+        # Heavy-tailed visits per patient: a few regulars have dozens of records.
+        i = int(_mix(plan.seed, 3, j) ** 2 * n_patients)
+        k = plan.clinic_of_patient(i)
+        d = plan.seasonal_day(rng, plan.start, span)
+        proc, p_lo, p_hi = rng.choice(PROCEDURES)
+        charged = _money(p_lo, p_hi, rng)
+        paid = _money(0, int(charged), rng) if rng.random() < 0.3 else charged
+        yield {
+            '_id': _oid(_KIND_TREATMENT, j, d),
+            'patient_id': plan.patient_oid(i), 'clinic_id': plan.clinic_oid(k),
+            'date': d.strftime('%Y-%m-%d'),
+            'tooth_numbers': [str(rng.choice([11, 12, 16, 21, 26, 36, 46]))],
+            'procedure': proc, 'description': '', 'dentist': 'Dr. Scale',
+            'amount_charged': charged, 'amount_paid': float(paid),
+            'balance': float(charged - paid), 'currency': 'PHP',
+            'status': 'completed', 'notes': '', 'next_appointment': '',
+            'price_confirmed': rng.random() >= 0.01,
+            'created_by': plan.owner_of(k), 'created_at': d, 'updated_at': d,
+            'seed_tag': SCALE_TAG,
+        }
 
-def main():
+
+def _scale_appointments(plan, rng, lo, hi):
+    n_patients = plan.counts['patients']
+    for j in range(lo, hi):
+        i = rng.randrange(n_patients)
+        k = plan.clinic_of_patient(i)
+        if rng.random() < 0.85:  # mostly history (past year) ...
+            d = plan.seasonal_day(rng, plan.anchor - timedelta(days=365), 365)
+            status = rng.choice(['completed'] * 8 + ['cancelled', 'no-show'])
+        else:                    # ... plus the next two months' bookings
+            d = plan.seasonal_day(rng, plan.anchor, 60)
+            status = rng.choice(['scheduled'] * 9 + ['cancelled'])
+        yield {
+            '_id': _oid(_KIND_APPT, j, d),
+            'clinic_id': plan.clinic_oid(k), 'patient_id': plan.patient_oid(i),
+            'patient_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'date': d.strftime('%Y-%m-%d'),
+            'time': f'{rng.randint(9, 17):02d}:{rng.choice(["00", "30"])}',
+            'duration': rng.choice([30, 30, 60]),
+            'type': rng.choice(APPT_TYPES), 'priority': 'normal', 'notes': '',
+            'status': status, 'created_by': plan.owner_of(k),
+            'created_at': d, 'updated_at': d,
+            'is_active': rng.random() >= 0.03, 'seed_tag': SCALE_TAG,
+        }
+
+
+# (action, entity_type, weight) — logins dominate a real trail.
+_AUDIT_MIX = (
+    ('login', 'auth', 30), ('logout', 'auth', 10), ('login_failed', 'auth', 3),
+    ('update', 'patient', 15), ('create', 'treatment', 15), ('update', 'chart', 12),
+    ('create', 'appointment', 8), ('update', 'appointment', 5), ('create', 'patient', 2),
+)
+
+
+def _scale_audit(plan, rng, lo, hi):
+    n_patients = plan.counts['patients']
+    span = (plan.anchor - plan.start).days + 1
+    actions = [(a, e) for a, e, _ in _AUDIT_MIX]
+    weights = [w for _, _, w in _AUDIT_MIX]
+    for j in range(lo, hi):
+        i = rng.randrange(n_patients)
+        k = plan.clinic_of_patient(i)
+        owner = plan.owner_of(k)
+        action, entity_type = rng.choices(actions, weights)[0]
+        ts = plan.seasonal_day(rng, plan.start, span) + timedelta(
+            seconds=rng.randrange(8 * 3600, 19 * 3600))
+        auth = entity_type == 'auth'
+        # Same PHI-free shape as audit_log.record (+ the seed tag).
+        yield {
+            '_id': _oid(_KIND_AUDIT, j, ts),
+            'actor_user_id': owner, 'actor_role': 'dentist', 'action': action,
+            'entity_type': entity_type,
+            'entity_id': owner if auth else str(plan.patient_oid(i)),
+            'clinic_id': None if auth else plan.clinic_oid(k),
+            'dentist_id': None if auth else owner,
+            'timestamp': ts, 'seed_tag': SCALE_TAG,
+        }
+
+
+_SCALE_GENERATORS = {
+    'patients': ('patients', _scale_patients),
+    'treatments': ('treatment_records', _scale_treatments),
+    'appointments': ('appointments', _scale_appointments),
+    'audit_log': ('audit_log', _scale_audit),
+}
+
+# Per-process state for worker processes (set by _init_worker).
+_worker = {}
+
+
+def _init_worker(uri, plan):
+    _worker['db'] = MongoClient(uri, serverSelectionTimeoutMS=10000).get_default_database()
+    _worker['plan'] = plan
+
+
+def _insert_batch(kind, lo, hi):
+    """Generate records [lo, hi) of `kind` and insert them unordered. Returns the
+    number inserted. Runs in a worker process (or in-process with --workers 1)."""
+    plan, db = _worker['plan'], _worker['db']
+    coll, gen = _SCALE_GENERATORS[kind]
+    rng = random.Random(f'{plan.seed}:{kind}:{lo}')  # per-batch, order-independent
+    docs = list(gen(plan, rng, lo, hi))
+    if docs:
+        db[coll].insert_many(docs, ordered=False, bypass_document_validation=True)
+    return len(docs)
+
+
+def _seed_scale(db, uri, admin_id, args):
+    anchor = (datetime.strptime(args.anchor, '%Y-%m-%d') if args.anchor
+              else datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+    plan = _ScalePlan(args, str(admin_id), anchor)
+    print(f'Scale mode (seed={plan.seed}, anchor={anchor:%Y-%m-%d}, '
+          f'workers={args.workers}, batch={plan.batch_size}): ' +
+          ', '.join(f'{v:,} {k}' for k, v in plan.counts.items()))
+
+    for coll in ('clinics', 'patients', 'treatment_records', 'appointments',
+                 'audit_log', 'users'):
+        deleted = db[coll].delete_many({'seed_tag': SCALE_TAG}).deleted_count
+        if deleted:
+            print(f'  cleared {deleted:,} previous scale {coll}')
+
+    db.users.insert_many(_scale_dentists(plan), ordered=False)
+    db.clinics.insert_many(_scale_clinics(plan), ordered=False)
+    print(f'  inserted {plan.counts["clinics"]} clinics, {plan.n_dentists} dentists '
+          f'(password: {SCALE_PASSWORD}); clinic 0 (largest) is owned by the admin')
+
+    executor = None
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers, initializer=_init_worker, initargs=(uri, plan),
+        )
+    else:
+        _worker.update(db=db, plan=plan)
+    try:
+        for kind in ('patients', 'treatments', 'appointments', 'audit_log'):
+            total = plan.counts[kind]
+            ranges = [(lo, min(lo + plan.batch_size, total))
+                      for lo in range(0, total, plan.batch_size)]
+            t0, done = time.monotonic(), 0
+            if executor:
+                results = executor.map(_insert_batch, *zip(*[(kind, lo, hi) for lo, hi in ranges]))
+            else:
+                results = (_insert_batch(kind, lo, hi) for lo, hi in ranges)
+            for n in results:
+                done += n
+                rate = done / max(time.monotonic() - t0, 1e-6)
+                print(f'\r  {kind:<12} {done:>10,}/{total:,}  ({rate:,.0f} docs/s)',
+                      end='', flush=True)
+            print()
+    finally:
+        if executor:
+            executor.shutdown()
+
+    print('Done. Start the app once (or run the benchmark) to build indexes.')
+    return 0
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Seed a MyDentalPortal demo database.')
+    parser.add_argument('--scale', action='store_true',
+                        help='Generate production-sized deterministic data instead '
+                             'of the small portfolio demo set.')
+    for name, default in SCALE_DEFAULTS.items():
+        parser.add_argument(f'--{name.replace("_", "-")}', dest=name, type=int,
+                            default=default,
+                            help=f'(--scale) number of {name} (default {default:,}).')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='(--scale) RNG seed; same seed + anchor = same data.')
+    parser.add_argument('--anchor', default=None, metavar='YYYY-MM-DD',
+                        help='(--scale) "today" for generated dates (default: today, UTC).')
+    parser.add_argument('--batch-size', type=int, default=10_000,
+                        help='(--scale) documents per unordered insert_many.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='(--scale) parallel worker processes for generation+insert.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
     uri = os.environ.get('MONGO_URI')
     if not uri:
         print('ERROR: MONGO_URI not set.')
@@ -94,6 +477,9 @@ def main():
         admin_id = admin['_id']
     owner_id = str(admin_id)  # clinics store owner_id as the session string id
 
+    if args.scale:
+        return _seed_scale(db, uri, owner_id, args)
+
     # ── wipe any previous demo-tagged docs (idempotent) ──
     for coll in ('clinics', 'patients', 'treatment_records', 'appointments'):
         deleted = db[coll].delete_many({'seed_tag': SEED_TAG}).deleted_count
@@ -128,45 +514,9 @@ def main():
         birth_year = now.year - age
         created = now - timedelta(days=random.randint(0, 360))
         clinic_id = random.choice(clinic_ids)
-        patient = {
-            'clinic_id': clinic_id,
-            'personal_info': {
-                'first_name': fn, 'last_name': ln, 'middle_name': random.choice(LAST_NAMES),
-                'nickname': fn[:3], 'gender': gender,
-                'birthday': f'{birth_year}-{random.randint(1,12):02d}-{random.randint(1,28):02d}',
-                'age': str(age), 'religion': 'Roman Catholic', 'nationality': 'Filipino',
-                'occupation': random.choice(OCCUPATIONS),
-            },
-            'contact_info': {
-                'home_address': f'{random.randint(1,999)} {random.choice(BARANGAYS)} St., Bulacan',
-                'landline': '', 'cell_phone': f'09{random.randint(10**8, 10**9 - 1)}',
-                'office_number': '', 'email': f'{fn.lower()}.{ln.lower().replace(" ", "")}@example.com',
-            },
-            'emergency_contact': {'name': f'{random.choice(FIRST_NAMES)} {ln}',
-                                  'relationship': random.choice(['Spouse', 'Parent', 'Sibling']),
-                                  'phone': f'09{random.randint(10**8, 10**9 - 1)}'},
-            'insurance_info': {'dental_insurance': random.choice(['', '', 'Maxicare', 'Intellicare'])},
-            'minor_info': {'guardian_name': '', 'guardian_occupation': ''},
-            'referral_info': {'referred_by': random.choice(['', 'Walk-in', 'Facebook', 'Friend']),
-                              'consultation_reason': random.choice(
-                                  ['Toothache', 'Routine cleaning', 'Check-up', 'Braces inquiry'])},
-            'dental_history': {'previous_dentist': '', 'last_visit': ''},
-            'medical_history': {
-                'physician_name': '', 'physician_specialty': '', 'physician_address': '',
-                'current_medications': '', 'blood_type': random.choice(['O+', 'A+', 'B+', 'AB+']),
-                'blood_pressure': '', 'bleeding_time': '',
-                'allergies': {'local_anesthesia': False, 'penicillin': False, 'sulfa_drugs': False,
-                              'aspirin': False, 'latex': False, 'other': ''},
-                'women_health': {'pregnant': 'no', 'nursing': 'no', 'birth_control': 'no'},
-                'conditions': {k: False for k in (
-                    'high_blood_pressure', 'heart_disease', 'diabetes', 'asthma', 'cancer_tumors',
-                    'heart_murmur', 'epilepsy_convulsions', 'hepatitis_liver', 'kidney_disease',
-                    'arthritis_rheumatism', 'thyroid_problem', 'bleeding_problems')},
-            },
-            'created_by': owner_id, 'created_at': created, 'updated_at': created,
-            'is_active': True, 'seed_tag': SEED_TAG,
-            '_clinic_id_ref': clinic_id,  # convenience for treatment seeding below
-        }
+        patient = _patient_doc(random, fn, ln, gender, age, birth_year,
+                               clinic_id, owner_id, created, SEED_TAG)
+        patient['_clinic_id_ref'] = clinic_id  # convenience for treatment seeding below
         patient_ids.append((db.patients.insert_one(patient).inserted_id, clinic_id, f'{fn} {ln}'))
     print(f'  inserted {len(patient_ids)} patients')
 
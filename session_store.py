@@ -0,0 +1,181 @@
+# File: MyDentalPortal/session_store.py
+# Opt-in server-side sessions (SESSION_BACKEND=mongo): the cookie carries only an
+# opaque id, the session data lives in the `sessions` collection.
+#
+# Why: with Flask's signed-cookie sessions every write re-signs and re-sends the
+# whole session (user id/email/name/role, CSRF token, flashes) as a Set-Cookie,
+# and the browser sends it back on every request, calendar fetch and chart
+# autosave. Here the cookie is ~50 bytes and a response only carries a
+# Set-Cookie when the session actually changed.
+#
+# Design:
+#   * Cookie value is "<sid>.<version>". The sid is 256 random bits; the DB key
+#     is sha256(sid), so a leaked sessions collection doesn't hand out cookies.
+#     `version` is bumped on every write.
+#   * Read-through cache per worker: {key: (version, serialized data)} in a
+#     small LRU, trusted for SESSION_CACHE_SECONDS and only while its version is
+#     not older than the cookie's. A write on another worker bumps the version in
+#     the cookie the browser sends next, so that request re-reads Mongo — no
+#     lost flashes across gunicorn workers. A revoked session (logout
+#     elsewhere) can outlive its deletion on another worker's cache by at most
+#     SESSION_CACHE_SECONDS.
+#   * Expiry: a TTL index on expires_at (see app.init_database) deletes dead
+#     sessions; reads also filter on it since the TTL monitor runs only once a
+#     minute.
+#   * The sid is rotated whenever the logged-in user changes (login, logout), so
+#     an id planted before login is useless after it (session fixation).
+#   * Data is stored with Flask's own tagged-JSON serializer, so flashes
+#     (tuples), Markup and datetimes round-trip exactly as in cookie sessions.
+
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from pymongo import ReturnDocument
+from werkzeug.datastructures import CallbackDict
+
+from extensions import mongo
+
+COLLECTION = 'sessions'
+CACHE_SIZE = 10_000
+
+
+def _key(sid):
+    return hashlib.sha256(sid.encode('ascii')).hexdigest()
+
+
+def _parse_cookie(value):
+    """'<sid>.<version>' -> (sid, version); (None, 0) for anything malformed."""
+    if not value:
+        return None, 0
+    sid, _, version = value.rpartition('.')
+    if not sid or not version.isdigit() or len(sid) > 128:
+        return None, 0
+    return sid, int(version)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Dict-like session that remembers its id, version and the user it was
+    loaded for. Any mutation marks it modified (same contract as Flask's
+    SecureCookieSession)."""
+
+    def __init__(self, initial=None, sid=None, version=0):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.loaded_user = (initial or {}).get('user_id')
+        self.modified = False
+        self.accessed = False
+
+
+class _Cache:
+    """Thread-safe LRU of key -> (version, serialized data, fetched_at)."""
+
+    def __init__(self, ttl, size=CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key, min_version):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            version, data, fetched_at = item
+            if version < min_version or time.monotonic() - fetched_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return version, data
+
+    def put(self, key, version, data):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[key] = (version, data, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def drop(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class MongoSessionInterface(SessionInterface):
+    """Flask session interface backed by the `sessions` collection."""
+
+    serializer = session_json_serializer
+
+    def __init__(self, cache_seconds=10):
+        self.cache = _Cache(cache_seconds)
+
+    def open_session(self, app, request):
+        sid, version = _parse_cookie(request.cookies.get(self.get_cookie_name(app)))
+        if sid is None:
+            return ServerSession()
+        key = _key(sid)
+        cached = self.cache.get(key, version)
+        if cached is None:
+            doc = mongo.db[COLLECTION].find_one(
+                {'_id': key, 'expires_at': {'$gt': datetime.now(timezone.utc)}},
+                {'data': 1, 'version': 1},
+            )
+            if doc is None:
+                return ServerSession()  # expired / revoked: start a fresh one
+            cached = (doc['version'], doc['data'])
+            self.cache.put(key, *cached)
+        return ServerSession(self.serializer.loads(cached[1]), sid=sid, version=cached[0])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        rotate = session.sid is not None and session.get('user_id') != session.loaded_user
+        if session.sid is not None and (rotate or (session.modified and not session)):
+            mongo.db[COLLECTION].delete_one({'_id': _key(session.sid)})
+            self.cache.drop(_key(session.sid))
+
+        if not session:
+            if session.modified and session.sid is not None:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+        if not session.modified:
+            return  # unchanged: no write, no Set-Cookie
+
+        if session.sid is None or rotate:
+            session.sid = secrets.token_urlsafe(32)
+        key = _key(session.sid)
+        cookie_expires = self.get_expiration_time(app, session)
+        # Browser-session cookies still need a server-side expiry.
+        expires_at = cookie_expires or datetime.now(timezone.utc) + app.permanent_session_lifetime
+        data = self.serializer.dumps(dict(session))
+        doc = mongo.db[COLLECTION].find_one_and_update(
+            {'_id': key},
+            {'$set': {'data': data, 'expires_at': expires_at}, '$inc': {'version': 1}},
+            projection={'version': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self.cache.put(key, doc['version'], data)
+        response.set_cookie(
+            name, f"{session.sid}.{doc['version']}",
+            expires=cookie_expires, httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path, secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,459 @@
+// Dental Chart JavaScript - same functionality as before
+// Page data comes from the JSON block the template renders (#chart-config),
+// so this file stays static and cacheable.
+let chartData = {};
+let patientId = '';
+
+// Safely parse chart data
+try {
+   const chartConfig = JSON.parse(document.getElementById('chart-config').textContent);
+   patientId = chartConfig.patient_id;
+   chartData = chartConfig.chart_data || {};
+} catch (e) {
+   console.error('Error parsing chart data:', e);
+   chartData = {};
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+   // Set current date
+   const dateEl = document.getElementById('currentDate');
+   if (dateEl) {
+       dateEl.textContent = new Date().toLocaleDateString();
+   }
+   
+   // Initialize chartData structure if empty
+   if (!chartData.teeth_status) {
+       chartData.teeth_status = {};
+   }
+   
+   // Load existing chart data
+   loadChartData();
+   
+   // Setup tooth segment clicking
+   setupToothInteractions();
+   
+   // Setup auto-save on input changes
+   setupAutoSave();
+});
+
+function setupToothInteractions() {
+   // Handle tooth segment clicking for coloring
+   document.querySelectorAll('.tooth-segment').forEach(segment => {
+       segment.addEventListener('click', function() {
+           const currentClass = this.classList;
+           
+           if (currentClass.contains('blue')) {
+               // Blue -> Red
+               currentClass.remove('blue');
+               currentClass.add('red');
+           } else if (currentClass.contains('red')) {
+               // Red -> Light Red
+               currentClass.remove('red');
+               currentClass.add('light_red');
+           } else if (currentClass.contains('light_red')) {
+               // Light Red -> Clear
+               currentClass.remove('light_red');
+           } else {
+               // Clear -> Blue
+               currentClass.add('blue');
+           }
+           
+           // Save the color state
+           saveToothColor(this);
+       });
+   });
+}
+
+function saveToothColor(segment) {
+   const toothId = segment.closest('.tooth-circle, .temp-tooth-circle')?.id;
+   const segmentType = segment.dataset.segment;
+   
+   if (!toothId || !segmentType) return;
+   
+   let color = '';
+   if (segment.classList.contains('blue')) {
+       color = 'blue';
+   } else if (segment.classList.contains('red')) {
+       color = 'red';
+   } else if (segment.classList.contains('light_red')) {
+       color = 'light_red';
+   }
+   
+   // Store in chartData
+   if (!chartData.teeth_status) chartData.teeth_status = {};
+   
+   const toothKey = toothId.replace('tooth-', '').replace('temp-tooth-', 'temp_');
+   
+   if (!chartData.teeth_status[toothKey]) {
+       chartData.teeth_status[toothKey] = { colors: {}, notes: '' };
+   }
+   if (!chartData.teeth_status[toothKey].colors) {
+       chartData.teeth_status[toothKey].colors = {};
+   }
+   
+   chartData.teeth_status[toothKey].colors[segmentType] = color;
+}
+
+function setupAutoSave() {
+   // Auto-save on status input changes
+   document.querySelectorAll('.status-input').forEach(input => {
+       input.addEventListener('input', function() {
+           const tooth = this.dataset.tooth;
+           const type = this.dataset.type;
+           const value = this.value;
+           
+           if (!tooth) return;
+           
+           if (!chartData.teeth_status) chartData.teeth_status = {};
+           if (!chartData.teeth_status[tooth]) chartData.teeth_status[tooth] = {};
+           
+           chartData.teeth_status[tooth][type] = value;
+       });
+   });
+   
+   // Auto-save on checkbox changes
+   document.querySelectorAll('input[type="checkbox"]').forEach(checkbox => {
+       checkbox.addEventListener('change', function() {
+           saveAssessmentData();
+       });
+   });
+   
+   // Auto-save on other input changes
+   document.querySelectorAll('input[type="text"], input[type="date"]').forEach(input => {
+       if (!input.classList.contains('status-input')) {
+           input.addEventListener('input', function() {
+               saveAssessmentData();
+           });
+       }
+   });
+}
+
+function loadChartData() {
+   if (!chartData || !chartData.teeth_status) return;
+   
+   // Load tooth data - status inputs and colors
+   Object.keys(chartData.teeth_status).forEach(toothKey => {
+       const toothData = chartData.teeth_status[toothKey];
+       
+       // Load status inputs
+       const upperStatusInput = document.querySelector(`[data-tooth="${toothKey}"][data-type="upper_status"]`);
+       if (upperStatusInput && toothData.upper_status) {
+           upperStatusInput.value = toothData.upper_status;
+       }
+       
+       const lowerStatusInput = document.querySelector(`[data-tooth="${toothKey}"][data-type="lower_status"]`);
+       if (lowerStatusInput && toothData.lower_status) {
+           lowerStatusInput.value = toothData.lower_status;
+       }
+       
+       const tempStatusInput = document.querySelector(`[data-tooth="${toothKey}"][data-type="temp_status"]`);
+       if (tempStatusInput && toothData.temp_status) {
+           tempStatusInput.value = toothData.temp_status;
+       }
+       
+       // Load colors
+       if (toothData.colors) {
+           Object.keys(toothData.colors).forEach(segment => {
+               const color = toothData.colors[segment];
+               if (color) {
+                   const toothElement = document.getElementById(toothKey.includes('temp_') ? `temp-tooth-${toothKey.replace('temp_', '')}` : `tooth-${toothKey}`);
+                   if (toothElement) {
+                       const segmentElement = toothElement.querySelector(`[data-segment="${segment}"]`);
+                       if (segmentElement) {
+                           segmentElement.classList.add(color);
+                       }
+                   }
+               }
+           });
+       }
+   });
+   
+   // Load assessment data
+   loadAssessmentData();
+}
+
+function saveAssessmentData() {
+   // Helper function to safely get element
+   const getElement = (id) => document.getElementById(id);
+   
+   // Periodontal screening
+   chartData.periodontal_screening = {
+       gingivitis: getElement('gingivitis')?.checked || false,
+       early_periodontitis: getElement('early_periodontitis')?.checked || false,
+       moderate_periodontitis: getElement('moderate_periodontitis')?.checked || false,
+       advanced_periodontitis: getElement('advanced_periodontitis')?.checked || false
+   };
+   
+   // Occlusion
+   chartData.occlusion = {
+       class_molar: getElement('class_molar')?.value || '',
+       overjet: getElement('overjet')?.value || '',
+       overbite: getElement('overbite')?.value || '',
+       midline_deviation: getElement('midline_deviation')?.value || '',
+       crossbite: getElement('crossbite')?.checked || false
+   };
+   
+   // Appliances
+   chartData.appliances = {
+       orthodontic: getElement('orthodontic')?.checked || false,
+       stayplate: getElement('stayplate')?.checked || false,
+       others: getElement('other_appliances')?.value || ''
+   };
+   
+   // TMD
+   chartData.tmd_assessment = {
+       clenching: getElement('clenching')?.checked || false,
+       clicking: getElement('clicking')?.checked || false,
+       trismus: getElement('trismus')?.checked || false,
+       muscle_spasm: getElement('muscle_spasm')?.checked || false
+   };
+   
+   // X-ray
+   chartData.xray_taken = {
+       periapical: {
+           taken: getElement('periapical_taken')?.checked || false,
+           tooth_number: getElement('periapical_tooth')?.value || '',
+           date: getElement('periapical_date')?.value || ''
+       },
+       panoramic: {
+           taken: getElement('panoramic_taken')?.checked || false,
+           date: getElement('panoramic_date')?.value || ''
+       },
+       cephalometric: {
+           taken: getElement('cephalometric_taken')?.checked || false,
+           date: getElement('cephalometric_date')?.value || ''
+       },
+       occlusal: {
+           taken: getElement('occlusal_taken')?.checked || false,
+           upper_lower: getElement('occlusal_upper_lower')?.value || '',
+           date: getElement('occlusal_date')?.value || ''
+       },
+       others: {
+           taken: getElement('others_taken')?.checked || false,
+           type: getElement('others_type')?.value || '',
+           date: getElement('others_date')?.value || ''
+       }
+   };
+}
+
+function loadAssessmentData() {
+   // Helper function to safely get element
+   const getElement = (id) => document.getElementById(id);
+   
+   // Load periodontal screening
+   if (chartData.periodontal_screening) {
+       const gingivitis = getElement('gingivitis');
+       const earlyPerio = getElement('early_periodontitis');
+       const moderatePerio = getElement('moderate_periodontitis');
+       const advancedPerio = getElement('advanced_periodontitis');
+       
+       if (gingivitis) gingivitis.checked = chartData.periodontal_screening.gingivitis || false;
+       if (earlyPerio) earlyPerio.checked = chartData.periodontal_screening.early_periodontitis || false;
+       if (moderatePerio) moderatePerio.checked = chartData.periodontal_screening.moderate_periodontitis || false;
+       if (advancedPerio) advancedPerio.checked = chartData.periodontal_screening.advanced_periodontitis || false;
+   }
+   
+   // Load occlusion
+   if (chartData.occlusion) {
+       const classMolar = getElement('class_molar');
+       const overjet = getElement('overjet');
+       const overbite = getElement('overbite');
+       const midlineDeviation = getElement('midline_deviation');
+       const crossbite = getElement('crossbite');
+       
+       if (classMolar) classMolar.value = chartData.occlusion.class_molar || '';
+       if (overjet) overjet.value = chartData.occlusion.overjet || '';
+       if (overbite) overbite.value = chartData.occlusion.overbite || '';
+       if (midlineDeviation) midlineDeviation.value = chartData.occlusion.midline_deviation || '';
+       if (crossbite) crossbite.checked = chartData.occlusion.crossbite || false;
+   }
+   
+   // Load appliances
+   if (chartData.appliances) {
+       const orthodontic = getElement('orthodontic');
+       const stayplate = getElement('stayplate');
+       const otherAppliances = getElement('other_appliances');
+       
+       if (orthodontic) orthodontic.checked = chartData.appliances.orthodontic || false;
+       if (stayplate) stayplate.checked = chartData.appliances.stayplate || false;
+       if (otherAppliances) otherAppliances.value = chartData.appliances.others || '';
+   }
+   
+   // Load TMD
+   if (chartData.tmd_assessment) {
+       const clenching = getElement('clenching');
+       const clicking = getElement('clicking');
+       const trismus = getElement('trismus');
+       const muscleSpasm = getElement('muscle_spasm');
+       
+       if (clenching) clenching.checked = chartData.tmd_assessment.clenching || false;
+       if (clicking) clicking.checked = chartData.tmd_assessment.clicking || false;
+       if (trismus) trismus.checked = chartData.tmd_assessment.trismus || false;
+       if (muscleSpasm) muscleSpasm.checked = chartData.tmd_assessment.muscle_spasm || false;
+   }
+   
+   // Load X-ray data
+   if (chartData.xray_taken) {
+       if (chartData.xray_taken.periapical) {
+           const periapicalTaken = getElement('periapical_taken');
+           const periapicalTooth = getElement('periapical_tooth');
+           const periapicalDate = getElement('periapical_date');
+           
+           if (periapicalTaken) periapicalTaken.checked = chartData.xray_taken.periapical.taken || false;
+           if (periapicalTooth) periapicalTooth.value = chartData.xray_taken.periapical.tooth_number || '';
+           if (periapicalDate) periapicalDate.value = chartData.xray_taken.periapical.date || '';
+       }
+       
+       if (chartData.xray_taken.panoramic) {
+           const panoramicTaken = getElement('panoramic_taken');
+           const panoramicDate = getElement('panoramic_date');
+           
+           if (panoramicTaken) panoramicTaken.checked = chartData.xray_taken.panoramic.taken || false;
+           if (panoramicDate) panoramicDate.value = chartData.xray_taken.panoramic.date || '';
+       }
+       
+       if (chartData.xray_taken.cephalometric) {
+           const cephalometricTaken = getElement('cephalometric_taken');
+           const cephalometricDate = getElement('cephalometric_date');
+           
+           if (cephalometricTaken) cephalometricTaken.checked = chartData.xray_taken.cephalometric.taken || false;
+           if (cephalometricDate) cephalometricDate.value = chartData.xray_taken.cephalometric.date || '';
+       }
+       
+       if (chartData.xray_taken.occlusal) {
+           const occlusalTaken = getElement('occlusal_taken');
+           const occlusalUpperLower = getElement('occlusal_upper_lower');
+           const occlusalDate = getElement('occlusal_date');
+           
+           if (occlusalTaken) occlusalTaken.checked = chartData.xray_taken.occlusal.taken || false;
+           if (occlusalUpperLower) occlusalUpperLower.value = chartData.xray_taken.occlusal.upper_lower || '';
+           if (occlusalDate) occlusalDate.value = chartData.xray_taken.occlusal.date || '';
+       }
+       
+       if (chartData.xray_taken.others) {
+           const othersTaken = getElement('others_taken');
+           const othersType = getElement('others_type');
+           const othersDate = getElement('others_date');
+           
+           if (othersTaken) othersTaken.checked = chartData.xray_taken.others.taken || false;
+           if (othersType) othersType.value = chartData.xray_taken.others.type || '';
+           if (othersDate) othersDate.value = chartData.xray_taken.others.date || '';
+       }
+   }
+}
+
+function saveDentalChart() {
+   // Update assessment data before saving
+   saveAssessmentData();
+   
+   console.log('Saving chart data:', chartData); // Debug log
+   
+   // Try the main route first, then fallback
+   const saveUrls = [`/charts/update/${patientId}`, `/chart/update/${patientId}`];
+   
+   async function trySave(url) {
+       try {
+           const response = await fetch(url, {
+               method: 'POST',
+               headers: {
+                   'Content-Type': 'application/json',
+               },
+               body: JSON.stringify(chartData)
+           });
+           
+           if (!response.ok) {
+               throw new Error(`HTTP ${response.status}`);
+           }
+           
+           const data = await response.json();
+           return data;
+       } catch (error) {
+           console.log(`Failed to save to ${url}:`, error);
+           throw error;
+       }
+   }
+   
+   // Try each URL until one works
+   saveUrls.reduce((promise, url) => {
+       return promise.catch(() => trySave(url));
+   }, Promise.reject())
+   .then(data => {
+       if (data.success) {
+           if (window.UnsavedGuard) window.UnsavedGuard.markClean();
+           showNotification('Dental chart saved successfully!', 'success');
+       } else {
+           showNotification('Error saving dental chart: ' + data.error, 'error');
+       }
+   })
+   .catch(error => {
+       console.error('All save attempts failed:', error);
+       showNotification('Error saving dental chart. Please try again.', 'error');
+   });
+}
+
+function showNotification(message, type) {
+   const notification = document.createElement('div');
+   notification.className = `alert alert-${type} alert-dismissible fade show position-fixed`;
+   notification.style.cssText = 'top: 100px; right: 20px; z-index: 9999; min-width: 300px;';
+   notification.innerHTML = `
+       ${message}
+       <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+   `;
+   
+   document.body.appendChild(notification);
+   
+   // Auto remove after 5 seconds
+   setTimeout(() => {
+       if (notification.parentNode) {
+           notification.remove();
+       }
+   }, 5000);
+}
+
+// ── X-ray section: show detail fields only when checkbox is checked ──
+document.addEventListener('DOMContentLoaded', function() {
+    const xrayPairs = [
+        { check: 'periapical_taken', fields: ['periapical_tooth', 'periapical_date'] },
+        { check: 'panoramic_taken',  fields: ['panoramic_date'] },
+        { check: 'cephalometric_taken', fields: ['cephalometric_date'] },
+        { check: 'occlusal_taken',   fields: ['occlusal_upper_lower', 'occlusal_date'] },
+        { check: 'others_taken',     fields: ['others_type', 'others_date'] },
+    ];
+
+    xrayPairs.forEach(pair => {
+        const checkbox = document.getElementById(pair.check);
+        if (!checkbox) return;
+
+        function toggle() {
+            pair.fields.forEach(fid => {
+                const el = document.getElementById(fid);
+                if (el) {
+                    const wrapper = el.closest('.mb-2');
+                    if (wrapper) wrapper.style.display = checkbox.checked ? '' : 'none';
+                }
+            });
+        }
+        checkbox.addEventListener('change', toggle);
+        toggle(); // apply on load
+    });
+});
+
+// ── Unsaved-changes guard for the dental chart ──────────────────────────────
+// The chart has no <form> and saves via fetch, so it hooks the shared
+// UnsavedGuard (defined in base.html) directly. Any user edit — a status/x-ray/
+// assessment field OR a tooth-segment click (colour cycling) — marks the page
+// dirty and shows the "unsaved changes" banner. saveDentalChart() clears it on
+// a successful save. Programmatic loading sets values directly (no input/change
+// events), so restoring an existing chart never trips a false "dirty".
+document.addEventListener('DOMContentLoaded', function () {
+    function markDirty() {
+        if (window.UnsavedGuard) window.UnsavedGuard.markDirty();
+    }
+    // Field edits (typed status codes, x-ray inputs, assessment checkboxes, etc.)
+    document.addEventListener('input', markDirty);
+    document.addEventListener('change', markDirty);
+    // Tooth colour cycling (SVG segments) and any clickable chart cell.
+    document.addEventListener('click', function (e) {
+        if (e.target.closest && e.target.closest('.tooth-segment')) markDirty();
+    });
+});
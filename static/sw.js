@@ -2,16 +2,23 @@
 //
 // PHI safety: navigations (HTML) and data/API responses are NEVER cached —
 // they always come from the network (single source of truth). Only same-origin
-// STATIC shell assets are cached, for instant load. Bump CACHE to invalidate.
-const CACHE = 'dp-shell-v1';
+// STATIC shell assets are cached, for instant load. CACHE and SHELL below are
+// generated from the fingerprinted build (scripts/build_assets.py), so any
+// change to a shell file renames the cache and activate drops the old one.
+// --- generated by scripts/build_assets.py: do not edit by hand ---
+const CACHE = 'dp-shell-5407c137e6';
 const SHELL = [
-  '/static/css/main.css',
-  '/static/js/main.js',
+  '/static/dist/css/base.79ad125a72.css',
+  '/static/dist/css/dental_chart.5b15872562.css',
+  '/static/dist/css/main.85dc136236.css',
+  '/static/dist/js/base.40c7de5e7f.js',
+  '/static/dist/js/dental_chart.0627c3af8d.js',
   '/static/offline.html',
   '/static/icons/icon-192.png',
   '/static/icons/icon-512.png',
   '/manifest.webmanifest',
 ];
+// --- end generated ---
 
 self.addEventListener('install', (event) => {
   event.waitUntil(
@@ -15,12 +15,15 @@ singleton at an in-memory ``mongomock`` database. That keeps tests:
 The stub ``auth``/``patients`` blueprints exist solely so ``url_for(...)`` calls
 inside the code under test (redirects on the access-denied paths) can resolve.
 """
+from collections import Counter
+
 import mongomock
 import pytest
 from bson.objectid import ObjectId
 from flask import Flask, Blueprint
 
 from extensions import mongo
+from blueprints.repositories import access_cache
 
 
 @pytest.fixture
@@ -32,10 +35,44 @@ def db():
     # open a real connection.
     mongo.cx = client
     mongo.db = database
+    access_cache.clear()  # the per-worker cache outlives a test's database
     yield database
     client.close()
 
 
+class _CountingCollection:
+    def __init__(self, coll, counts):
+        self._coll, self._counts = coll, counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._coll, name)
+        if name in ("find", "find_one", "aggregate", "count_documents"):
+            def counted(*args, **kwargs):
+                self._counts[self._coll.name] += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+class _CountingDB:
+    def __init__(self, db):
+        self._db, self.counts = db, Counter()
+
+    def __getattr__(self, name):
+        return _CountingCollection(getattr(self._db, name), self.counts)
+
+    __getitem__ = __getattr__
+
+
+@pytest.fixture
+def db_reads(db, monkeypatch):
+    """Count reads (find/find_one/aggregate/count_documents) per collection on
+    the in-memory db; returns the live Counter."""
+    proxy = _CountingDB(db)
+    monkeypatch.setattr(mongo, "db", proxy)
+    return proxy.counts
+
+
 def _make_app():
     app = Flask(__name__)
     app.config.update(
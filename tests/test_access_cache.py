@@ -0,0 +1,98 @@
+"""Tests for the per-worker access-set cache (blueprints/repositories/access_cache.py).
+
+The cache must save the memberships + clinics reads across requests without
+ever letting a revoked membership keep working on another worker.
+"""
+from bson.objectid import ObjectId
+from flask import session
+
+from blueprints.repositories import access_cache
+from blueprints.repositories import clinics as clinic_repo
+from blueprints.repositories import memberships as membership_repo
+from blueprints.utils import user_clinic_ids
+
+
+def _request(app, user_id):
+    ctx = app.test_request_context()
+    ctx.push()
+    session["user_id"] = user_id
+    return ctx
+
+
+def _clinic_ids(app, user_id):
+    ctx = _request(app, user_id)
+    try:
+        return user_clinic_ids()
+    finally:
+        ctx.pop()
+
+
+def test_access_set_is_reused_across_requests(app, seed_patient, db_reads):
+    owner = str(ObjectId())
+    _, clinic_id = seed_patient(owner)
+    for _ in range(5):
+        assert _clinic_ids(app, owner) == [clinic_id]
+    assert db_reads["memberships"] == 1
+    assert db_reads["clinics"] == 1
+    # The only per-request cost left is the stamp point read.
+    assert db_reads[access_cache.COLLECTION] == 5
+
+
+def test_revocation_on_another_worker_applies_on_next_request(app, db, seed_patient):
+    dentist, staff = str(ObjectId()), str(ObjectId())
+    _, clinic_id = seed_patient(dentist)
+    membership_repo.create(staff, dentist)
+    assert _clinic_ids(app, staff) == [clinic_id]
+
+    # Another worker revokes: the row and the stamp change in Mongo, but this
+    # worker's local cache is untouched.
+    db.memberships.update_one({"user_id": staff}, {"$set": {"is_active": False}})
+    db[access_cache.COLLECTION].update_one(
+        {"_id": access_cache.STAMP_ID}, {"$inc": {"v": 1}}, upsert=True)
+    assert _clinic_ids(app, staff) == []
+
+
+def test_local_writes_apply_immediately(app, seed_patient):
+    dentist, staff = str(ObjectId()), str(ObjectId())
+    _, clinic_id = seed_patient(dentist)
+    assert _clinic_ids(app, staff) == []
+    membership_repo.create(staff, dentist)
+    assert _clinic_ids(app, staff) == [clinic_id]
+
+    ctx = _request(app, dentist)
+    try:
+        assert user_clinic_ids() == [clinic_id]
+        new_id = clinic_repo.create({"owner_id": dentist, "name": "Two", "is_active": True})
+        assert sorted(user_clinic_ids()) == sorted([clinic_id, new_id])
+    finally:
+        ctx.pop()
+    assert sorted(_clinic_ids(app, staff)) == sorted([clinic_id, new_id])
+
+    clinic_repo.deactivate_owned(new_id, dentist)
+    assert _clinic_ids(app, staff) == [clinic_id]
+    membership_repo.deactivate(staff, dentist)
+    assert _clinic_ids(app, staff) == []
+
+
+def test_ttl_bounds_unstamped_writes(app, db, seed_patient, monkeypatch):
+    owner = str(ObjectId())
+    _, clinic_id = seed_patient(owner)
+    now = [1000.0]
+    monkeypatch.setattr(access_cache.time, "monotonic", lambda: now[0])
+    assert _clinic_ids(app, owner) == [clinic_id]
+
+    # A shell edit with no stamp bump is served from cache until the TTL...
+    db.clinics.update_one({"_id": clinic_id}, {"$set": {"is_active": False}})
+    assert _clinic_ids(app, owner) == [clinic_id]
+    now[0] += app.config.get("ACCESS_CACHE_SECONDS", access_cache.DEFAULT_TTL_SECONDS) + 1
+    assert _clinic_ids(app, owner) == []
+
+
+def test_zero_ttl_disables_the_cache(app, seed_patient, db_reads):
+    app.config["ACCESS_CACHE_SECONDS"] = 0
+    owner = str(ObjectId())
+    seed_patient(owner)
+    for _ in range(3):
+        _clinic_ids(app, owner)
+    assert db_reads["memberships"] == 3
+    assert db_reads[access_cache.COLLECTION] == 0
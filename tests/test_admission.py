@@ -0,0 +1,141 @@
+"""Tests for per-class admission control (admission.py).
+
+What matters: a saturated class is shed with 503 + Retry-After after a short
+wait, /health always gets through, heavy work can't take every slot, and slots
+come back once the response has been sent (including streamed bodies).
+"""
+import threading
+import time
+
+import pytest
+from flask import Blueprint, Flask, Response
+
+import admission
+import metrics
+
+
+@pytest.fixture
+def gated(tmp_path, monkeypatch):
+    """App with admission installed: 1 heavy slot, 2 slots overall, no waiting.
+    Requests use buffered=True so the test client closes each response (which
+    is what releases its slots) before returning it."""
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_registry", metrics._Registry())
+    app = Flask(__name__)
+    app.config.update(TESTING=True, ADMISSION_HEAVY_LIMIT=1,
+                      ADMISSION_INTERACTIVE_LIMIT=2, ADMISSION_WAIT_SECONDS=0)
+    admission.init_app(app)
+    gates = {"heavy": threading.Event(), "page": threading.Event()}
+    entered = threading.Semaphore(0)
+
+    reports = Blueprint("reports", __name__)
+    uploads = Blueprint("uploads", __name__)
+
+    @uploads.route("/photo")
+    def patient_photo():
+        return "jpeg"
+
+    @reports.route("/reports")
+    def report():
+        entered.release()
+        gates["heavy"].wait(5)
+        return "report"
+
+    @app.route("/page")
+    def page():
+        entered.release()
+        gates["page"].wait(5)
+        return "page"
+
+    @app.route("/health")
+    def health_check():
+        return "ok"
+
+    @app.route("/stream")
+    def stream():
+        return Response(iter(["a", "b"]))
+
+    app.register_blueprint(reports)
+    app.register_blueprint(uploads)
+    app.gates, app.entered = gates, entered
+    yield app
+    for event in gates.values():
+        event.set()
+
+
+def _hold(app, path):
+    """Start a request to `path` that blocks inside the view; returns its thread."""
+    t = threading.Thread(target=lambda: app.test_client().get(path, buffered=True))
+    t.start()
+    assert app.entered.acquire(timeout=2)
+    return t
+
+
+def _outcomes(kind, outcome):
+    key = ("admission_total", (("class", kind), ("outcome", outcome)))
+    return metrics._registry.counters.get(key, 0)
+
+
+def test_endpoint_classes():
+    assert admission.endpoint_class("patients.patient_pdf", "patients") == admission.HEAVY
+    assert admission.endpoint_class("reports.reports", "reports") == admission.HEAVY
+    assert admission.endpoint_class("health_check", None) == admission.HEALTH
+    assert admission.endpoint_class("main.dashboard", "main") == admission.INTERACTIVE
+    assert admission.endpoint_class("uploads.download_file", "uploads") == admission.HEAVY
+    assert admission.endpoint_class("uploads.patient_photo", "uploads") == admission.INTERACTIVE
+
+
+def test_saturated_heavy_class_is_shed_but_pages_still_load(gated):
+    held = _hold(gated, "/reports")
+    client = gated.test_client()
+    shed = client.get("/reports", buffered=True)
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == str(admission.RETRY_AFTER_SECONDS)
+    assert client.get("/stream", buffered=True).status_code == 200  # a general slot is still free
+    assert _outcomes("heavy", "shed") == 1
+    gated.gates["heavy"].set()
+    held.join()
+    assert client.get("/stream", buffered=True).status_code == 200
+
+
+def test_patient_photo_loads_while_the_heavy_class_is_full(gated):
+    held = _hold(gated, "/reports")
+    client = gated.test_client()
+    assert client.get("/reports", buffered=True).status_code == 503
+    assert client.get("/photo", buffered=True).status_code == 200  # an <img> on the page
+    gated.gates["heavy"].set()
+    held.join()
+
+
+def test_health_gets_through_when_everything_is_full(gated):
+    threads = [_hold(gated, "/reports"), _hold(gated, "/page")]
+    client = gated.test_client()
+    assert client.get("/page", buffered=True).status_code == 503
+    assert client.get("/api/x", json={}, buffered=True).get_json()["success"] is False
+    assert client.get("/health", buffered=True).status_code == 200
+    for event in gated.gates.values():
+        event.set()
+    for t in threads:
+        t.join()
+
+
+def test_waiting_request_is_admitted_when_a_slot_frees(gated):
+    gated.extensions["admission"].wait = 2
+    held = _hold(gated, "/reports")
+    threading.Timer(0.1, gated.gates["heavy"].set).start()
+    started = time.monotonic()
+    assert gated.test_client().get("/reports", buffered=True).status_code == 200
+    assert time.monotonic() - started >= 0.05
+    held.join()
+    assert _outcomes("heavy", "queued") == 1
+    assert 'dentalportal_admission_wait_seconds_count{class="heavy"} 2' in metrics.render_prometheus()
+
+
+def test_slot_is_held_until_a_streamed_body_is_closed(gated):
+    client = gated.test_client()
+    first = client.get("/stream", buffered=False)
+    second = client.get("/stream", buffered=False)
+    assert client.get("/stream", buffered=True).status_code == 503  # both slots still streaming
+    first.close()
+    assert client.get("/stream", buffered=True).status_code == 200
+    second.close()
@@ -0,0 +1,98 @@
+"""Tests for partial indexes + the soft-deleted record archive (repositories/archive.py)."""
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from blueprints.repositories import archive as archive_repo
+from blueprints.repositories import patients as patient_repo
+
+OLD = datetime(2024, 1, 1)
+RECENT = datetime(2025, 6, 1)
+CUTOFF = datetime(2025, 1, 1)
+
+
+def _clinic(db, owner="d1", active=True, updated_at=OLD):
+    return db.clinics.insert_one({"owner_id": owner, "name": "C", "is_active": active,
+                                  "updated_at": updated_at}).inserted_id
+
+
+def _patient(db, clinic_id, active=False, updated_at=OLD, **extra):
+    return db.patients.insert_one({"clinic_id": clinic_id, "is_active": active,
+                                   "updated_at": updated_at, **extra}).inserted_id
+
+
+def test_ensure_indexes_replaces_plain_indexes_with_partial_ones(db):
+    db.patients.create_index("clinic_id")
+    db.appointments.create_index([("clinic_id", 1), ("date", 1)])
+    archive_repo.ensure_indexes()
+    archive_repo.ensure_indexes()  # idempotent: superseded ones already gone
+    patients = db.patients.index_information()
+    assert "clinic_id_1" not in patients
+    assert patients["active_clinic_created"]["partialFilterExpression"] == {"is_active": True}
+    assert "clinic_id_1_date_1" not in db.appointments.index_information()
+    assert "active_user" in db.memberships.index_information()
+
+
+def test_archive_moves_only_long_inactive_records_and_audits(db):
+    clinic = _clinic(db)
+    old = _patient(db, clinic, personal_info={"first_name": "Ana"})
+    recent = _patient(db, clinic, updated_at=RECENT)
+    active = _patient(db, clinic, active=True)
+    legacy = db.patients.insert_one({"clinic_id": clinic, "is_active": False,
+                                     "created_at": OLD}).inserted_id  # no stamp
+
+    assert archive_repo.counts(CUTOFF)["patients"] == (2, 0)
+    assert archive_repo.archive_inactive("patients", CUTOFF, batch_size=1, compressor=None) == (2, 0)
+    assert {p["_id"] for p in db.patients.find()} == {recent, active}
+    archived = db.patients_archive.find_one({"_id": old})
+    assert archived["personal_info"] == {"first_name": "Ana"} and "archived_at" in archived
+    assert db.patients_archive.count_documents({"_id": legacy}) == 1
+
+    entries = list(db.audit_log.find({"action": "archive"}))
+    assert {e["entity_id"] for e in entries} == {str(old), str(legacy)}
+    assert all(e["entity_type"] == "patient" and e["dentist_id"] == "d1"
+               and e["actor_role"] == "system" for e in entries)
+    assert archive_repo.archive_inactive("patients", CUTOFF, compressor=None) == (0, 0)
+
+
+def test_clinic_with_active_patients_is_held_back(db):
+    busy, empty = _clinic(db, active=False), _clinic(db, active=False)
+    _patient(db, busy, active=True)
+    assert archive_repo.archive_inactive("clinics", CUTOFF, compressor=None) == (1, 1)
+    assert db.clinics.find_one({"_id": busy}) is not None
+    assert db.clinics_archive.find_one({"_id": empty}) is not None
+
+
+def test_interrupted_run_resumes(db):
+    pid = _patient(db, _clinic(db))
+    db.patients_archive.insert_one({**db.patients.find_one({"_id": pid}), "stale": True})
+    assert archive_repo.archive_inactive("patients", CUTOFF, compressor=None) == (1, 0)
+    assert db.patients.count_documents({}) == 0
+    assert "stale" not in db.patients_archive.find_one({"_id": pid})
+
+
+def test_restore_puts_the_record_back_inactive(db):
+    pid = _patient(db, _clinic(db))
+    archive_repo.archive_inactive("patients", CUTOFF, compressor=None)
+    assert patient_repo.get(str(pid)) is None
+    assert patient_repo.get(str(pid), include_archived=True)["_id"] == pid
+
+    assert archive_repo.restore("patients", str(pid))
+    doc = db.patients.find_one({"_id": pid})
+    assert doc["is_active"] is False and "restored_at" in doc and "archived_at" not in doc
+    assert db.patients_archive.count_documents({}) == 0
+    assert db.audit_log.count_documents({"action": "restore", "entity_id": str(pid)}) == 1
+    assert not archive_repo.restore("patients", str(pid))
+    assert not archive_repo.restore("patients", "not-an-id")
+
+
+def test_appointments_and_memberships_use_their_own_stamps(db):
+    clinic = _clinic(db, owner="d9")
+    db.appointments.insert_one({"clinic_id": clinic, "is_active": False, "deleted_at": OLD,
+                                "updated_at": RECENT})
+    db.memberships.insert_one({"user_id": "s1", "dentist_id": "d9", "is_active": False,
+                               "revoked_at": RECENT, "created_at": OLD})
+    assert archive_repo.archive_inactive("appointments", CUTOFF, compressor=None) == (1, 0)
+    assert archive_repo.archive_inactive("memberships", CUTOFF, compressor=None) == (0, 0)
+    assert db.audit_log.find_one({"entity_type": "appointment"})["dentist_id"] == "d9"
+    assert ObjectId.is_valid(db.audit_log.find_one()["entity_id"])
@@ -0,0 +1,80 @@
+"""Tests for the fingerprinted static-asset pipeline (assets.py).
+
+The build output is committed (Render has no build step), so the first test is
+the guard: it fails whenever static/css or static/js was edited without
+re-running ``python scripts/build_assets.py``.
+"""
+import json
+import os
+import re
+
+import assets
+
+
+def test_committed_build_is_up_to_date():
+    assert assets.build(check=True) == [], (
+        "static assets are stale: run python scripts/build_assets.py")
+
+
+def test_asset_url_resolves_through_the_manifest(app):
+    with app.test_request_context():
+        url = assets.asset_url("js/dental_chart.js")
+        assert re.fullmatch(r"/static/dist/js/dental_chart\.[0-9a-f]{10}\.js", url)
+        assert os.path.isfile(os.path.join(assets.STATIC_DIR, url[len("/static/"):]))
+        # Not in the manifest: the unhashed file.
+        assert assets.asset_url("js/nope.js") == "/static/js/nope.js"
+        app.debug = True  # local edits show up without a rebuild
+        assert assets.asset_url("js/dental_chart.js") == "/static/js/dental_chart.js"
+
+
+def test_is_fingerprinted():
+    assert assets.is_fingerprinted("dist/css/base.0123456789.css")
+    assert not assets.is_fingerprinted("dist/manifest.json")
+    assert not assets.is_fingerprinted("css/base.css")
+    assert not assets.is_fingerprinted("offline.html")
+
+
+def _static_tree(root):
+    for rel, body in {
+        "css/site.css": "body { color: red; }\n",
+        "js/site.js": "console.log(1);\n",
+        "js/empty.js": "",
+        "offline.html": "offline",
+        "icons/icon-192.png": "png",
+        "icons/icon-512.png": "png",
+        "manifest.webmanifest": "{}",
+        "sw.js": f"// sw\n{assets.SW_BEGIN}\nconst CACHE = 'x';\n{assets.SW_END}\nrest();\n",
+    }.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body)
+    return root
+
+
+def _cache_name(root):
+    return re.search(r"const CACHE = '([^']+)'", (root / "sw.js").read_text()).group(1)
+
+
+def test_build_fingerprints_prunes_and_regenerates_the_sw_shell(tmp_path):
+    root = _static_tree(tmp_path)
+    assert assets.build(str(root), check=True)  # nothing built yet
+    assets.build(str(root))
+    assert assets.build(str(root), check=True) == []
+
+    (old_css,) = (root / "dist" / "css").iterdir()
+    sw = (root / "sw.js").read_text()
+    assert f"'/static/dist/css/{old_css.name}'," in sw
+    assert "'/static/offline.html'," in sw
+    # An empty source is skipped: no hashed copy, manifest entry or precache.
+    assert not list((root / "dist" / "js").glob("empty.*")) and "empty" not in sw
+    assert "js/empty.js" not in json.loads((root / "dist" / "manifest.json").read_text())
+    assert sw.startswith("// sw\n") and sw.endswith("rest();\n")
+    first_cache = _cache_name(root)
+
+    (root / "css" / "site.css").write_text("body { color: blue; }\n")
+    changed = assets.build(str(root))
+    (new_css,) = (root / "dist" / "css").iterdir()
+    assert new_css.name != old_css.name
+    assert f"dist/css/{old_css.name}" in changed  # stale hash removed
+    assert _cache_name(root) != first_cache       # SW picks up the new shell
+    assert assets.build(str(root), check=True) == []
@@ -3,6 +3,8 @@
 Guards the accountability trail and its PHI-hygiene contract: only structured
 identifiers are stored, and an audit failure must never break the user's action.
 """
+from datetime import datetime
+
 from bson.objectid import ObjectId
 from flask import session
 
@@ -38,14 +40,6 @@ def test_entity_id_coerced_to_str(db):
     assert db.audit_log.find_one({'_id': eid})['entity_id'] == str(oid)
 
 
-def test_find_for_dentist_and_find_all(db):
-    d1, d2 = str(ObjectId()), str(ObjectId())
-    audit_repo.record('create', 'patient', 'a', dentist_id=d1)
-    audit_repo.record('create', 'patient', 'b', dentist_id=d2)
-    assert len(audit_repo.find_for_dentist(d1)) == 1
-    assert len(audit_repo.find_all()) == 2
-
-
 def test_count_helpers(db):
     d1 = str(ObjectId())
     audit_repo.record('create', 'patient', 'a', dentist_id=d1)
@@ -55,16 +49,108 @@ def test_count_helpers(db):
     assert audit_repo.count_all() == 3
 
 
-def test_find_pagination_skip_limit(db):
+# ── retention / archive ───────────────────────────────────────────────────────
+def _entry(db, when, dentist_id=None):
+    return db.audit_log.insert_one({
+        'action': 'login', 'entity_type': 'auth', 'dentist_id': dentist_id,
+        'timestamp': when,
+    }).inserted_id
+
+
+def test_archive_before_moves_old_entries_by_month(db):
+    d1, d2 = str(ObjectId()), str(ObjectId())
+    _entry(db, datetime(2025, 1, 5), d1)
+    _entry(db, datetime(2025, 1, 20), d2)
+    _entry(db, datetime(2025, 2, 1), d1)
+    recent = _entry(db, datetime(2025, 6, 1), d1)
+
+    moved = audit_repo.archive_before(datetime(2025, 3, 1), batch_size=2, compressor=None)
+    assert moved == {'2025-01': 2, '2025-02': 1}
+    assert [e['_id'] for e in db.audit_log.find()] == [recent]
+    assert audit_repo.archive_months() == ['2025-02', '2025-01']
+
+    assert audit_repo.count_archived('2025-01') == 2
+    assert audit_repo.count_archived('2025-01', d1) == 1
+    entries, _ = audit_repo.find_page(audit_repo.build_query(dentist_id=d2), month='2025-01')
+    assert [e['dentist_id'] for e in entries] == [d2]
+    assert audit_repo.find_page({}, month='2024-12') == ([], None)
+    assert audit_repo.find_page({}, month='../users') == ([], None)
+    # Nothing left to do on a second run.
+    assert audit_repo.archive_before(datetime(2025, 3, 1), compressor=None) == {}
+
+
+def test_archive_before_resumes_after_interrupted_batch(db):
+    eid = _entry(db, datetime(2025, 1, 5))
+    # A previous run copied the entry but died before deleting it.
+    db.audit_archive_2025_01.insert_one(db.audit_log.find_one({'_id': eid}))
+    assert audit_repo.archive_before(datetime(2025, 3, 1), compressor=None) == {'2025-01': 1}
+    assert db.audit_log.count_documents({}) == 0
+    assert db.audit_archive_2025_01.count_documents({}) == 1
+
+
+# ── viewer: filters + keyset paging ───────────────────────────────────────────
+def test_find_page_walks_keyset_without_gaps_or_repeats(db):
     d = str(ObjectId())
-    for i in range(5):
-        audit_repo.record('create', 'patient', str(i), dentist_id=d)
-    page1 = audit_repo.find_for_dentist(d, limit=2, skip=0)
-    page2 = audit_repo.find_for_dentist(d, limit=2, skip=2)
-    assert len(page1) == 2 and len(page2) == 2
-    ids1 = {e['entity_id'] for e in page1}
-    ids2 = {e['entity_id'] for e in page2}
-    assert ids1.isdisjoint(ids2)  # newest-first pages don't overlap
+    same_ms = datetime(2025, 5, 1, 12, 0)
+    ids = [_entry(db, same_ms, d) for _ in range(3)]  # ties on timestamp
+    ids += [_entry(db, datetime(2025, 5, 1, 12, i), d) for i in range(1, 5)]
+    _entry(db, datetime(2025, 5, 2), str(ObjectId()))  # another dentist
+
+    query = audit_repo.build_query(dentist_id=d)
+    seen, cursor = [], None
+    while True:
+        page, cursor = audit_repo.find_page(query, before=audit_repo.decode_cursor(cursor), limit=2)
+        seen += [e['_id'] for e in page]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 7
+    assert set(seen) == set(ids)
+    stamps = [db.audit_log.find_one({'_id': i})['timestamp'] for i in seen]
+    assert stamps == sorted(stamps, reverse=True)
+
+
+def test_build_query_filters_and_date_range(db):
+    d, actor = str(ObjectId()), str(ObjectId())
+    audit_repo.record('login_failed', 'auth', actor_user_id=actor)
+    audit_repo.record('update', 'patient', 'p1', actor_user_id=actor, dentist_id=d)
+    audit_repo.record('update', 'chart', 'p1', dentist_id=d)
+    audit_repo.record('update', 'patient', 'p2', dentist_id=d)
+
+    def actions(**kw):
+        page, _ = audit_repo.find_page(audit_repo.build_query(**kw))
+        return sorted((e['action'], e['entity_type']) for e in page)
+
+    assert actions(filters={'entity_id': 'p1'}) == [('update', 'chart'), ('update', 'patient')]
+    assert actions(filters={'action': 'login_failed', 'entity_type': ''}) == [('login_failed', 'auth')]
+    assert actions(filters={'actor_user_id': actor}, dentist_id=d) == [('update', 'patient')]
+    assert actions(filters={'bogus': 'x'}, since=datetime(2000, 1, 1)) == actions()
+    assert actions(until=datetime(2000, 1, 1)) == []
+
+
+def test_every_filter_has_a_dentist_scoped_index(db):
+    audit_repo._ensure_archive('audit_archive_2025_01', compressor=None)
+    keys = [[k for k, _ in i['key']] for i in db.audit_archive_2025_01.index_information().values()]
+    for field in audit_repo.FILTER_FIELDS:
+        assert [field, 'timestamp', '_id'] in keys
+        assert ['dentist_id', field, 'timestamp', '_id'] in keys
+    assert ['dentist_id', 'timestamp', '_id'] in keys
+
+
+def test_ensure_indexes_drops_the_timestamp_only_indexes(db):
+    db.audit_log.create_index([('dentist_id', 1), ('timestamp', -1)])
+    db.audit_log.create_index('timestamp')
+    audit_repo.ensure_indexes()
+    audit_repo.ensure_indexes()  # idempotent: superseded ones already gone
+    names = db.audit_log.index_information()
+    assert not set(audit_repo.SUPERSEDED_INDEXES) & set(names)
+    assert 'dentist_id_1_timestamp_-1__id_-1' in names
+
+
+def test_cursor_round_trip_and_garbage():
+    entry = {'timestamp': datetime(2025, 5, 1, 12, 0, 0, 123000), '_id': ObjectId()}
+    assert audit_repo.decode_cursor(audit_repo.encode_cursor(entry)) == (entry['timestamp'], entry['_id'])
+    for junk in (None, '', 'abc', '12-notanid', '-' + str(ObjectId())):
+        assert audit_repo.decode_cursor(junk) is None
 
 
 # ── session-aware helper ──────────────────────────────────────────────────────
@@ -0,0 +1,65 @@
+"""Tests for the streamed audit-log export (blueprints/utils/audit_export.py)."""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from blueprints.repositories import audit_log as audit_repo
+from blueprints.utils import audit_export
+
+
+def _seed(db, n, dentist_id, actor_id, start=datetime(2025, 5, 1)):
+    db.audit_log.insert_many([{
+        "action": "update", "entity_type": "patient", "entity_id": f"p{i}",
+        "actor_user_id": actor_id, "actor_role": "staff",
+        "clinic_id": ObjectId(), "dentist_id": dentist_id,
+        "timestamp": start + timedelta(seconds=i),
+        "note": "stray field that must never be exported",
+    } for i in range(n)])
+
+
+def test_iter_chunks_covers_everything_in_bounded_chunks(db):
+    d = str(ObjectId())
+    _seed(db, 25, d, None)
+    _seed(db, 5, str(ObjectId()), None)  # other dentist
+    chunks = list(audit_repo.iter_chunks(audit_repo.build_query(dentist_id=d), chunk_size=10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    ids = [e["entity_id"] for c in chunks for e in c]
+    assert len(set(ids)) == 25 and ids[0] == "p24"  # newest first
+    assert list(audit_repo.iter_chunks({}, month="2020-01")) == []
+
+
+def test_ndjson_rows_are_whitelisted_and_named(db):
+    dentist = str(db.users.insert_one({"name": "Dr. Reyes"}).inserted_id)
+    actor = str(db.users.insert_one({"email": "staff@dental.com"}).inserted_id)
+    _seed(db, 3, dentist, actor)
+    lines = "".join(audit_export.ndjson(audit_repo.iter_chunks({}))).splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert len(rows) == 3
+    assert set(rows[0]) == set(audit_export.FIELDS)
+    assert rows[0]["actor_name"] == "staff@dental.com"
+    assert rows[0]["dentist_name"] == "Dr. Reyes"
+    assert rows[0]["timestamp"] == "2025-05-01T00:00:02.000Z"
+
+
+def test_names_are_resolved_once_per_new_id(db, db_reads):
+    dentist = str(ObjectId())
+    db.users.insert_one({"_id": ObjectId(dentist), "name": "Dr. A"})
+    _seed(db, 30, dentist, dentist)
+    out = "".join(audit_export.csv_lines(audit_repo.iter_chunks({}, chunk_size=10)))
+    assert out.count("Dr. A") == 60
+    assert db_reads["users"] == 1  # ids from later chunks were already cached
+
+
+def test_csv_has_header_and_neutralises_formulas(db):
+    db.audit_log.insert_one({
+        "action": "=HYPERLINK(\"http://x\")", "entity_type": "auth",
+        "timestamp": datetime(2025, 5, 1),
+    })
+    reader = csv.reader(io.StringIO("".join(audit_export.csv_lines(audit_repo.iter_chunks({})))))
+    header, row = list(reader)
+    assert tuple(header) == audit_export.FIELDS
+    assert row[header.index("action")].startswith("'=")
+    assert row[header.index("actor_name")] == ""
@@ -0,0 +1,266 @@
+"""Tests for scripts/backup_data.py + scripts/restore_data.py.
+
+Both scripts open their own MongoClient from a URI; here each URI resolves to
+an in-memory mongomock client, so a backup is taken from one database and
+restored into another without a server. Backups land in tmp_path.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import mongomock
+import pytest
+from bson.objectid import ObjectId
+
+from extensions import mongo
+from blueprints.repositories import appointments as appt_repo
+from blueprints.repositories import audit_log as audit_repo
+from blueprints.repositories import patients as patient_repo
+from blueprints.repositories import treatments as treatment_repo
+from blueprints.repositories import users as user_repo
+from scripts import backup_data, migrate_dates, restore_data
+
+SOURCE = "mongodb://localhost/clinic_src"
+TARGET = "mongodb://localhost/clinic_restore"
+
+
+@pytest.fixture
+def servers(tmp_path, monkeypatch):
+    """{uri: mongomock client}; both scripts connect through it."""
+    clients = {}
+
+    def connect(uri, **_kwargs):
+        if uri not in clients:
+            clients[uri] = mongomock.MongoClient(uri)
+        return clients[uri]
+
+    # mongomock's bulk_write rejects bypass_document_validation (insert_many
+    # accepts it); there is no validator to bypass here anyway.
+    bulk_write = mongomock.collection.Collection.bulk_write
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write",
+                        lambda self, requests, ordered=True, bypass_document_validation=False,
+                        session=None: bulk_write(self, requests, ordered=ordered, session=session))
+    monkeypatch.setattr(backup_data, "MongoClient", connect)
+    monkeypatch.setattr(restore_data, "MongoClient", connect)
+    monkeypatch.setattr(backup_data, "BACKUP_ROOT", str(tmp_path))
+    connect(SOURCE), connect(TARGET)
+    return clients
+
+
+def _db(servers, uri):
+    return servers[uri].get_default_database()
+
+
+def _backup(*args):
+    assert backup_data.main([SOURCE, "--workers", "1", "--no-files", *args]) == 0
+
+
+def _only_backup(tmp_path, suffix=".zip"):
+    (path,) = [p for p in tmp_path.iterdir() if p.name.endswith(suffix)]
+    return str(path)
+
+
+def _restore(path, *args):
+    return restore_data.main([path, "--uri", TARGET, "--drop", "--yes", "--workers", "1", *args])
+
+
+def _docs(db, name):
+    return sorted(db[name].find(), key=lambda d: d["_id"])
+
+
+def test_interrupted_restore_resumes_without_duplicates_or_gaps(servers, tmp_path, monkeypatch, capsys):
+    source = _db(servers, SOURCE)
+    source.patients.insert_many([{"n": i} for i in range(25)])
+    _backup()
+    path = _only_backup(tmp_path)
+
+    class Crash(Exception):
+        pass
+
+    real_insert, calls = restore_data._insert_batch, []
+
+    def crash_on_second_batch(coll, batch):
+        calls.append(len(batch))
+        duplicates = real_insert(coll, batch)
+        if len(calls) == 2:  # written, but the checkpoint never hears of it
+            raise Crash()
+        return duplicates
+
+    monkeypatch.setattr(restore_data, "_insert_batch", crash_on_second_batch)
+    with pytest.raises(Crash):
+        _restore(path, "--batch-size", "10")
+    target = _db(servers, TARGET)
+    assert target.patients.count_documents({}) == 20
+    checkpoint = restore_data._Checkpoint(f"{path}.restore-{target.name}.json")
+    assert checkpoint.resuming and checkpoint.get("patients") == {"loaded": 10, "done": False}
+
+    monkeypatch.setattr(restore_data, "_insert_batch", real_insert)
+    capsys.readouterr()
+    assert _restore(path, "--batch-size", "10") == 0
+    out = capsys.readouterr().out
+    assert "Resuming restore" in out and "(resumed at 10), 10 already present" in out
+    assert "patients             expected     25 | restored     25  OK" in out
+    assert _docs(target, "patients") == _docs(source, "patients")
+    assert not os.path.exists(checkpoint.path)  # verified, so it's discarded
+
+
+def test_count_mismatch_fails_verification_and_keeps_the_checkpoint(servers, tmp_path):
+    _db(servers, SOURCE).patients.insert_many([{"n": i} for i in range(3)])
+    _backup()
+    path = _only_backup(tmp_path)
+    _db(servers, TARGET).patients.insert_one({"n": "left over"})
+    assert _restore(path, "--restart") == 0  # --drop: the stray doc goes
+    _db(servers, TARGET).patients.insert_one({"n": "written mid-restore"})
+    checkpoint = f"{path}.restore-clinic_restore.json"
+    restore_data._Checkpoint(checkpoint).update("patients", 3, done=True)
+    assert _restore(path) == 1
+    assert os.path.exists(checkpoint)  # a re-run resumes instead of starting over
+
+
+def test_incremental_chain_replays_to_the_source(servers, tmp_path, monkeypatch):
+    source = _db(servers, SOURCE)
+    monkeypatch.setattr(mongo, "db", source)  # the repository helpers write here
+    old = [ObjectId.from_datetime(datetime(2024, 1, day)) for day in (1, 2, 3)]
+    with_photo, renamed, removed = (str(oid) for oid in old)
+    source.patients.insert_many([
+        {"_id": old[0], "name": "A", "photo_file_id": "f1"},
+        {"_id": old[1], "name": "B"},
+        {"_id": old[2], "name": "C"},
+    ])
+    source.report_cache.insert_one({"_id": old[0], "rows": []})
+    _backup()
+    full = _only_backup(tmp_path)
+
+    new = source.patients.insert_one({"name": "D"}).inserted_id
+    patient_repo.update_set(renamed, {"name": "B2"})
+    patient_repo.unset(with_photo, ["photo_file_id"])  # no caller-side stamp
+    source.patients.delete_one({"_id": ObjectId(removed)})
+    source.report_cache.drop()
+    _backup("--incremental", full)
+    incr = _only_backup(tmp_path, "-incr.zip")
+
+    manifest = backup_data._Backup(incr).manifest
+    assert manifest["parent"]["backup_id"] == backup_data._Backup(full).manifest["backup_id"]
+    assert manifest["changed"]["patients"] == 3
+    assert manifest["deletions"]["patients"] == 1
+    assert manifest["collections"]["patients"] == 3
+    assert manifest["dropped_collections"] == ["report_cache"]
+
+    assert _restore(incr) == 0
+    target = _db(servers, TARGET)
+    assert _docs(target, "patients") == _docs(source, "patients")
+    assert {d["_id"] for d in target.patients.find()} == {old[0], old[1], new}
+    assert "photo_file_id" not in target.patients.find_one({"_id": old[0]})
+    assert "report_cache" not in target.list_collection_names()
+
+
+def test_write_helpers_stamp_a_change_marker(db):
+    since = datetime.utcnow().replace(microsecond=0)
+    ids = {name: db[name].insert_one({"_id": ObjectId.from_datetime(datetime(2024, 1, 1)),
+                                      "x": 1}).inserted_id
+           for name in ("patients", "treatment_records", "appointments", "users")}
+    changed = backup_data._changes_filter(since)
+    assert not any(db[name].find_one(changed) for name in ids)
+
+    patient_repo.unset(str(ids["patients"]), ["x"])
+    treatment_repo.update_set(str(ids["treatment_records"]), {"x": 2})
+    appt_repo.update_set(str(ids["appointments"]), {"x": 2})
+    user_repo.update_set(str(ids["users"]), {"x": 2})
+    assert all(db[name].find_one(changed) for name in ids)
+
+
+def test_deleted_ids_merge_join_across_id_types():
+    a, b = sorted(ObjectId() for _ in range(2))
+    previous = iter([1, 2, "x", "y", a, b])
+    current = iter([2, "y", b])
+    assert list(backup_data._deleted_ids(previous, current)) == [1, "x", a]
+
+
+def _link(folder, backup_id, day, parent=None):
+    path = folder / backup_id
+    path.mkdir()
+    manifest = {"backup_id": backup_id, "type": "incremental" if parent else "full",
+                "snapshot_utc": f"2026-06-0{day}T02:00:00+00:00"}
+    if parent:
+        manifest["parent"] = {"backup_id": parent}
+    (path / "manifest.json").write_text(json.dumps(manifest))
+    return str(path)
+
+
+def test_until_stops_the_chain_at_the_last_backup_before_it(tmp_path):
+    _link(tmp_path, "db-1", 1)
+    _link(tmp_path, "db-2-incr", 2, parent="db-1")
+    newest = _link(tmp_path, "db-3-incr", 3, parent="db-2-incr")
+
+    def ids(until=None):
+        return [m["backup_id"] for _path, m in restore_data._resolve_chain(newest, until)]
+
+    assert ids() == ["db-1", "db-2-incr", "db-3-incr"]
+    assert ids(datetime(2026, 6, 2, 12, tzinfo=timezone.utc)) == ["db-1", "db-2-incr"]
+    assert ids(datetime(2026, 6, 3, 2, tzinfo=timezone.utc)) == ["db-1", "db-2-incr", "db-3-incr"]
+    with pytest.raises(SystemExit):
+        ids(datetime(2026, 5, 31, tzinfo=timezone.utc))
+    (tmp_path / "db-1" / "manifest.json").unlink()
+    (tmp_path / "db-1").rmdir()
+    with pytest.raises(SystemExit, match="chain is broken"):
+        ids()
+
+
+def test_incremental_skips_a_backup_left_unfinished(servers, tmp_path):
+    _db(servers, SOURCE).patients.insert_one({"n": 1})
+    _backup()
+    full = _only_backup(tmp_path)
+    aborted = tmp_path / "clinic_src-29991231-235959"  # newer, but no manifest
+    (aborted / "files").mkdir(parents=True)
+    (tmp_path / "clinic_src-29991231-235958.zip").write_bytes(b"truncated")
+    assert backup_data._latest_backup("clinic_src") == full
+    _backup("--incremental")
+    incr = _only_backup(tmp_path, "-incr.zip")
+    assert backup_data._Backup(incr).manifest["parent"]["backup_id"] in full
+
+
+def test_date_migration_is_picked_up_by_the_next_incremental(servers, tmp_path):
+    source = _db(servers, SOURCE)
+    old = ObjectId.from_datetime(datetime(2024, 1, 1))
+    source.treatment_records.insert_one({"_id": old, "date": datetime(2024, 1, 1),
+                                         "updated_at": "2024-01-01T08:00:00"})
+    _backup()
+    full = _only_backup(tmp_path)
+    migrate_dates.migrate_collection(source.treatment_records, apply=True, batch_size=10)
+    _backup("--incremental", full)
+    assert _restore(_only_backup(tmp_path, "-incr.zip")) == 0
+    restored = _db(servers, TARGET).treatment_records.find_one({"_id": old})
+    assert restored["date"] == "2024-01-01"
+    assert restored["updated_at"] == datetime(2024, 1, 1, 8)
+
+
+def test_audit_archive_survives_an_incremental_backup(servers, tmp_path, monkeypatch):
+    source = _db(servers, SOURCE)
+    monkeypatch.setattr(mongo, "db", source)
+    for day in (1, 2, 3):
+        when = datetime(2025, 9, day)
+        source.audit_log.insert_one({"_id": ObjectId.from_datetime(when), "action": "update",
+                                     "dentist_id": "d1", "timestamp": when})
+    _backup()
+    full = _only_backup(tmp_path)
+    assert audit_repo.archive_before(datetime(2025, 10, 1), compressor=None) == {"2025-09": 3}
+    _backup("--incremental", full)
+    incr = _only_backup(tmp_path, "-incr.zip")
+
+    manifest = backup_data._Backup(incr).manifest
+    assert manifest["changed"]["audit_archive_2025_09"] == 3
+    assert _restore(incr) == 0
+    target = _db(servers, TARGET)
+    assert target.audit_log.count_documents({}) == 0
+    assert _docs(target, "audit_archive_2025_09") == _docs(source, "audit_archive_2025_09")
+
+
+def test_collection_new_since_the_parent_is_dumped_in_full(servers, tmp_path):
+    source = _db(servers, SOURCE)
+    source.patients.insert_one({"n": 1})
+    _backup()
+    full = _only_backup(tmp_path)
+    source.imported.insert_one({"_id": ObjectId.from_datetime(datetime(2020, 1, 1))})
+    _backup("--incremental", full)
+    manifest = backup_data._Backup(_only_backup(tmp_path, "-incr.zip")).manifest
+    assert manifest["changed"]["imported"] == 1
@@ -0,0 +1,105 @@
+"""Tests for gzip/brotli response compression (compression.py).
+
+The important half is what must NOT be touched: streamed bodies, send_file()
+responses (GridFS photos/files, PDFs) and already-compressed upload types.
+"""
+import gzip
+import io
+
+import pytest
+from flask import Response, jsonify, send_file
+
+import compression
+
+BIG = "<p>" + "dental chart " * 500 + "</p>"
+
+
+@pytest.fixture
+def capp(app, tmp_path):
+    app.static_folder = str(tmp_path)
+    compression.init_app(app)
+
+    @app.route("/_c/html")
+    def _html():
+        return BIG
+
+    @app.route("/_c/small")
+    def _small():
+        return "<p>tiny</p>"
+
+    @app.route("/_c/json")
+    def _json():
+        return jsonify(events=[{"title": "Cleaning", "n": i} for i in range(200)])
+
+    @app.route("/_c/stream")
+    def _stream():
+        return Response((BIG for _ in range(3)), mimetype="text/html")
+
+    @app.route("/_c/file")
+    def _file():
+        return send_file(io.BytesIO(BIG.encode()), mimetype="text/html")
+
+    @app.route("/_c/pdf")
+    def _pdf():
+        return Response(b"%PDF" + b"0" * 5000, mimetype="application/pdf")
+
+    return app
+
+
+def _get(client, url, accept="gzip, deflate, br"):
+    return client.get(url, headers={"Accept-Encoding": accept})
+
+
+def test_html_and_json_are_compressed_for_clients_that_accept_it(capp):
+    client = capp.test_client()
+    resp = _get(client, "/_c/html", accept="gzip")
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) == len(resp.data) < len(BIG)
+    assert gzip.decompress(resp.data).decode() == BIG
+
+    resp = _get(client, "/_c/json")
+    assert resp.headers["Content-Encoding"] in compression.available_encodings()
+
+
+def test_negotiation():
+    assert compression.negotiate("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert compression.negotiate("br;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert compression.negotiate("gzip;q=0, *", ["br", "gzip"]) == "br"
+    assert compression.negotiate("identity", ["br", "gzip"]) is None
+    assert compression.negotiate("", ["br", "gzip"]) is None
+
+
+def test_identity_when_not_accepted_or_too_small(capp):
+    client = capp.test_client()
+    resp = _get(client, "/_c/html", accept="")
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data(as_text=True) == BIG
+    assert "Content-Encoding" not in _get(client, "/_c/small").headers
+
+
+def test_streams_send_file_and_binary_types_pass_through(capp):
+    client = capp.test_client()
+    for url in ("/_c/stream", "/_c/file", "/_c/pdf"):
+        resp = _get(client, url)
+        assert "Content-Encoding" not in resp.headers, url
+    assert _get(client, "/_c/stream").get_data(as_text=True) == BIG * 3
+
+
+def test_static_serves_the_best_precompressed_sibling(capp, tmp_path):
+    body = b"body{color:red}" * 100
+    (tmp_path / "site.css").write_bytes(body)
+    (tmp_path / "site.css.gz").write_bytes(compression.compress(body, "gzip", 9))
+    client = capp.test_client()
+
+    resp = _get(client, "/static/site.css", accept="gzip")
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.mimetype == "text/css"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert gzip.decompress(resp.get_data()) == body
+    resp.close()
+
+    resp = _get(client, "/static/site.css", accept="")
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_data() == body
+    resp.close()
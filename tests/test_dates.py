@@ -0,0 +1,52 @@
+"""Tests for the canonical date helpers (blueprints/repositories/dates.py)."""
+from datetime import date, datetime, timedelta, timezone
+
+from blueprints.repositories import appointments as appt_repo
+from blueprints.repositories import dates
+from blueprints.repositories import treatments as treatment_repo
+
+
+def test_parse_accepts_every_stored_form_in_one_pass():
+    expected = datetime(2026, 6, 15, 9, 30)
+    for value in ("2026-06-15T09:30:00", "2026-06-15 09:30:00",
+                  "2026-06-15T09:30:00.000000", "2026-06-15T17:30:00+08:00",
+                  "2026-06-15T09:30:00Z", expected,
+                  datetime(2026, 6, 15, 17, 30, tzinfo=timezone(timedelta(hours=8)))):
+        assert dates.parse(value) == expected, value
+    assert dates.parse("2026-06-15") == datetime(2026, 6, 15)
+    assert dates.parse(date(2026, 6, 15)) == datetime(2026, 6, 15)
+    for value in ("", "garbage", "15/06/2026", None, 42):
+        assert dates.parse(value) is None
+
+
+def test_format_date_is_memoised_and_tolerant():
+    dates._format.cache_clear()
+    for _ in range(100):  # a 100-row treatment table on the same day
+        assert dates.format_date("2026-06-15", "%m/%d/%Y") == "06/15/2026"
+    info = dates._format.cache_info()
+    assert info.misses == 1 and info.hits == 99
+    assert dates.format_date("not a date", "%Y") == "not a date"
+    assert dates.format_date(datetime(2026, 1, 2, 3, 4), "%b %d, %Y %H:%M") == "Jan 02, 2026 03:04"
+    assert dates._format.cache_info().currsize == 2  # timestamps aren't memoised
+
+
+def test_normalize_makes_day_and_timestamp_fields_canonical():
+    doc = {"date": datetime(2026, 6, 15), "created_at": "2026-06-15T08:00:00",
+           "updated_at": datetime(2026, 6, 15), "notes": "2026-06-15T08:00:00"}
+    dates.normalize(doc, ("date",))
+    assert doc["date"] == "2026-06-15"
+    assert doc["created_at"] == datetime(2026, 6, 15, 8)
+    assert doc["notes"] == "2026-06-15T08:00:00"  # not a date field
+    # Unparseable values are left for validation to deal with, not dropped.
+    assert dates.normalize({"date": "soon"}, ("date",)) == {"date": "soon"}
+
+
+def test_repositories_write_canonical_dates(db):
+    tid = treatment_repo.insert({"date": "2026-06-15T00:00:00", "created_at": datetime.utcnow()})
+    assert db.treatment_records.find_one()["date"] == "2026-06-15"
+    treatment_repo.update_set(tid, {"date": datetime(2026, 6, 16)})
+    assert db.treatment_records.find_one()["date"] == "2026-06-16"
+
+    aid = appt_repo.insert({"date": date(2026, 7, 1), "time": "09:00"})
+    appt_repo.update_set(aid, {"date": "2026-07-02T00:00:00"})
+    assert db.appointments.find_one()["date"] == "2026-07-02"
@@ -0,0 +1,133 @@
+"""Tests for the shared-memory Flask-Limiter storage (limiter_storage.py)."""
+import multiprocessing
+import time
+
+import pytest
+from flask import Flask
+from flask_limiter import Limiter
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import limiter_storage
+
+
+@pytest.fixture
+def shm(tmp_path):
+    return storage_from_string(f"shm://{tmp_path / 'limits.shm'}?slots=64")
+
+
+def test_scheme_is_registered_and_sized_from_the_uri(shm):
+    assert isinstance(shm, limiter_storage.SharedMemoryStorage)
+    assert shm.slots == 64 and shm.check()
+
+
+def test_counts_per_key_and_expires(shm, monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr(limiter_storage.time, "time", lambda: now[0])
+    assert shm.incr("a", 60) == 1
+    assert shm.incr("a", 60, amount=3) == 4
+    assert shm.incr("b", 60) == 1
+    assert shm.get("a") == 4 and shm.get_expiry("a") == 1_060.0
+    now[0] = 1_059.0
+    assert shm.incr("a", 60) == 5  # the window does not slide
+    now[0] = 1_060.0
+    assert shm.get("a") == 0  # expired: reads as absent, no sweep needed
+    assert shm.incr("a", 60) == 1 and shm.get_expiry("a") == 1_120.0
+
+
+def test_clear_and_reset(shm):
+    shm.incr("a", 60)
+    shm.incr("b", 60)
+    shm.clear("a")
+    assert shm.get("a") == 0 and shm.get("b") == 1
+    assert shm.reset() == 1
+    assert shm.get("b") == 0
+
+
+def test_full_bucket_evicts_the_counter_closest_to_expiry(tmp_path):
+    shm = limiter_storage.SharedMemoryStorage(f"shm://{tmp_path / 'one.shm'}?slots=8")
+    for i in range(8):
+        shm.incr(f"k{i}", 100 + i)
+    shm.incr("new", 60)
+    assert shm.get("new") == 1
+    assert shm.get("k0") == 0
+    assert all(shm.get(f"k{i}") == 1 for i in range(1, 8))
+
+
+def test_table_is_shared_with_a_second_mapping(shm, tmp_path):
+    other = limiter_storage.SharedMemoryStorage(f"shm://{tmp_path / 'limits.shm'}?slots=64")
+    shm.incr("login", 60)
+    assert other.incr("login", 60) == 2
+
+
+def _hammer(path, n):
+    storage = limiter_storage.SharedMemoryStorage(f"shm://{path}?slots=64")
+    for _ in range(n):
+        storage.incr("login", 60)
+
+
+def test_increments_from_several_processes_are_atomic(shm, tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_hammer, args=(tmp_path / "limits.shm", 200)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(20)
+    assert shm.get("login") == 800
+
+
+def test_forked_child_reopens_the_file(shm):
+    shm.incr("login", 60)
+    ctx = multiprocessing.get_context("fork")
+    child = ctx.Process(target=lambda: shm.incr("login", 60))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0 and shm.get("login") == 2
+
+
+def test_fixed_window_limit_over_shm(shm):
+    limiter = FixedWindowRateLimiter(shm)
+    five = parse("5/minute")
+    assert all(limiter.hit(five, "1.2.3.4") for _ in range(5))
+    assert not limiter.hit(five, "1.2.3.4")
+    assert limiter.hit(five, "5.6.7.8")
+    reset, remaining = limiter.get_window_stats(five, "1.2.3.4")
+    assert remaining == 0 and reset > time.time()
+
+
+def test_flask_limiter_uses_the_configured_storage(tmp_path):
+    app = Flask(__name__)
+    app.config["RATELIMIT_STORAGE_URI"] = f"shm://{tmp_path / 'app.shm'}"
+    limiter = Limiter(key_func=lambda: "ip", app=app)
+
+    @app.route("/login")
+    @limiter.limit("2 per minute")
+    def login():
+        return "ok"
+
+    client = app.test_client()
+    assert [client.get("/login").status_code for _ in range(3)] == [200, 200, 429]
+    assert isinstance(limiter.storage, limiter_storage.SharedMemoryStorage)
+
+
+def test_a_file_that_is_not_safely_ours_is_refused(tmp_path):
+    shared = tmp_path / "shared.shm"
+    shared.write_bytes(b"")
+    shared.chmod(0o666)
+    planted = tmp_path / "planted.shm"
+    planted.symlink_to(tmp_path / "elsewhere")
+    for path in (shared, planted):
+        storage = limiter_storage.SharedMemoryStorage(f"shm://{path}?slots=8")
+        assert storage._fd is None  # per-worker anonymous table instead
+        assert storage.incr("login", 60) == 1 and storage.incr("login", 60) == 2
+    assert shared.read_bytes() == b"" and not (tmp_path / "elsewhere").exists()
+
+
+def test_default_table_lives_in_a_private_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "ratelimit"
+    monkeypatch.setattr(limiter_storage, "DEFAULT_PATH", str(directory / "table.shm"))
+    assert limiter_storage.SharedMemoryStorage("shm://?slots=8")._fd is not None
+    assert oct(directory.stat().st_mode & 0o777) == oct(0o700)
+    directory.chmod(0o777)
+    assert limiter_storage.SharedMemoryStorage("shm://?slots=8")._fd is None
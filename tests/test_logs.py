@@ -0,0 +1,85 @@
+"""Tests for structured queue logging (logs.py)."""
+import json
+import logging
+
+import pytest
+from flask import Flask
+
+import logs
+import metrics
+
+
+@pytest.fixture
+def logged(capsys, monkeypatch):
+    """An app with logs.init_app installed; yields a function that stops the
+    listener (flushing the queue) and returns the JSON lines written."""
+    monkeypatch.setattr(metrics, "_registry", metrics._Registry())
+    root = logging.getLogger()
+    saved = (list(root.handlers), root.level)
+    app = Flask(__name__)
+    app.config.update(LOG_LEVEL="INFO", LOG_LEVELS="tests.verbose=DEBUG")
+
+    def lines():
+        logs._stop(app.extensions["logs"])
+        return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    app.lines = lines
+    yield app
+    logs._stop(app.extensions["logs"])
+    root.handlers[:], root.level = saved
+    logging.getLogger("tests.verbose").setLevel(logging.NOTSET)
+
+
+def test_records_are_json_with_only_allowlisted_fields(logged):
+    logs.init_app(logged)
+    logging.getLogger("tests.routes").warning(
+        "patient access denied", extra={"patient_id": "64f0", "first_name": "Ana", "notes": "x"})
+    (line,) = logged.lines()
+    assert line["msg"] == "patient access denied" and line["level"] == "WARNING"
+    assert line["logger"] == "tests.routes" and line["patient_id"] == "64f0"
+    assert "first_name" not in line and "notes" not in line
+
+
+def test_exceptions_keep_type_and_frames_but_not_the_message(logged):
+    logs.init_app(logged)
+    try:
+        raise ValueError("input_value='Ana Cruz'")
+    except ValueError:
+        logging.getLogger("tests.routes").exception("create patient failed")
+    (line,) = logged.lines()
+    assert line["error_type"] == "ValueError"
+    assert line["stack"][-1].startswith("tests/test_logs.py:")
+    assert "Ana" not in json.dumps(line)
+
+
+def test_request_fields_leave_out_the_query_string(logged):
+    logs.init_app(logged)
+    with logged.test_request_context("/patients?search=Ana", method="GET"):
+        logging.getLogger("tests.routes").error("patients list failed")
+    (line,) = logged.lines()
+    assert line["path"] == "/patients" and line["method"] == "GET"
+    assert "Ana" not in json.dumps(line)
+
+
+def test_debug_is_off_except_for_modules_listed_in_log_levels(logged):
+    logs.init_app(logged)
+    assert not logging.getLogger("tests.routes").isEnabledFor(logging.DEBUG)
+    logging.getLogger("tests.routes").debug("hidden")
+    logging.getLogger("tests.verbose").debug("shown")
+    assert [line["msg"] for line in logged.lines()] == ["shown"]
+
+
+def test_full_queue_drops_and_counts_instead_of_blocking(logged):
+    logged.config["LOG_QUEUE_SIZE"] = 1
+    logs.init_app(logged)
+    listener = logged.extensions["logs"]
+    logs._stop(listener)  # nothing drains the queue now
+    log = logging.getLogger("tests.routes")
+    log.warning("first")
+    log.warning("second")
+    assert metrics._registry.counters[("log_records_dropped_total", ())] == 1
+    assert listener.queue.qsize() == 1
+
+
+def test_parse_levels():
+    assert logs.parse_levels(" a.b=debug, c=WARNING,bad,=INFO") == [("a.b", "DEBUG"), ("c", "WARNING")]
@@ -0,0 +1,123 @@
+"""Tests for the Prometheus metrics registry + the admin-only endpoint.
+
+Covers the parts that can silently rot: exposition format, thread safety, and
+the cross-worker merge that keeps totals monotonic across worker recycles.
+"""
+import json
+import threading
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def fresh_metrics(tmp_path, monkeypatch):
+    """Isolated registry + snapshot directory per test."""
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_registry', metrics._Registry())
+    monkeypatch.setitem(metrics._flush_state, 'last', float('inf'))  # no auto-flush
+    return tmp_path
+
+
+def _request(endpoint, status=200, db_micros=0):
+    metrics.request_started()
+    if db_micros:
+        metrics._add_db_time(db_micros)
+    metrics.request_finished(endpoint, status)
+
+
+def test_request_counted_by_endpoint_and_status_class(fresh_metrics):
+    _request('patients.list_patients', 200)
+    _request('patients.list_patients', 302)
+    _request(None, 404)
+    text = metrics.render_prometheus()
+    assert 'dentalportal_http_requests_total{endpoint="patients.list_patients",status="2xx"} 1' in text
+    assert 'dentalportal_http_requests_total{endpoint="patients.list_patients",status="3xx"} 1' in text
+    assert 'dentalportal_http_requests_total{endpoint="unmatched",status="4xx"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative(fresh_metrics):
+    _request('main.dashboard', db_micros=20000)  # 20 ms of DB time
+    text = metrics.render_prometheus()
+    assert 'dentalportal_http_request_duration_seconds_count{endpoint="main.dashboard"} 1' in text
+    assert 'dentalportal_http_request_duration_seconds_bucket{endpoint="main.dashboard",le="+Inf"} 1' in text
+    assert 'dentalportal_db_time_seconds_bucket{endpoint="main.dashboard",le="0.01"} 0' in text
+    assert 'dentalportal_db_time_seconds_bucket{endpoint="main.dashboard",le="0.025"} 1' in text
+    assert 'dentalportal_db_commands_total{endpoint="main.dashboard"} 1' in text
+
+
+def test_db_time_outside_a_request_is_ignored(fresh_metrics):
+    metrics._add_db_time(5000)  # startup/index creation — no request running
+    assert 'db_commands_total{' not in metrics.render_prometheus()
+
+
+def test_finish_without_start_is_a_noop(fresh_metrics):
+    metrics.request_finished('main.dashboard', 200)
+    assert 'http_requests_total{' not in metrics.render_prometheus()
+
+
+def test_counters_are_thread_safe(fresh_metrics):
+    def worker():
+        for _ in range(500):
+            metrics.count_gridfs_bytes(2)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 'dentalportal_gridfs_bytes_served_total 8000' in metrics.render_prometheus()
+
+
+def test_dead_worker_snapshot_is_merged_then_retired(fresh_metrics):
+    """A recycled worker's counters survive (monotonic totals), its file is folded
+    into retired.json, and it no longer reports RSS."""
+    dead_pid = 2 ** 22 + 12345  # above pid_max on a default Linux box
+    (fresh_metrics / f'{dead_pid}.json').write_text(json.dumps({
+        'pid': dead_pid, 'rss': 123,
+        'counters': [['gridfs_bytes_served_total', [], 100]],
+        'histograms': [],
+    }))
+    metrics.count_gridfs_bytes(5)
+    text = metrics.render_prometheus()
+    assert 'dentalportal_gridfs_bytes_served_total 105' in text
+    assert f'pid="{dead_pid}"' not in text
+    if metrics.fcntl is not None:
+        assert not (fresh_metrics / f'{dead_pid}.json').exists()
+        assert (fresh_metrics / 'retired.json').exists()
+    # Still counted on the next scrape (from retired.json).
+    assert 'dentalportal_gridfs_bytes_served_total 105' in metrics.render_prometheus()
+
+
+def test_flush_writes_own_snapshot(fresh_metrics):
+    _request('main.dashboard')
+    metrics.flush()
+    files = [p.name for p in fresh_metrics.iterdir()]
+    assert any(name.endswith('.json') for name in files)
+
+
+def test_metrics_endpoint_is_admin_only(app, client, login, fresh_metrics):
+    from blueprints.routes.admin import admin_bp
+    app.register_blueprint(admin_bp)
+    login(role='dentist')
+    assert client.get('/admin/metrics').status_code == 403
+    login(role='admin')
+    resp = client.get('/admin/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    assert '# TYPE dentalportal_http_requests_total counter' in resp.get_data(as_text=True)
+
+
+def test_snapshots_in_a_shared_directory_are_ignored(fresh_metrics):
+    """A directory other users can write to may hold forged snapshots: neither
+    read nor written."""
+    (fresh_metrics / 'retired.json').write_text(json.dumps({
+        'counters': [['gridfs_bytes_served_total', [], 999]], 'histograms': []}))
+    fresh_metrics.chmod(0o777)
+    metrics.count_gridfs_bytes(1)
+    assert 'dentalportal_gridfs_bytes_served_total 1' in metrics.render_prometheus()
+    metrics.flush()
+    assert sorted(p.name for p in fresh_metrics.iterdir()) == ['retired.json']
+    fresh_metrics.chmod(0o700)
+    assert 'dentalportal_gridfs_bytes_served_total 1000' in metrics.render_prometheus()
@@ -0,0 +1,77 @@
+"""Tests for the size-capped password-hashing executor (blueprints/utils/passwords.py).
+
+What matters: hashing still works, a saturated executor answers "busy" at once
+instead of parking the request thread, and slots come back once jobs finish.
+"""
+import threading
+import time
+
+import pytest
+
+import metrics
+from blueprints.utils import passwords
+
+
+@pytest.fixture
+def pw(app, monkeypatch):
+    monkeypatch.setattr(passwords, "_executor", None)
+    monkeypatch.setattr(metrics, "_registry", metrics._Registry())
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=1,
+                      PASSWORD_HASH_TIMEOUT_SECONDS=5)
+    with app.app_context():
+        yield app
+
+
+def _counter(op, outcome):
+    key = ("password_hash_total", (("op", op), ("outcome", outcome)))
+    return metrics._registry.counters.get(key, 0)
+
+
+def _occupy(n):
+    """Fill `n` executor slots with jobs that block until the event is set."""
+    release = threading.Event()
+    ex = passwords._get_executor()
+    threads = [threading.Thread(target=ex.run, args=("test", release.wait)) for _ in range(n)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 2
+    while ex.depth < n and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return release, threads
+
+
+def test_hash_and_verify_round_trip(pw):
+    pwhash = passwords.hash_password("correct horse", op="register")
+    assert passwords.verify_password(pwhash, "correct horse", op="login")
+    assert not passwords.verify_password(pwhash, "wrong", op="login")
+    assert _counter("login", "ok") == 2
+    assert _counter("register", "ok") == 1
+
+
+def test_saturated_executor_is_busy_immediately(pw):
+    release, threads = _occupy(2)  # 1 running + 1 queued = full
+    started = time.perf_counter()
+    with pytest.raises(passwords.PasswordHashBusy):
+        passwords.verify_password("pbkdf2:sha256:1$x$y", "pw", op="login")
+    assert time.perf_counter() - started < 0.5
+    assert _counter("login", "busy") == 1
+
+    release.set()
+    for t in threads:
+        t.join()
+    assert passwords._get_executor().depth == 0
+    assert passwords.hash_password("after the burst")  # slots were returned
+
+
+def test_slow_job_times_out_as_busy_and_frees_its_slot(pw):
+    pw.config.update(PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_TIMEOUT_SECONDS=0.05)
+    release = threading.Event()
+    ex = passwords._get_executor()
+    with pytest.raises(passwords.PasswordHashBusy):
+        ex.run("test", release.wait)
+    assert _counter("test", "timeout") == 1
+    release.set()
+    deadline = time.monotonic() + 2
+    while ex.depth and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert ex.depth == 0
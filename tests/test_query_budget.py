@@ -0,0 +1,96 @@
+"""Tests for the per-route-class query budgets (maxTimeMS) and their metric."""
+from types import SimpleNamespace
+
+import pytest
+from flask import Blueprint
+
+import metrics
+from extensions import mongo
+from blueprints.repositories import patients as patient_repo
+from blueprints.repositories import query_budget
+
+
+@pytest.fixture
+def budget_app(app):
+    reports = Blueprint("reports", __name__)
+
+    @reports.route("/reports")
+    def reports_index():
+        return "reports", 200
+
+    app.register_blueprint(reports)
+    return app
+
+
+def test_budget_follows_route_class(budget_app):
+    with budget_app.test_request_context("/_login_guarded"):
+        assert query_budget.route_class() == query_budget.INTERACTIVE
+        assert query_budget.ms() == 5000
+    with budget_app.test_request_context("/reports"):
+        assert query_budget.route_class() == query_budget.REPORT
+        assert query_budget.kwargs() == {"maxTimeMS": 30000}
+    with budget_app.app_context():  # no request: scripts run unbounded
+        assert query_budget.ms() is None
+        assert query_budget.kwargs() == {}
+
+
+def test_budget_is_configurable_and_zero_disables(budget_app):
+    budget_app.config.update(QUERY_BUDGET_INTERACTIVE_MS=800, QUERY_BUDGET_REPORT_MS=0)
+    with budget_app.test_request_context("/_login_guarded"):
+        assert query_budget.ms() == 800
+        assert query_budget.ms(query_budget.EXPORT) == 60000
+    with budget_app.test_request_context("/reports"):
+        assert query_budget.kwargs() == {}
+
+
+class _Recorder:
+    """mongo.db stand-in that records each read's keyword arguments."""
+
+    def __init__(self, db):
+        self._db, self.calls = db, []
+
+    def __getattr__(self, name):
+        coll = getattr(self._db, name)
+        recorder = self
+
+        class _Coll:
+            def __getattr__(self, attr):
+                fn = getattr(coll, attr)
+
+                def call(*args, **kwargs):
+                    recorder.calls.append((attr, kwargs))
+                    return fn(*args, **kwargs)
+                return call
+        return _Coll()
+
+
+def test_repository_reads_carry_the_budget(budget_app, db, monkeypatch):
+    rec = _Recorder(db)
+    monkeypatch.setattr(mongo, "db", rec)
+    with budget_app.test_request_context("/_login_guarded"):
+        patient_repo.page_matching({"is_active": True}, [("created_at", -1)], 0, 20)
+    assert rec.calls == [
+        ("count_documents", {"maxTimeMS": 5000}),
+        ("find", {"max_time_ms": 5000}),
+    ]
+
+
+def test_timeouts_are_counted_by_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_registry", metrics._Registry())
+    monkeypatch.setitem(metrics._flush_state, "last", float("inf"))
+    listener = metrics.mongo_listeners()[0]
+
+    def failed(code):
+        listener.failed(SimpleNamespace(
+            duration_micros=1000, command_name="aggregate", failure={"code": code},
+        ))
+
+    failed(50)  # outside a request: not attributed
+    metrics.request_started("patients.list_patients")
+    failed(50)
+    failed(11000)  # other failures aren't timeouts
+    metrics.request_finished("patients.list_patients", 503)
+    text = metrics.render_prometheus()
+    assert ('dentalportal_query_timeouts_total{endpoint="patients.list_patients",'
+            'command="aggregate"} 1') in text
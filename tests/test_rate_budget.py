@@ -0,0 +1,104 @@
+"""Tests for the cost-weighted per-user rate budget (rate_budget.py)."""
+from datetime import datetime
+
+import pytest
+from flask import Flask, session
+from pymongo.errors import ServerSelectionTimeoutError
+
+import metrics
+import rate_budget
+
+
+@pytest.fixture
+def budget(db):
+    # 10 units deep, one unit back per second.
+    return rate_budget.Budget(capacity=10, refill_per_minute=60)
+
+
+def test_costs_drain_and_refill(budget):
+    now = 1_000.0
+    d = budget.charge("u1", 4, now=now)
+    assert (d.allowed, d.remaining, d.reset) == (True, 6, 4)
+    assert budget.charge("u1", 4, now=now).remaining == 2
+    denied = budget.charge("u1", 4, now=now)
+    assert not denied.allowed and denied.remaining == 2
+    assert denied.retry_after == 2  # two more units needed at one a second
+    assert budget.charge("u1", 4, now=now + 2).allowed
+    # Fully refilled later: starts again from a full bucket.
+    assert budget.charge("u1", 1, now=now + 60).remaining == 9
+
+
+def test_buckets_are_per_user_and_expire(budget, db):
+    assert budget.charge("u1", 10, now=0).remaining == 0
+    assert budget.charge("u2", 1, now=0).remaining == 9
+    assert not budget.charge("u1", 1, now=0).allowed
+    expires_at = db.rate_budgets.find_one({"_id": "u1"})["expires_at"]
+    assert expires_at.replace(tzinfo=None) == datetime(1970, 1, 1, 0, 0, 10)  # TTL: full again
+
+
+def test_cost_above_capacity_needs_a_full_bucket(budget):
+    assert budget.charge("u1", 50, now=0).allowed
+    assert not budget.charge("u1", 50, now=5).allowed
+
+
+def test_endpoint_costs(app):
+    with app.app_context():
+        assert rate_budget.endpoint_cost("patients.patient_pdf", "patients") == 10
+        assert rate_budget.endpoint_cost("reports.reports", "reports") == 5
+        assert rate_budget.endpoint_cost("health_check", None) == 0
+        assert rate_budget.endpoint_cost("main.dashboard", "main") == 0
+        app.config["RATE_BUDGET_PAGE_COST"] = 1
+        assert rate_budget.endpoint_cost("main.dashboard", "main") == 1
+        assert rate_budget.endpoint_cost("static", None) == 0
+
+
+@pytest.fixture
+def metered(db, monkeypatch):
+    monkeypatch.setattr(metrics, "_registry", metrics._Registry())
+    app = Flask(__name__)
+    app.config.update(TESTING=True, SECRET_KEY="t", RATE_BUDGET_CAPACITY=20,
+                      RATE_BUDGET_REFILL_PER_MINUTE=1)
+    rate_budget.init_app(app)
+
+    @app.route("/_login/<uid>")
+    def _login(uid):
+        session["user_id"] = uid
+        return "ok"
+
+    @app.route("/patients/<pid>/pdf", endpoint="patients.patient_pdf")
+    def pdf(pid):
+        return "pdf"
+
+    @app.route("/page")
+    def page():
+        return "page"
+
+    return app
+
+
+def test_over_budget_requests_get_429_with_headers(metered):
+    client = metered.test_client()
+    assert "X-RateLimit-Limit" not in client.get("/patients/1/pdf").headers  # signed out
+    client.get("/_login/u1")
+    first = client.get("/patients/1/pdf")
+    assert first.status_code == 200
+    assert first.headers["X-RateLimit-Limit"] == "20"
+    assert first.headers["X-RateLimit-Remaining"] == "10"
+    assert client.get("/patients/1/pdf").headers["X-RateLimit-Remaining"] == "0"
+    over = client.get("/patients/1/pdf")
+    assert over.status_code == 429
+    assert int(over.headers["Retry-After"]) > 0
+    page = client.get("/page")  # plain pages are not metered by default
+    assert page.status_code == 200 and "X-RateLimit-Remaining" not in page.headers
+    key = ("rate_budget_total", (("endpoint", "patients.patient_pdf"), ("outcome", "denied")))
+    assert metrics._registry.counters[key] == 1
+
+
+def test_storage_errors_fail_open(metered, monkeypatch):
+    def down(*a, **k):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(metered.extensions["rate_budget"], "charge", down)
+    client = metered.test_client()
+    client.get("/_login/u1")
+    assert client.get("/patients/1/pdf").status_code == 200
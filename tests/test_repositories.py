@@ -71,6 +71,25 @@ def test_patients_get_for_accessor_denies_inactive_membership(db, seed_patient):
     assert clinic is None
 
 
+def test_patients_get_for_accessor_malformed_id(db):
+    assert patient_repo.get_for_accessor("not-an-object-id", str(ObjectId())) == (None, None)
+
+
+def test_patients_get_for_accessor_is_one_query_with_projection(db, seed_patient, db_reads):
+    owner = str(ObjectId())
+    patient_id, clinic_id = seed_patient(owner)
+    patient, clinic = patient_repo.get_for_accessor(
+        str(patient_id), owner, patient_repo.ACCESS_FIELDS)
+    assert patient == {"_id": patient_id, "clinic_id": clinic_id}
+    assert clinic["_id"] == clinic_id and clinic["name"] == "Test Clinic"
+    # Patient + clinic in one aggregate; the owner set is the memberships read.
+    assert db_reads == {"patients": 1, "memberships": 1}
+
+    patient, _ = patient_repo.get_for_accessor(str(patient_id), owner)
+    assert patient["personal_info"]["first_name"] == "Test"
+    assert "_clinic" not in patient
+
+
 def test_ensure_nested_fills_and_preserves():
     patient = {"medical_history": {"allergies": {"penicillin": True}}}
     out = patient_repo.ensure_nested(patient)
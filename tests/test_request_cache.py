@@ -0,0 +1,103 @@
+"""Tests for the request-scoped access memo (blueprints/repositories/request_cache.py).
+
+Proves the point of it — repeated access checks in one request cost one round
+trip — and that writes made during the request are never hidden by it.
+"""
+from collections import Counter
+
+import pytest
+from bson.objectid import ObjectId
+from flask import session
+
+from blueprints.repositories import clinics as clinic_repo
+from blueprints.repositories import memberships as membership_repo
+from blueprints.repositories import patients as patient_repo
+from blueprints.utils import is_admin, user_clinic_ids, verify_patient_access
+
+
+@pytest.fixture
+def counting(app, db_reads):
+    # Isolate the per-request layer from the per-worker one (test_access_cache).
+    app.config["ACCESS_CACHE_SECONDS"] = 0
+    return db_reads
+
+
+def test_access_helpers_hit_mongo_once_per_request(app, seed_patient, counting):
+    owner = str(ObjectId())
+    patient_id, clinic_id = seed_patient(owner)
+    with app.test_request_context():
+        session["user_id"] = owner
+        for _ in range(3):
+            assert user_clinic_ids() == [clinic_id]
+            patient, clinic = verify_patient_access(str(patient_id))
+            assert clinic["_id"] == clinic_id
+            assert [c["_id"] for c in clinic_repo.accessible_active(owner)] == [clinic_id]
+            is_admin()
+    # memberships: one owner-id lookup shared by all three helpers.
+    assert counting == Counter(memberships=1, clinics=2, patients=1)
+
+
+def test_memo_is_per_request(app, seed_patient, counting):
+    owner = str(ObjectId())
+    seed_patient(owner)
+    for _ in range(2):
+        with app.test_request_context():
+            session["user_id"] = owner
+            user_clinic_ids()
+            user_clinic_ids()
+    assert counting["memberships"] == 2
+
+
+def test_membership_write_invalidates(app, seed_patient, counting):
+    dentist = str(ObjectId())
+    staff = str(ObjectId())
+    patient_id, clinic_id = seed_patient(dentist)
+    with app.test_request_context():
+        session["user_id"] = staff
+        assert user_clinic_ids() == []
+        assert verify_patient_access(str(patient_id))[1] is None
+        membership_repo.create(staff, dentist, created_by=dentist)
+        assert user_clinic_ids() == [clinic_id]
+        assert verify_patient_access(str(patient_id))[1] is not None
+        membership_repo.deactivate(staff, dentist)
+        assert user_clinic_ids() == []
+
+
+def test_clinic_and_patient_writes_invalidate(app, seed_patient, counting):
+    owner = str(ObjectId())
+    patient_id, clinic_id = seed_patient(owner)
+    with app.test_request_context():
+        session["user_id"] = owner
+        assert user_clinic_ids() == [clinic_id]
+        new_id = clinic_repo.create({"owner_id": owner, "name": "Second", "is_active": True})
+        assert sorted(user_clinic_ids()) == sorted([clinic_id, new_id])
+        clinic_repo.deactivate_owned(new_id, owner)
+        assert user_clinic_ids() == [clinic_id]
+
+        verify_patient_access(str(patient_id))
+        patient_repo.update_set(str(patient_id), {"personal_info.first_name": "Renamed"})
+        patient, _ = verify_patient_access(str(patient_id))
+        assert patient["personal_info"]["first_name"] == "Renamed"
+
+
+def test_callers_get_copies(app, seed_patient, counting):
+    owner = str(ObjectId())
+    seed_patient(owner)
+    with app.test_request_context():
+        session["user_id"] = owner
+        user_clinic_ids().append("tampered")
+        assert "tampered" not in user_clinic_ids()
+
+
+def test_keyword_arguments_are_part_of_the_key(app, seed_patient, counting):
+    owner = str(ObjectId())
+    patient_id, clinic_id = seed_patient(owner)
+    with app.test_request_context():
+        full, _ = patient_repo.get_for_accessor(str(patient_id), owner)
+        slim, clinic = patient_repo.get_for_accessor(str(patient_id), owner,
+                                                     fields=patient_repo.ACCESS_FIELDS)
+        again, _ = patient_repo.get_for_accessor(str(patient_id), owner,
+                                                 fields=patient_repo.ACCESS_FIELDS)
+    assert clinic["_id"] == clinic_id
+    assert "personal_info" in full and "personal_info" not in slim and again == slim
+    assert counting["patients"] == 2
@@ -0,0 +1,116 @@
+"""Tests for the opt-in server-side session store (session_store.py).
+
+Covers what matters for correctness and security: the cookie carries only an
+opaque id, unchanged sessions cost no write and no Set-Cookie, a write on
+another worker is never hidden by a stale cache, and logout/login rotate ids.
+"""
+from datetime import datetime
+
+from flask import flash, get_flashed_messages, session
+
+from session_store import COLLECTION, MongoSessionInterface, _key
+
+
+def _install(app, cache_seconds=10):
+    iface = MongoSessionInterface(cache_seconds=cache_seconds)
+    app.session_interface = iface
+
+    @app.route('/_s/set/<value>')
+    def _set(value):
+        session['user_id'] = value
+        session['user_email'] = 'dentist@dental.com'
+        return 'ok'
+
+    @app.route('/_s/get')
+    def _get():
+        return session.get('user_id') or '-'
+
+    @app.route('/_s/flash')
+    def _flash():
+        flash('Saved!', 'success')
+        return 'ok'
+
+    @app.route('/_s/flashes')
+    def _flashes():
+        return '|'.join(f'{c}:{m}' for c, m in get_flashed_messages(with_categories=True)) or '-'
+
+    @app.route('/_s/logout')
+    def _logout():
+        session.clear()
+        return 'ok'
+
+    return iface
+
+
+def _cookie(client, app):
+    cookie = client.get_cookie(app.config.get('SESSION_COOKIE_NAME', 'session'))
+    return cookie.value if cookie else None
+
+
+def test_cookie_holds_only_an_opaque_id(app, client, db):
+    _install(app)
+    client.get('/_s/set/u1')
+    value = _cookie(client, app)
+    sid, version = value.rsplit('.', 1)
+    assert version == '1'
+    assert 'u1' not in value and 'dentist' not in value
+    doc = db[COLLECTION].find_one({'_id': _key(sid)})
+    assert doc is not None and doc['expires_at'] is not None
+    assert client.get('/_s/get').get_data(as_text=True) == 'u1'
+
+
+def test_unchanged_session_sends_no_cookie_and_skips_the_db(app, client, db):
+    iface = _install(app)
+    client.get('/_s/set/u1')
+    db[COLLECTION].update_many({}, {'$set': {'data': '{}'}})  # only the cache has it now
+    resp = client.get('/_s/get')
+    assert resp.get_data(as_text=True) == 'u1'
+    assert 'Set-Cookie' not in resp.headers
+    # Once the cache is cold the read goes to Mongo.
+    iface.cache._items.clear()
+    assert client.get('/_s/get').get_data(as_text=True) == '-'
+
+
+def test_write_on_another_worker_is_not_hidden_by_a_stale_cache(app, client, db):
+    iface = _install(app)
+    client.get('/_s/set/u1')
+    stale = dict(iface.cache._items)
+
+    client.get('/_s/flash')  # "worker B" writes; the cookie's version moves on
+    iface.cache._items.clear()
+    iface.cache._items.update(stale)  # "worker A" still caches the old version
+
+    assert client.get('/_s/flashes').get_data(as_text=True) == 'success:Saved!'
+
+
+def test_flashes_round_trip_through_the_store(app, client, db):
+    _install(app, cache_seconds=0)
+    client.get('/_s/set/u1')
+    client.get('/_s/flash')
+    assert client.get('/_s/flashes').get_data(as_text=True) == 'success:Saved!'
+    assert client.get('/_s/flashes').get_data(as_text=True) == '-'
+
+
+def test_login_and_logout_rotate_the_session_id(app, client, db):
+    _install(app)
+    client.get('/_s/flash')  # anonymous session (e.g. CSRF token before login)
+    anon_sid = _cookie(client, app).rsplit('.', 1)[0]
+
+    client.get('/_s/set/u1')  # "login"
+    user_sid = _cookie(client, app).rsplit('.', 1)[0]
+    assert user_sid != anon_sid
+    assert db[COLLECTION].find_one({'_id': _key(anon_sid)}) is None
+
+    client.get('/_s/logout')
+    assert _cookie(client, app) is None
+    assert db[COLLECTION].find_one({'_id': _key(user_sid)}) is None
+
+
+def test_expired_or_unknown_session_starts_fresh(app, client, db):
+    _install(app, cache_seconds=0)
+    client.get('/_s/set/u1')
+    db[COLLECTION].update_many({}, {'$set': {'expires_at': datetime(2000, 1, 1)}})
+    assert client.get('/_s/get').get_data(as_text=True) == '-'
+
+    client.set_cookie(app.config.get('SESSION_COOKIE_NAME', 'session'), 'forged.1')
+    assert client.get('/_s/get').get_data(as_text=True) == '-'
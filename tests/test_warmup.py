@@ -0,0 +1,81 @@
+"""Tests for worker warm-up (warmup.py): bytecode cache + template precompile."""
+import os
+import stat
+import tempfile
+
+import pytest
+from flask import Flask
+
+import warmup
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    templates = tmp_path / "templates"
+    (templates / "patients").mkdir(parents=True)
+    (templates / "base.html").write_text("<main>{% block body %}{% endblock %}</main>")
+    (templates / "patients" / "detail.html").write_text(
+        '{% extends "base.html" %}{% block body %}{{ name }}{% endblock %}')
+    (templates / "broken.html").write_text("{% if %}")
+
+    def make(**config):
+        app = Flask(__name__, template_folder=str(templates))
+        app.config.update({"TEMPLATE_CACHE_DIR": str(tmp_path / "jinja"), **config})
+        return app
+
+    return make
+
+
+def test_warm_up_compiles_every_template_and_skips_broken_ones(make_app, caplog):
+    app = make_app(TEMPLATE_WARMUP=False)
+    warmup.init_app(app)
+    assert warmup.warm_up(app) == 2
+    skipped = [r for r in caplog.records if r.getMessage() == "template warm-up skipped a template"]
+    assert [r.template for r in skipped] == ["broken.html"]
+    assert len(app.jinja_env.cache) == 2
+
+
+def test_recycled_worker_loads_bytecode_instead_of_compiling(make_app, tmp_path, monkeypatch):
+    first = make_app()
+    warmup.init_app(first)
+    assert len(list((tmp_path / "jinja").iterdir())) == 2
+
+    second = make_app(TEMPLATE_WARMUP=False)
+    warmup.init_app(second)
+    compiled = []
+    real_compile = second.jinja_env.compile
+    monkeypatch.setattr(second.jinja_env, "compile",
+                        lambda *a, **k: compiled.append(a) or real_compile(*a, **k))
+    with second.test_request_context():
+        html = second.jinja_env.get_template("patients/detail.html").render(name="Ana")
+    assert html == "<main>Ana</main>"
+    assert compiled == []
+
+
+def test_cache_can_be_turned_off(make_app):
+    app = make_app(TEMPLATE_CACHE_DIR="")
+    warmup.init_app(app)
+    assert app.jinja_env.bytecode_cache is None
+    assert len(app.jinja_env.cache) == 2
+
+
+def test_default_is_jinjas_private_per_user_dir(make_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    app = make_app(TEMPLATE_CACHE_DIR=None, TEMPLATE_WARMUP=False)
+    directory = warmup.install_bytecode_cache(app)
+    assert directory == str(tmp_path / f"_jinja2-cache-{os.getuid()}")
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+@pytest.mark.parametrize("prepare", [
+    lambda path: (path.mkdir(), path.chmod(0o777)),          # pre-created, world-writable
+    lambda path: path.symlink_to(path.parent / "templates"),  # symlink elsewhere
+    lambda path: path.write_text("not a directory"),
+])
+def test_unsafe_cache_dir_is_refused(make_app, tmp_path, prepare, caplog):
+    prepare(tmp_path / "jinja")
+    app = make_app()
+    warmup.init_app(app)
+    assert app.jinja_env.bytecode_cache is None
+    assert any(r.getMessage() == "template bytecode cache disabled" for r in caplog.records)
+    assert len(app.jinja_env.cache) == 2  # warm-up still runs, just uncached
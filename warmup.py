@@ -0,0 +1,103 @@
+# File: MyDentalPortal/warmup.py
+# Worker warm-up: a Jinja bytecode cache shared by the workers on a host, plus
+# compiling every template and importing the lazily-imported heavy modules
+# before a fresh worker serves its first request.
+#
+# Why: render.yaml recycles each worker every ~400 requests (--max-requests),
+# and gunicorn runs without --preload, so every new worker starts cold. The
+# first hit on patients/detail.html, charts/dental_chart.html or
+# appointments.html in that worker paid Jinja's parse + compile, and the first
+# PDF paid for importing reportlab.
+#
+# Design:
+#   * jinja2.FileSystemBytecodeCache. By default it uses Jinja's own per-user
+#     directory (<tmp>/_jinja2-cache-<uid>), which Jinja refuses unless it is
+#     a real directory owned by this user with mode 0700. An explicit
+#     TEMPLATE_CACHE_DIR gets the same check (private_dir.py). The cache loads marshalled
+#     code objects, so a directory someone else can write to (a pre-created
+#     path in a shared /tmp) would let them run code in the app; it is refused
+#     and the app runs without the cache.
+#   * Entries are keyed by template name plus a checksum of the source, so a
+#     deploy that changes a template just misses. Jinja writes each entry to a
+#     temp file and renames it, so workers can share the directory safely. A
+#     recycled worker loads the compiled code instead of parsing the template
+#     again.
+#   * warm_up(app) loads every template into the environment's in-memory cache
+#     (through the bytecode cache) and imports LAZY_MODULES. app.py calls it at
+#     import time. Under gunicorn without --preload that runs in each worker
+#     after the fork and before it accepts connections, so the first request
+#     after a recycle finds everything compiled and imported.
+#   * A template that fails to compile is only logged here. Its own request
+#     still raises the error, as it did before.
+#   * TEMPLATE_WARMUP=false skips the warm-up; TEMPLATE_CACHE_DIR='' turns the
+#     bytecode cache off.
+
+import importlib
+import logging
+import time
+
+from jinja2 import FileSystemBytecodeCache, TemplateError
+
+import private_dir
+
+log = logging.getLogger(__name__)
+
+# Imported inside view functions (to keep startup light for the routes that
+# don't need them) — which put the import cost on a user's request instead.
+LAZY_MODULES = (
+    'blueprints.utils.pdf',        # reportlab
+    'blueprints.utils.chart_pdf',  # reportlab
+    'PIL.Image',
+    'gridfs',
+    'zoneinfo',
+)
+
+
+def install_bytecode_cache(app):
+    """Point the app's Jinja environment at the shared on-disk bytecode cache.
+    Returns the cache directory, or None when it is turned off or unsafe."""
+    directory = app.config.get('TEMPLATE_CACHE_DIR')
+    if directory == '':
+        return None
+    try:
+        if directory is None:
+            cache = FileSystemBytecodeCache()  # Jinja checks its own default dir
+        else:
+            cache = FileSystemBytecodeCache(private_dir.ensure(directory))
+    except (OSError, RuntimeError) as e:
+        log.warning('template bytecode cache disabled', extra={'error_type': type(e).__name__})
+        return None
+    app.jinja_env.bytecode_cache = cache
+    return cache.directory
+
+
+def warm_up(app):
+    """Compile every template and import LAZY_MODULES; returns the number of
+    templates loaded."""
+    started = time.perf_counter()
+    env = app.jinja_env
+    loaded = 0
+    for name in env.list_templates(extensions=('html',)):
+        try:
+            env.get_template(name)
+            loaded += 1
+        except TemplateError as e:
+            log.warning('template warm-up skipped a template',
+                        extra={'template': name, 'error_type': type(e).__name__})
+    for module in LAZY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            log.warning('warm-up import failed',
+                        extra={'dependency': module, 'error_type': type(e).__name__})
+    log.info('worker warmed', extra={
+        'count': loaded, 'duration_ms': round((time.perf_counter() - started) * 1000)})
+    return loaded
+
+
+def init_app(app):
+    """Install the bytecode cache and, unless TEMPLATE_WARMUP is off, warm the
+    worker. Call once every blueprint (and its template folder) is registered."""
+    install_bytecode_cache(app)
+    if app.config.get('TEMPLATE_WARMUP', True):
+        warm_up(app)